@@ -0,0 +1,72 @@
+# bench/bench_batch.py
+"""
+Цепочка чтений «юниты → проекты → менеджеры» (как в смене менеджера):
+по одному запросу vs gas_batch vs автосборка параллельных вызовов.
+
+    python -m bench.bench_batch [--n 20] [--latency-ms 300]
+
+Задержка заглушки моделирует стоимость одного выполнения Apps Script.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from tools import fake_gas
+
+CALLS = [("list_units_min", {}), ("list_projects_for_unit", {"unit": "2.1"}), ("list_managers", {})]
+
+
+async def run(n: int, latency_ms: float) -> None:
+    runner, port = await fake_gas.start(latency_ms=latency_ms)
+    url = f"http://127.0.0.1:{port}/macros/s/fake/exec"
+    os.environ.update(GAS_URL=url, GAS_SECRET=fake_gas.SECRET, NO_PROXY="127.0.0.1,localhost")
+
+    from bot import gas_client
+    from bot.utils.batcher import MicroBatcher
+    gas_client.GAS_URL, gas_client.GAS_SECRET = url, fake_gas.SECRET
+
+    async def sequential():
+        for intent, args in CALLS:
+            await gas_client.gas_call(intent, args)
+
+    async def batched():
+        await gas_client.gas_batch(CALLS)
+
+    async def auto():
+        await asyncio.gather(*(gas_client.gas_call(i, a) for i, a in CALLS))
+
+    modes = [("sequential", sequential, None), ("gas_batch", batched, None),
+             ("auto-batch", auto, MicroBatcher(gas_client._flush_batch, window=0.01))]
+    try:
+        print(f"{'mode':<12}{'p50, ms':>10}{'max, ms':>10}{'POSTs':>8}")
+        for name, fn, batcher in modes:
+            gas_client._BATCHER = batcher
+            posts0 = gas_client.SCHEDULER.stats()["lanes"]["read"]["admitted"]
+            xs = []
+            for _ in range(n):
+                gas_client.invalidate()
+                t0 = time.perf_counter()
+                await fn()
+                xs.append((time.perf_counter() - t0) * 1000)
+            posts = gas_client.SCHEDULER.stats()["lanes"]["read"]["admitted"] - posts0
+            print(f"{name:<12}{statistics.median(xs):>10.1f}{max(xs):>10.1f}{posts / n:>8.1f}")
+    finally:
+        gas_client._BATCHER = None
+        await gas_client.close_client()
+        await runner.cleanup()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=300.0)
+    a = ap.parse_args()
+    asyncio.run(run(a.n, a.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
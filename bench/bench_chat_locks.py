@@ -0,0 +1,97 @@
+# bench/bench_chat_locks.py
+"""
+Память реестра локов gas_guard на потоке из множества разных чатов.
+
+Через хэндлер под @gas_guard() прогоняются апдейты из --chats синтетических чатов
+волнами по --concurrency (каждый — «двойной клик»: два апдейта подряд, второй должен
+получить «уже обрабатываю»). После каждой волны печатается число записей в реестре
+и объём памяти (tracemalloc). Для сравнения — старая схема: dict чат → Lock без удаления.
+
+    python -m bench.bench_chat_locks [--chats 100000] [--concurrency 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict
+
+from bot.utils.tg_utils import CHAT_LOCKS, gas_guard
+
+
+class FakeCallback(SimpleNamespace):
+    """Похоже на CallbackQuery для _chat_id/busy_reply: .message.chat.id и answer()."""
+
+    async def answer(self, *args, **kwargs) -> None:
+        self.busy += 1
+
+
+def make_event(chat_id: int) -> FakeCallback:
+    return FakeCallback(message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)), busy=0)
+
+
+handled = 0
+
+
+@gas_guard()
+async def handler(evt: FakeCallback) -> None:
+    global handled
+    handled += 1
+    await asyncio.sleep(0.001)   # «поход в GAS»
+
+
+_OLD_LOCKS: Dict[int, asyncio.Lock] = {}
+
+
+async def old_handler(evt: FakeCallback) -> None:
+    # прежний chat_lock: лок создаётся на чат и остаётся навсегда
+    global handled
+    chat_id = evt.message.chat.id
+    lock = _OLD_LOCKS.setdefault(chat_id, asyncio.Lock())
+    if lock.locked():
+        await evt.answer()
+        return
+    async with lock:
+        handled += 1
+        await asyncio.sleep(0.001)
+
+
+async def run(name: str, fn, chats: int, concurrency: int, size) -> None:
+    global handled
+    handled = 0
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    busy = 0
+    print(f"— {name}")
+    step = max(concurrency, chats // 10)
+    for lo in range(0, chats, concurrency):
+        events = [make_event(c) for c in range(lo, min(chats, lo + concurrency))]
+        await asyncio.gather(*(fn(e) for e in events), *(fn(e) for e in events))   # двойной клик
+        busy += sum(e.busy for e in events)
+        done = lo + len(events)
+        if done % step == 0 or done == chats:
+            mem = tracemalloc.get_traced_memory()[0] - base
+            print(f"  чатов {done:7d}  записей в реестре {size():7d}  память {mem / 1024:9.1f} КБ")
+    dt = time.perf_counter() - t0
+    tracemalloc.stop()
+    print(f"  обработано {handled}, отбито повторов {busy} из {chats}, {chats * 2 / dt:,.0f} апд/с")
+
+
+async def main_async(chats: int, concurrency: int) -> None:
+    await run("реестр со счётчиком ссылок (gas_guard)", handler, chats, concurrency, lambda: len(CHAT_LOCKS))
+    await run("старый dict без удаления", old_handler, chats, concurrency, lambda: len(_OLD_LOCKS))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", type=int, default=100_000)
+    ap.add_argument("--concurrency", type=int, default=1000)
+    a = ap.parse_args()
+    asyncio.run(main_async(a.chats, a.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench/bench_gas_client.py
+"""
+Задержка gas_call: новый AsyncClient на каждый запрос vs общий пул с keep-alive.
+
+    python -m bench.bench_gas_client [--n 200] [--latency-ms 0]
+
+Заглушка отвечает по http (без TLS), поэтому экономия здесь — только TCP-handshake
+и переподключение ко второму хосту редиректа; на боевом https разница заметно больше.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from bot.utils.gas_sched import PRIO_READ
+from tools import fake_gas
+
+INTENTS = ["list_units_min", "list_managers", "get_all_load"]
+
+
+def _pct(samples: list[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+async def _legacy_call(url: str, intent: str) -> dict:
+    # так gas_call работал раньше: клиент создаётся и закрывается на каждый intent
+    async with httpx.AsyncClient(timeout=30, follow_redirects=True, verify=False, trust_env=True) as cli:
+        r = await cli.post(url, json={"key": fake_gas.SECRET, "intent": intent, "args": {}, "user": {}})
+        r.raise_for_status()
+        return r.json()
+
+
+async def _measure(fn, n: int) -> list[float]:
+    out: list[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+async def run(n: int, latency_ms: float) -> None:
+    runner, port = await fake_gas.start(latency_ms=latency_ms)
+    url = f"http://127.0.0.1:{port}/macros/s/fake/exec"
+    # заглушка на localhost — мимо системного прокси (клиент создан с trust_env=True)
+    os.environ.update(GAS_URL=url, GAS_SECRET=fake_gas.SECRET, NO_PROXY="127.0.0.1,localhost")
+
+    from bot import gas_client
+    gas_client.GAS_URL, gas_client.GAS_SECRET = url, fake_gas.SECRET
+    await gas_client.start_client()
+
+    try:
+        print(f"{'intent':<18}{'mode':<10}{'p50, ms':>10}{'p95, ms':>10}")
+        for intent in INTENTS:
+            legacy = await _measure(lambda: _legacy_call(url, intent), n)
+            # refresh() идёт мимо кэша чтений — меряем именно транспорт
+            pooled = await _measure(lambda: gas_client.refresh(intent, {}, priority=PRIO_READ), n)
+            for mode, xs in (("per-call", legacy), ("pooled", pooled)):
+                print(f"{intent:<18}{mode:<10}{statistics.median(xs):>10.2f}{_pct(xs, 0.95):>10.2f}")
+    finally:
+        await gas_client.close_client()
+        await runner.cleanup()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    a = ap.parse_args()
+    asyncio.run(run(a.n, a.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench/bench_load_matrix.py
+"""
+Матрица занятости «юниты × недели»: построение, отчёт за период, точечная правка.
+
+    python -m bench.bench_load_matrix [--projects 10000]
+
+Сравниваем с построчным расчётом load_engine.compute и с построением матрицы
+циклом по проектам. Заодно сверяем итоги за периоды. Даты набора fake_gas
+разбросаны примерно на 5 лет — под них и подгоняется окно матрицы.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from bot.load_engine import compute
+from bot.load_matrix import LoadMatrix
+from tools.fake_gas import Dataset
+
+
+def timeit(fn, n: int) -> float:
+    xs = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        xs.append(time.perf_counter() - t0)
+    return statistics.median(xs) * 1000
+
+
+def loop_build(rows, codes, origin, n_weeks) -> LoadMatrix:
+    m = LoadMatrix(codes, origin, n_weeks)
+    for r in rows:
+        m.upsert(r)
+    return m
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--projects", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    ds = Dataset()
+    ds.generate(a.projects, seed=a.seed)
+    rows = ds.projects(None, statuses=("active", "pending", "paused", "done"))
+    units = ds.units()
+    codes = [u["code"] for u in units]
+    today = date.today()
+    m = LoadMatrix.build(rows, codes)
+    origin, n_weeks = m.origin, m.n_weeks
+    print(f"проектов: {len(rows)}, юнитов: {len(codes)}, недель: {n_weeks} (с {origin})")
+    assert np.array_equal(m.counts, loop_build(rows, codes, origin, n_weeks).counts)
+
+    periods = {
+        "квартал": (today, today + timedelta(days=91)),
+        "полгода": (today, today + timedelta(days=182)),
+        "год": (today, today + timedelta(days=365)),
+    }
+    for name, (f, t) in periods.items():
+        frm, to = f.isoformat(), t.isoformat()
+        ref = {u["code"]: (len(u["projects"]), u["weeks"])
+               for top in compute(rows, units, None, frm, to) for u in top["units"]}
+        got = {c: (v["projects"], v["weeks"]) for c, v in m.occupancy(frm, to).items()}
+        assert got == ref, name
+        t_rows = timeit(lambda: compute(rows, units, None, frm, to), 5)
+        t_mat = timeit(lambda: m.occupancy(frm, to), 50)
+        print(f"{name:8s} построчно {t_rows:7.2f} мс | срез матрицы {t_mat:6.3f} мс | ×{t_rows / t_mat:.0f}")
+
+    print(f"построение: цикл {timeit(lambda: loop_build(rows, codes, origin, n_weeks), 3):7.1f} мс | "
+          f"numpy {timeit(lambda: LoadMatrix.build(rows, codes), 5):6.1f} мс")
+
+    rnd = random.Random(a.seed)
+    live = [r for r in rows if r["id"] in m._spans]
+
+    def move():
+        r = dict(rnd.choice(live))
+        s = origin + timedelta(days=rnd.randint(0, 7 * n_weeks - 301))
+        r["start"], r["end"] = s.isoformat(), (s + timedelta(days=rnd.randint(7, 300))).isoformat()
+        assert m.upsert(r)
+
+    t_move = timeit(move, 1000)
+    t_rebuild = timeit(lambda: LoadMatrix.build(rows, codes), 5)
+    print(f"move_project: upsert {t_move * 1000:6.1f} мкс | полная перестройка {t_rebuild:6.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
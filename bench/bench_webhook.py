@@ -0,0 +1,184 @@
+# bench/bench_webhook.py
+"""
+Webhook против long polling на локальной заглушке Bot API.
+
+Заглушка отвечает на getMe/getUpdates/sendMessage/setWebhook/deleteWebhook.
+Бенч шлёт N апдейтов «ping i» из разных чатов (в webhook — POST-ами с секретом,
+в polling — складывая их в очередь getUpdates) и меряет время от отправки
+апдейта до sendMessage с ответом бота.
+
+    python -m bench.bench_webhook [--n 2000] [--concurrency 50]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from aiohttp import ClientSession, web
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+
+from bot.webhook import build_app
+
+TOKEN = "42:bench"
+SECRET = "bench-secret"
+
+
+class FakeBotApi:
+    def __init__(self) -> None:
+        self.updates: List[dict] = []
+        self.arrived = asyncio.Condition()
+        self.replied: Dict[str, float] = {}
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._method)
+
+    async def push(self, update: dict) -> None:
+        async with self.arrived:
+            self.updates.append(update)
+            self.arrived.notify_all()
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        form = dict(await request.post())
+        if method == "getme":
+            return web.json_response({"ok": True, "result": {"id": 42, "is_bot": True, "first_name": "bench"}})
+        if method == "getupdates":
+            offset, timeout = int(form.get("offset") or 0), float(form.get("timeout") or 0)
+            async with self.arrived:
+                try:
+                    await asyncio.wait_for(
+                        self.arrived.wait_for(lambda: any(u["update_id"] >= offset for u in self.updates)),
+                        timeout,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                batch = [u for u in self.updates if u["update_id"] >= offset][:100]
+                self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            return web.json_response({"ok": True, "result": batch})
+        if method == "sendmessage":
+            self.replied[str(form.get("text"))] = time.perf_counter()
+            chat = int(str(form.get("chat_id")))
+            return web.json_response({"ok": True, "result": {
+                "message_id": 1, "date": int(time.time()), "text": form.get("text"),
+                "chat": {"id": chat, "type": "private"},
+            }})
+        return web.json_response({"ok": True, "result": True})
+
+
+def make_update(i: int) -> dict:
+    chat = 1000 + i
+    return {"update_id": i + 1, "message": {
+        "message_id": i + 1, "date": int(time.time()), "text": f"ping {i}",
+        "chat": {"id": chat, "type": "private"},
+        "from": {"id": chat, "is_bot": False, "first_name": "u"},
+    }}
+
+
+def make_dispatcher() -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def echo(msg: Message) -> None:
+        await msg.answer("pong " + (msg.text or "").split()[-1])
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def _wait_replies(api: FakeBotApi, n: int, deadline: float = 120.0) -> None:
+    t0 = time.perf_counter()
+    while len(api.replied) < n and time.perf_counter() - t0 < deadline:
+        await asyncio.sleep(0.01)
+
+
+def _report(name: str, sent: Dict[int, float], api: FakeBotApi, wall: float) -> None:
+    lat = sorted((api.replied[f"pong {i}"] - t) * 1000 for i, t in sent.items() if f"pong {i}" in api.replied)
+    if not lat:
+        print(f"{name:8s} ответов нет")
+        return
+    p95 = lat[int(0.95 * (len(lat) - 1))]
+    print(f"{name:8s} ответов {len(lat)}/{len(sent)}  p50 {statistics.median(lat):7.1f} мс  "
+          f"p95 {p95:7.1f} мс  {len(lat) / wall:7.0f} апд/с")
+
+
+async def bench_webhook(api_url: str, api: FakeBotApi, n: int, concurrency: int) -> None:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    dp = make_dispatcher()
+    runner = web.AppRunner(build_app(dp, bot, path="/hook", secret=SECRET), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    url = f"http://127.0.0.1:{port}/hook"
+
+    sent: Dict[int, float] = {}
+    sem = asyncio.Semaphore(concurrency)
+    t0 = time.perf_counter()
+    async with ClientSession() as http:
+        async def post(i: int) -> None:
+            async with sem:
+                sent[i] = time.perf_counter()
+                async with http.post(url, json=make_update(i),
+                                     headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as r:
+                    await r.read()
+        await asyncio.gather(*(post(i) for i in range(n)))
+        await _wait_replies(api, n)
+        wall = time.perf_counter() - t0
+        async with http.post(url, json=make_update(n)) as r:
+            assert r.status == 401, "апдейт без секрета должен отбрасываться"
+    _report("webhook", sent, api, wall)
+    await runner.cleanup()
+    await bot.session.close()
+
+
+async def bench_polling(api_url: str, api: FakeBotApi, n: int, concurrency: int) -> None:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    dp = make_dispatcher()
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=10, handle_signals=False))
+    await asyncio.sleep(0.2)
+
+    sent: Dict[int, float] = {}
+    sem = asyncio.Semaphore(concurrency)
+    t0 = time.perf_counter()
+
+    async def push(i: int) -> None:
+        async with sem:
+            sent[i] = time.perf_counter()
+            await api.push(make_update(i))
+            await asyncio.sleep(0)
+    await asyncio.gather(*(push(i) for i in range(n)))
+    await _wait_replies(api, n)
+    _report("polling", sent, api, time.perf_counter() - t0)
+    await dp.stop_polling()
+    await polling
+    await bot.session.close()
+
+
+async def run(n: int, concurrency: int) -> None:
+    for name, fn in (("webhook", bench_webhook), ("polling", bench_polling)):
+        api = FakeBotApi()
+        runner = web.AppRunner(api.app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        await fn(f"http://127.0.0.1:{port}", api, n, concurrency)
+        await runner.cleanup()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    a = ap.parse_args()
+    asyncio.run(run(a.n, a.concurrency))
+
+
+if __name__ == "__main__":
+    main()
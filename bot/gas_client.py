@@ -1,14 +1,25 @@
 # bot/gas_client.py
 from __future__ import annotations
 
+import asyncio
+import copy
+import json
+import logging
 import os
-from typing import Any, Dict, Optional
+import random
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import httpx
 from dotenv import load_dotenv, find_dotenv
 
-import asyncio
-from bot.utils.tg_utils import GAS_SEMAPHORE 
+from bot import shared
+from bot.utils.gas_sched import AIMDLimiter, GasScheduler, PRIO_BACKGROUND, PRIO_READ, PRIO_WRITE, current_chat
+from bot.utils.ttl_cache import TTLCache
+from bot.utils.breaker import CircuitBreaker
+from bot.utils.batcher import MicroBatcher
 
 # Подтягиваем .env
 load_dotenv(find_dotenv())
@@ -16,45 +27,790 @@ load_dotenv(find_dotenv())
 GAS_URL = os.getenv("GAS_URL")
 GAS_SECRET = os.getenv("GAS_SECRET")
 
+# Параметры HTTP-клиента (всё можно переопределить в .env)
+GAS_TIMEOUT = float(os.getenv("GAS_TIMEOUT", "30"))                  # общий таймаут запроса, сек
+GAS_CONNECT_TIMEOUT = float(os.getenv("GAS_CONNECT_TIMEOUT", "10"))  # установка TCP+TLS, сек
+GAS_POOL_SIZE = int(os.getenv("GAS_POOL_SIZE", "10"))                # макс. соединений в пуле
+GAS_KEEPALIVE = int(os.getenv("GAS_KEEPALIVE", "10"))                # сколько держим «тёплыми»
+GAS_KEEPALIVE_EXPIRY = float(os.getenv("GAS_KEEPALIVE_EXPIRY", "60"))  # простой до закрытия, сек
+GAS_CONCURRENCY = int(os.getenv("GAS_CONCURRENCY", "3"))             # стартовый лимит одновременных запросов
+GAS_CONCURRENCY_MIN = int(os.getenv("GAS_CONCURRENCY_MIN", "1"))     # границы адаптивного лимита
+GAS_CONCURRENCY_MAX = int(os.getenv("GAS_CONCURRENCY_MAX", "8"))
+GAS_ADAPTIVE = os.getenv("GAS_ADAPTIVE", "1") not in ("0", "false", "no")  # 0 — фиксированный GAS_CONCURRENCY
+GAS_CACHE_SIZE = int(os.getenv("GAS_CACHE_SIZE", "512"))             # записей в кэше чтений (LRU)
+GAS_SWR_MAX_AGE = float(os.getenv("GAS_SWR_MAX_AGE", "86400"))       # старше — stale_ok уже не отдаём, сек
+GAS_RETRIES = int(os.getenv("GAS_RETRIES", "2"))                     # доп. попыток для чтений
+# доп. попыток для мутаций с ключом идемпотентности; 0 — мутации не повторяем. Повтор после
+# неясного сбоя (таймаут, 5xx) — только когда скрипт подтвердил, что отбрасывает повторы
+# (см. _note_idempotency), до того — лишь если запрос заведомо не ушёл (нет соединения)
+GAS_WRITE_RETRIES = int(os.getenv("GAS_WRITE_RETRIES", "2"))
+GAS_RETRY_BASE = float(os.getenv("GAS_RETRY_BASE", "0.5"))           # база экспоненты backoff, сек
+GAS_RETRY_MAX = float(os.getenv("GAS_RETRY_MAX", "8"))               # потолок паузы между попытками, сек
+GAS_BREAKER_THRESHOLD = int(os.getenv("GAS_BREAKER_THRESHOLD", "5"))  # сбоев подряд до размыкания
+GAS_BREAKER_COOLDOWN = float(os.getenv("GAS_BREAKER_COOLDOWN", "30"))  # пауза перед пробным запросом, сек
+# Автосборка чтений в intent "batch" (окно, мс; 0 — выкл). Скрипт GAS должен понимать
+# {"intent": "batch", "args": {"calls": [{"intent", "args"}, …]}} → {"ok", "results": […]}.
+GAS_BATCH_WINDOW_MS = float(os.getenv("GAS_BATCH_WINDOW_MS", "0"))
+GAS_BATCH_MAX = int(os.getenv("GAS_BATCH_MAX", "10"))                # интентов в одном POST
+
+# интенты, которые меняют таблицу: идут в приоритетной полосе, их нельзя кэшировать/склеивать
+MUTATING_INTENTS = frozenset({
+    "add_project", "move_project", "extend_deadline", "remove_project",
+    "set_manager", "mark_paused", "mark_pending",
+})
+
+# интенты только на чтение: их безопасно склеивать (и дальше — кэшировать/повторять)
+READ_INTENTS = frozenset({
+    "get_all_load", "get_unit_load",
+    "list_units", "list_units_min", "list_units_and_managers", "list_managers",
+    "list_projects_for_unit", "list_projects_by_status", "list_active_projects",
+    "list_endings_in_month", "list_endings_within_months", "get_project_info",
+})
+
+# TTL кэша по интентам, сек. Справочники меняются редко, отчёты — после мутаций
+# (их сбрасывает _invalidate_after), так что TTL — лишь страховка от правок руками в таблице.
+CACHE_TTL: Dict[str, float] = {
+    "list_units": 600,
+    "list_units_min": 600,
+    "list_units_and_managers": 600,
+    "list_managers": 600,
+    "list_projects_for_unit": 180,
+    "list_active_projects": 180,
+    "get_project_info": 120,
+    "list_projects_by_status": 180,
+    "get_all_load": 300,
+    "get_unit_load": 300,
+    "list_endings_in_month": 300,
+    "list_endings_within_months": 300,
+}
+
+# что устаревает после успешной мутации в юните: списки проектов, статусы, отчёты
+_UNIT_DEPENDENT_INTENTS = frozenset({
+    "list_projects_for_unit", "list_active_projects", "get_project_info",
+    "list_projects_by_status",
+    "get_all_load", "get_unit_load", "list_endings_in_month", "list_endings_within_months",
+})
+
+# единственная точка допуска запросов к GAS по всему боту
+SCHEDULER = GasScheduler(GAS_CONCURRENCY)
+# лимит SCHEDULER подстраивается по задержке и ошибкам GAS
+LIMITER: Optional[AIMDLimiter] = (
+    AIMDLimiter(SCHEDULER, min_limit=GAS_CONCURRENCY_MIN, max_limit=GAS_CONCURRENCY_MAX)
+    if GAS_ADAPTIVE else None
+)
+
 
 class GasError(RuntimeError):
     pass
 
 
+class GasUnavailable(GasError):
+    """GAS считается лежащим (предохранитель разомкнут) — запрос даже не отправляли."""
+
+
 def _assert_env() -> None:
     if not GAS_URL or not GAS_SECRET:
         raise GasError("GAS_URL / GAS_SECRET не заданы (проверь .env)")
 
 
+# ========== общий HTTP-клиент ==========
+# Один долгоживущий AsyncClient на весь процесс: пул соединений + keep-alive.
+# httpx держит пул отдельно для каждого хоста, поэтому «тёплыми» остаются
+# и script.google.com, и script.googleusercontent.com (куда ведёт 302).
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _make_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(GAS_TIMEOUT, connect=GAS_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=GAS_POOL_SIZE,
+            max_keepalive_connections=GAS_KEEPALIVE,
+            keepalive_expiry=GAS_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+        verify=False,
+        trust_env=True,
+    )
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Клиент создаётся лениво, если start_client() ещё не вызывали (скрипты, отладка)."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = _make_client()
+    return _CLIENT
+
+
+async def start_client() -> None:
+    """Хук Dispatcher.startup: поднимаем общий клиент заранее."""
+    _get_client()
+
+
+async def close_client() -> None:
+    """Хук Dispatcher.shutdown: закрываем пул соединений."""
+    global _CLIENT
+    cli, _CLIENT = _CLIENT, None
+    if cli is not None and not cli.is_closed:
+        await cli.aclose()
+
+
+async def _post_raw(
+    intent: str,
+    args: Dict[str, Any],
+    user: Optional[Dict[str, Any]],
+    priority: int,
+) -> Dict[str, Any]:
+    """Один HTTP-запрос к GAS через планировщик и общий пул."""
+    payload = {
+        "key": GAS_SECRET,
+        "intent": intent,
+        "args": args,
+        "user": user or {},
+    }
+    async with SCHEDULER.slot(priority, current_chat.get()):
+        t0 = time.monotonic()
+        try:
+            r = await _get_client().post(GAS_URL, json=payload)
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            if LIMITER is not None and _is_overload(e):
+                LIMITER.on_failure()
+            raise
+        if LIMITER is not None:
+            LIMITER.on_success(intent, time.monotonic() - t0)
+        return data
+
+
+async def _post(
+    intent: str,
+    args: Dict[str, Any],
+    user: Optional[Dict[str, Any]],
+    priority: int,
+) -> Dict[str, Any]:
+    """Чтения при включённой автосборке уходят через батчер, остальное — напрямую."""
+    if _auto_batched(intent, user):
+        return await _BATCHER.submit((intent, args, priority, current_chat.get()))
+    return await _post_raw(intent, args, user, priority)
+
+
+def _auto_batched(intent: str, user: Optional[Dict[str, Any]]) -> bool:
+    return _BATCHER is not None and _BATCH_SUPPORTED is not False and intent in READ_INTENTS and not user
+
+
+# ========== batch: несколько интентов одним POST ==========
+_BATCH_SUPPORTED: Optional[bool] = None   # None — ещё не знаем, False — скрипт не умеет "batch"
+
+
+def _batch_results(resp: Any, n: int) -> Optional[List[Dict[str, Any]]]:
+    res = resp.get("results") if isinstance(resp, dict) and resp.get("ok") else None
+    return res if isinstance(res, list) and len(res) == n else None
+
+
+async def _post_batch(
+    calls: List[Tuple[str, Dict[str, Any]]],
+    priority: int,
+    *,
+    retry: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Отправить пачку одним POST. Если скрипт не поддерживает "batch" —
+    запоминаем это и дальше шлём интенты по одному (параллельно).
+    retry=True (gas_batch) — и пачка, и запросы по одному идут через предохранитель
+    и повторы, как gas_call. Автосборка чтений (_flush_batch) повторы не включает —
+    её уже обернул _call_with_retry каждого читателя, — но исход каждого HTTP-запроса
+    отмечает в предохранителе сама, один раз: иначе один сбой пачки из N читателей
+    засчитался бы N раз.
+    """
+    global _BATCH_SUPPORTED
+
+    def send(intent: str, args: Dict[str, Any]) -> Awaitable[Dict[str, Any]]:
+        if not retry:
+            return _post_once(intent, args, priority)
+        return _with_retry(lambda: _post_raw(intent, args, None, priority), _retries_for(intent, args),
+                           resend_safe=_resend_safe(intent, args))
+
+    if len(calls) == 1 or _BATCH_SUPPORTED is False:
+        return list(await asyncio.gather(*(send(i, a) for i, a in calls)))
+    envelope = {"calls": [{"intent": i, "args": a} for i, a in calls]}
+    if retry:
+        # пачку повторяем не чаще, чем самый «хрупкий» из её интентов
+        resp = await _with_retry(lambda: _post_raw("batch", envelope, None, priority),
+                                 min(_retries_for(i, a) for i, a in calls),
+                                 resend_safe=all(_resend_safe(i, a) for i, a in calls))
+    else:
+        resp = await _post_once("batch", envelope, priority)
+    results = _batch_results(resp, len(calls))
+    if results is None:
+        if _BATCH_SUPPORTED is None:
+            logging.warning("GAS: intent 'batch' не поддерживается (%s) — шлю по одному",
+                            (resp or {}).get("error") if isinstance(resp, dict) else resp)
+            _BATCH_SUPPORTED = False
+            return await _post_batch(calls, priority, retry=retry)
+        raise GasError((resp or {}).get("error") if isinstance(resp, dict) else "bad batch response")
+    _BATCH_SUPPORTED = True
+    if not retry:
+        _note_outcome(resp=next((r for r in results if _is_busy(r)), resp))
+    return results
+
+
+async def _post_once(intent: str, args: Dict[str, Any], priority: int) -> Dict[str, Any]:
+    """Один HTTP-запрос автосборки: его исход — ровно одна отметка в предохранителе."""
+    try:
+        resp = await _post_raw(intent, args, None, priority)
+    except Exception as e:
+        _note_outcome(err=e)
+        raise
+    if intent != "batch":   # у пачки смотрим ещё и ответы по отдельности — см. _post_batch
+        _note_outcome(resp=resp)
+    return resp
+
+
+async def _flush_batch(items: List[Tuple[str, Dict[str, Any], int, Any]]) -> List[Dict[str, Any]]:
+    # пачка идёт в самой приоритетной полосе из собранных, от имени первого чата
+    priority = min(p for _, _, p, _ in items)
+    token = current_chat.set(items[0][3])
+    try:
+        return await _post_batch([(i, a) for i, a, _, _ in items], priority)
+    finally:
+        current_chat.reset(token)
+
+
+_BATCHER: Optional[MicroBatcher] = (
+    MicroBatcher(_flush_batch, window=GAS_BATCH_WINDOW_MS / 1000.0, max_size=GAS_BATCH_MAX)
+    if GAS_BATCH_WINDOW_MS > 0 else None
+)
+
+
+def _never_sent(e: BaseException) -> bool:
+    """
+    Запрос заведомо не дошёл до скрипта: не дождались соединения из пула или не
+    соединились с самим GAS_URL. Обрыв на редиректе (script.googleusercontent.com)
+    сюда не относится — POST к этому моменту уже выполнен.
+    """
+    if isinstance(e, GasUnavailable):
+        return True
+    if isinstance(e, httpx.PoolTimeout):
+        return True
+    if not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return False
+    try:
+        return str(e.request.url) == GAS_URL
+    except RuntimeError:   # исключение без запроса — не знаем, куда ходили
+        return False
+
+
+def _is_overload(e: Exception) -> bool:
+    """Признак того, что GAS захлёбывается: таймаут/обрыв, 429 или 5xx."""
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        return code == 429 or code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+# ========== повторы и предохранитель ==========
+# проба, не вернувшаяся за два таймаута запроса, считается потерянной
+BREAKER = CircuitBreaker(GAS_BREAKER_THRESHOLD, GAS_BREAKER_COOLDOWN, probe_timeout=2 * GAS_TIMEOUT)
+_RETRY_STATS = {"retries": 0, "gave_up": 0, "stale_fallbacks": 0}
+
+# «скрипт занят» и прочие временные ответы Apps Script с ok=false
+_BUSY_RE = re.compile(
+    r"too many|busy|try again|timed? ?out|lock wait|service invoked|temporar|внутренняя ошибка|повторите",
+    re.I,
+)
+
+
+def _is_busy(resp: Any) -> bool:
+    return isinstance(resp, dict) and not resp.get("ok") and bool(_BUSY_RE.search(str(resp.get("error") or "")))
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: случайная пауза в [0, min(max, base·2^attempt)]."""
+    return random.uniform(0, min(GAS_RETRY_MAX, GAS_RETRY_BASE * (2 ** attempt)))
+
+
+# Отбрасывает ли скрипт повторы по idempotency_key: None — ещё не знаем, True — ответ
+# мутации подтвердил это полем "idempotent": true, False — успешная мутация пришла без него
+_IDEMPOTENCY_SUPPORTED: Optional[bool] = None
+
+
+def _note_idempotency(args: Dict[str, Any], resp: Any) -> None:
+    global _IDEMPOTENCY_SUPPORTED
+    if args.get("idempotency_key") and isinstance(resp, dict) and resp.get("ok"):
+        supported = resp.get("idempotent") is True
+        if supported != _IDEMPOTENCY_SUPPORTED:
+            logging.info("GAS: повторы мутаций по idempotency_key %s",
+                         "отбрасываются — мутации можно повторять" if supported else "не подтверждены")
+        _IDEMPOTENCY_SUPPORTED = supported
+
+
+def _retries_for(intent: str, args: Dict[str, Any]) -> int:
+    if intent in READ_INTENTS:
+        return GAS_RETRIES
+    if intent in MUTATING_INTENTS and args.get("idempotency_key"):
+        return GAS_WRITE_RETRIES
+    return 0
+
+
+def _resend_safe(intent: str, args: Dict[str, Any]) -> bool:
+    """Можно ли слать запрос повторно, если неизвестно, выполнился ли первый."""
+    if intent in MUTATING_INTENTS or intent not in READ_INTENTS:
+        return bool(args.get("idempotency_key")) and _IDEMPOTENCY_SUPPORTED is True
+    return True
+
+
+async def _with_retry(
+    send: Callable[[], Awaitable[Dict[str, Any]]],
+    retries: int,
+    *,
+    resend_safe: bool = True,
+    batched: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Вызов через предохранитель; повторяем (до retries раз) с backoff на
+    таймаутах/обрывах/429/5xx и ответах «скрипт занят».
+    resend_safe=False (мутация, а дедупликация скриптом не подтверждена) —
+    повторяем только то, что заведомо не ушло (_never_sent).
+    batched() → True: попытка уйдёт автосборкой, исход её HTTP-запроса
+    отметит _post_once — здесь его не считаем.
+    """
+    attempt = 0
+    while True:
+        if not BREAKER.allow():
+            raise GasUnavailable(
+                f"GAS временно недоступен, повторите через {int(BREAKER.retry_in()) + 1} с"
+            )
+        counted = batched is not None and batched()
+        try:
+            resp = await send()
+        except asyncio.CancelledError:
+            BREAKER.release()   # отменённая проба не должна запирать предохранитель до рестарта
+            raise
+        except Exception as e:
+            if not counted:
+                _note_outcome(err=e)
+            if not _is_overload(e):
+                raise   # GAS ответил (например, 4xx) — он жив
+            if attempt >= retries or not (resend_safe or _never_sent(e)):
+                _RETRY_STATS["gave_up"] += 1
+                raise
+        else:
+            if not counted:
+                _note_outcome(resp=resp)
+            if not _is_busy(resp):
+                return resp
+            # «timed out» от скрипта может значить и частично выполненную мутацию
+            if attempt >= retries or not resend_safe:
+                _RETRY_STATS["gave_up"] += 1
+                return resp
+        _RETRY_STATS["retries"] += 1
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def _note_outcome(resp: Any = None, err: Optional[Exception] = None) -> None:
+    """Исход одного запроса к GAS → предохранитель (и лимитер, если скрипт занят)."""
+    if err is not None:
+        if _is_overload(err):
+            BREAKER.on_failure()
+        else:
+            BREAKER.on_success()
+    elif _is_busy(resp):
+        BREAKER.on_failure()
+        if LIMITER is not None:
+            LIMITER.on_failure()
+    else:
+        BREAKER.on_success()
+
+
+async def _call_with_retry(
+    intent: str,
+    args: Dict[str, Any],
+    user: Optional[Dict[str, Any]],
+    priority: int,
+) -> Dict[str, Any]:
+    """Один интент через предохранитель и повторы (чтения; мутации — см. _resend_safe)."""
+    return await _with_retry(lambda: _post(intent, args, user, priority), _retries_for(intent, args),
+                             resend_safe=_resend_safe(intent, args),
+                             batched=lambda: _auto_batched(intent, user))
+
+
+# ========== кэш чтений ==========
+CACHE = TTLCache(GAS_CACHE_SIZE)
+_CACHE_GEN = 0   # растёт при каждой инвалидации: ответ, начатый до мутации, в кэш не кладём
+
+
+def _unit_of(args: Optional[Dict[str, Any]]) -> Optional[str]:
+    u = (args or {}).get("unit")
+    return str(u) if u not in (None, "") else None
+
+
+def _scopes_for(unit: Optional[str]) -> set:
+    """Юнит, его отдел верхнего уровня и «все юниты» (None/ALL) — их отчёты зависят от юнита."""
+    if not unit:
+        return {None, "ALL"}
+    return {unit, unit.split(".", 1)[0], None, "ALL"}
+
+
+def invalidate(intent: Optional[str] = None, unit: Optional[str] = None) -> int:
+    """
+    Сбросить кэш: по интенту и/или юниту (вместе с его отделом и сводными «по всем»).
+    Без аргументов — весь кэш.
+    """
+    global _CACHE_GEN
+    _CACHE_GEN += 1
+    scopes = _scopes_for(unit) if unit is not None else None
+    return CACHE.invalidate(
+        lambda e: (intent is None or e.intent == intent) and (scopes is None or e.unit in scopes)
+    )
+
+
+def _invalidate_after(args: Dict[str, Any]) -> None:
+    global _CACHE_GEN
+    _CACHE_GEN += 1
+    scopes = _scopes_for(_unit_of(args))
+    CACHE.invalidate(lambda e: e.intent in _UNIT_DEPENDENT_INTENTS and e.unit in scopes)
+    for fn in _MUTATION_LISTENERS:
+        try:
+            fn(args)
+        except Exception as e:
+            logging.warning("GAS: слушатель мутаций упал: %s", e)
+
+
+# ========== инвалидация между процессами (REDIS_URL) ==========
+# Кэш и зеркало живут в памяти процесса. Каждая мутация увеличивает общий счётчик
+# в Redis; перед ответом из кэша/зеркала на интент, зависящий от мутаций, процесс
+# сверяет счётчик и, если его обогнали чужие мутации, сбрасывает такие записи.
+_SHARED_GEN: Optional[int] = None   # последнее значение счётчика, уже учтённое локально
+_SHARED_STATS = {"remote_invalidations": 0, "redis_errors": 0}
+
+
+def _drop_unit_dependent() -> None:
+    """Чужая мутация в неизвестном юните: сбросить всё, что от мутаций зависит."""
+    global _CACHE_GEN
+    _CACHE_GEN += 1
+    CACHE.invalidate(lambda e: e.intent in _UNIT_DEPENDENT_INTENTS)
+    _SHARED_STATS["remote_invalidations"] += 1
+    for fn in _MUTATION_LISTENERS:
+        try:
+            fn({})
+        except Exception as e:
+            logging.warning("GAS: слушатель мутаций упал: %s", e)
+
+
+async def _shared_fresh() -> bool:
+    """
+    Можно ли верить локальным кэшу и зеркалу. Без REDIS_URL — всегда да.
+    Redis недоступен — нет: чужие мутации не видны, читаем из GAS.
+    """
+    global _SHARED_GEN
+    if not shared.enabled():
+        return True
+    try:
+        gen = int(await shared.redis_client().get(shared.key("cache_gen")) or 0)
+    except Exception as e:
+        _SHARED_STATS["redis_errors"] += 1
+        logging.warning("GAS: счётчик мутаций в Redis недоступен, читаем мимо кэша: %s", e)
+        return False
+    if gen != _SHARED_GEN:
+        _drop_unit_dependent()
+        _SHARED_GEN = gen
+    return True
+
+
+async def _announce_mutation() -> None:
+    """Сообщить остальным процессам об успешной мутации (после _invalidate_after)."""
+    global _SHARED_GEN
+    if not shared.enabled():
+        return
+    try:
+        gen = int(await shared.redis_client().incr(shared.key("cache_gen")))
+    except Exception as e:
+        _SHARED_STATS["redis_errors"] += 1
+        logging.warning("GAS: не удалось разослать инвалидацию через Redis: %s", e)
+        return
+    if _SHARED_GEN is None or gen != _SHARED_GEN + 1:
+        _drop_unit_dependent()   # между нашими мутациями были чужие
+    _SHARED_GEN = gen
+
+
+# ========== локальный источник чтений (зеркало листа, см. bot/mirror.py) ==========
+# fn(intent, args) → готовый ответ или None («не знаю / данные несвежие — иди в GAS»)
+_LOCAL_SOURCE: Optional[Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]]] = None
+_MUTATION_LISTENERS: List[Callable[[Dict[str, Any]], None]] = []
+_LOCAL_STATS = {"hits": 0}
+
+
+def set_local_source(fn: Optional[Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+    """Подключить (или снять, fn=None) локальный источник чтений — он опрашивается раньше кэша."""
+    global _LOCAL_SOURCE
+    _LOCAL_SOURCE = fn
+
+
+def add_mutation_listener(fn: Callable[[Dict[str, Any]], None]) -> None:
+    """fn(args) вызывается после каждой успешной мутации (args — аргументы мутации)."""
+    if fn not in _MUTATION_LISTENERS:
+        _MUTATION_LISTENERS.append(fn)
+
+
+def _local(intent: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if _LOCAL_SOURCE is None:
+        return None
+    try:
+        resp = _LOCAL_SOURCE(intent, args)
+    except Exception as e:
+        logging.warning("GAS: локальный источник упал на %s: %s", intent, e)
+        return None
+    if resp is not None:
+        _LOCAL_STATS["hits"] += 1
+    return resp
+
+
+def cached(intent: str, args: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Свежий ответ из зеркала или кэша без похода в GAS (или None)."""
+    resp = _local(intent, args or {})
+    if resp is not None:
+        return resp
+    e = CACHE.get_entry(_canon_key(intent, args))
+    return copy.deepcopy(e.value) if e else None
+
+
+async def _fetch_and_store(key: str, intent: str, args: Dict[str, Any],
+                           user: Optional[Dict[str, Any]], priority: int) -> Dict[str, Any]:
+    gen = _CACHE_GEN
+    resp = await _call_with_retry(intent, args, user, priority)
+    if resp and resp.get("ok") and not user and gen == _CACHE_GEN:
+        CACHE.set(key, resp, CACHE_TTL.get(intent, 60), intent=intent, unit=_unit_of(args))
+    return resp
+
+
+# ========== single-flight: склейка одинаковых чтений ==========
+_INFLIGHT: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+_SF_STATS = {"upstream": 0, "coalesced": 0}
+
+
+def _canon_key(intent: str, args: Optional[Dict[str, Any]], user: Optional[Dict[str, Any]] = None) -> str:
+    """(intent, args) в каноническом виде: порядок ключей и None-поля не важны."""
+    clean = {k: v for k, v in (args or {}).items() if v is not None}
+    key = intent + "|" + json.dumps(clean, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    if user:
+        key += "|" + json.dumps(user, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return key
+
+
+async def _single_flight(key: str, factory: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Если такой же запрос уже летит — ждём его результат, а не шлём второй.
+    Запрос живёт в отдельной задаче: отмена одного ожидающего не роняет остальных.
+    Каждый получает свою копию ответа (хэндлеры иногда правят dict на месте).
+    """
+    fut = _INFLIGHT.get(key)
+    if fut is not None:
+        _SF_STATS["coalesced"] += 1
+        return copy.deepcopy(await asyncio.shield(fut))
+
+    _SF_STATS["upstream"] += 1
+    fut = asyncio.ensure_future(factory())
+    _INFLIGHT[key] = fut
+    fut.add_done_callback(lambda _f: _INFLIGHT.pop(key, None) if _INFLIGHT.get(key) is _f else None)
+    return copy.deepcopy(await asyncio.shield(fut))
+
+
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def _with_idempotency_key(args: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+    if key is None and args.get("idempotency_key"):
+        return args
+    return {**args, "idempotency_key": key or new_idempotency_key()}
+
+
 async def gas_call(
     intent: str,
     args: Optional[Dict[str, Any]] = None,
     user: Optional[Dict[str, Any]] = None,
+    *,
+    priority: Optional[int] = None,
+    stale_ok: bool = False,
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Универсальный вызов GAS: передаём intent и args.
     follow_redirects=True — чтобы автоматически ходить по 302 с Apps Script.
     verify=False/trust_env=True — чтобы не падать на корпоративном MITM-прокси/сертификате.
+    Соединения берутся из общего пула (см. start_client/close_client).
+    priority — полоса планировщика (PRIO_*); по умолчанию мутации идут раньше чтений.
+    Чтения сначала спрашивают локальное зеркало листа (если подключено и свежее),
+    потом кэш (TTL по интенту, LRU); одинаковые одновременные — одним запросом.
+    Успешная мутация точечно сбрасывает кэш своего юнита; с REDIS_URL остальные
+    процессы узнают о ней по общему счётчику (см. _shared_fresh).
+    stale_ok=True — stale-while-revalidate: протухший (но не старше GAS_SWR_MAX_AGE)
+    ответ отдаём сразу, а в фоне обновляем. Ответ из кэша помечен "_cached_at" (unix ts).
+    Чтения повторяются с backoff; при разомкнутом предохранителе — GasUnavailable
+    или последний ответ из кэша, если он есть.
+    Мутация уходит с args.idempotency_key (свой или сгенерированный на вызов). После
+    таймаута/5xx её повторяем, только если скрипт подтвердил дедупликацию ключей
+    ("idempotent": true в ответе мутации), иначе — лишь когда запрос заведомо не ушёл.
     """
     _assert_env()
+    args = args or {}
+
+    if priority is None:
+        priority = PRIO_WRITE if intent in MUTATING_INTENTS else PRIO_READ
+
+    if intent not in READ_INTENTS:
+        if intent in MUTATING_INTENTS:
+            args = _with_idempotency_key(args, idempotency_key)
+        resp = await _call_with_retry(intent, args, user, priority)
+        if intent in MUTATING_INTENTS and resp and resp.get("ok"):
+            _note_idempotency(args, resp)
+            _invalidate_after(args)
+            await _announce_mutation()
+        return resp
+
+    key = _canon_key(intent, args, user)
+    if not user and (intent not in _UNIT_DEPENDENT_INTENTS or await _shared_fresh()):
+        resp = _local(intent, args)
+        if resp is not None:
+            return resp
+        e = CACHE.get_entry(key, allow_stale=stale_ok)
+        if e is not None and stale_ok and not e.fresh and e.age > GAS_SWR_MAX_AGE:
+            e = None
+        if e is not None:
+            if not stale_ok:
+                return copy.deepcopy(e.value)
+            if not e.fresh:
+                _revalidate_key(key, intent, args)
+            return {**copy.deepcopy(e.value), "_cached_at": e.ts}
+
+    try:
+        return await _single_flight(key, lambda: _fetch_and_store(key, intent, args, user, priority))
+    except Exception as err:
+        # GAS лежит — лучше показать последний известный ответ (любой давности), чем ошибку
+        if not (isinstance(err, GasUnavailable) or _is_overload(err)):
+            raise
+        e = None if user else CACHE.get_entry(key, allow_stale=True)
+        if e is None:
+            raise
+        _RETRY_STATS["stale_fallbacks"] += 1
+        return {**copy.deepcopy(e.value), "_cached_at": e.ts}
+
+
+async def gas_batch(
+    calls: List[Tuple[str, Optional[Dict[str, Any]]]],
+    *,
+    priority: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Несколько интентов за один поход в GAS: [(intent, args), …] → [resp, …] по порядку.
+    Свежие чтения берутся из зеркала/кэша, остальное уходит одним POST (intent "batch"),
+    ответы чтений кладутся в кэш, успешные мутации сбрасывают кэш своих юнитов.
+    """
+    _assert_env()
+    norm = [(intent, _with_idempotency_key(args or {}) if intent in MUTATING_INTENTS else args or {})
+            for intent, args in calls]
+    out: List[Optional[Dict[str, Any]]] = [None] * len(norm)
+    todo: List[int] = []
+    fresh = True
+    if any(intent in _UNIT_DEPENDENT_INTENTS for intent, _ in norm):
+        fresh = await _shared_fresh()
+    for i, (intent, args) in enumerate(norm):
+        if intent in READ_INTENTS and (fresh or intent not in _UNIT_DEPENDENT_INTENTS):
+            out[i] = _local(intent, args)
+            if out[i] is None:
+                e = CACHE.get_entry(_canon_key(intent, args))
+                out[i] = copy.deepcopy(e.value) if e is not None else None
+        if out[i] is None:
+            todo.append(i)
+    if not todo:
+        return out  # type: ignore[return-value]
+
+    if priority is None:
+        priority = PRIO_WRITE if any(norm[i][0] in MUTATING_INTENTS for i in todo) else PRIO_READ
+
+    gen = _CACHE_GEN
+    mutated = False
+    # предохранитель и повторы — те же, что у gas_call (и для пачки, и для запросов по одному)
+    results = await _post_batch([norm[i] for i in todo], priority, retry=True)
+
+    for i, resp in zip(todo, results):
+        intent, args = norm[i]
+        out[i] = resp
+        if not (resp and resp.get("ok")):
+            continue
+        if intent in MUTATING_INTENTS:
+            _note_idempotency(args, resp)
+            _invalidate_after(args)
+            mutated = True
+        elif intent in READ_INTENTS and gen == _CACHE_GEN:
+            CACHE.set(_canon_key(intent, args), copy.deepcopy(resp), CACHE_TTL.get(intent, 60),
+                      intent=intent, unit=_unit_of(args))
+    if mutated:
+        await _announce_mutation()
+    return out  # type: ignore[return-value]
+
+
+# ========== фоновое обновление ==========
+_BG_TASKS: set = set()
+
+
+def _spawn(coro: Awaitable[Any]) -> "asyncio.Task[Any]":
+    """Фоновая задача с удержанием ссылки (иначе GC может её прибить)."""
+    task = asyncio.ensure_future(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_BG_TASKS.discard)
+    return task
+
+
+async def _swallow(aw: Awaitable[Any]) -> None:
+    try:
+        await aw
+    except Exception as e:
+        logging.warning("GAS: фоновое обновление не удалось: %s", e)
+
+
+def _revalidate_key(key: str, intent: str, args: Dict[str, Any]) -> None:
+    if key in _INFLIGHT:
+        return  # уже обновляется
+    _spawn(_swallow(_single_flight(
+        key, lambda: _fetch_and_store(key, intent, args, None, PRIO_BACKGROUND)
+    )))
+
+
+async def refresh(intent: str, args: Optional[Dict[str, Any]] = None,
+                  priority: int = PRIO_BACKGROUND) -> Dict[str, Any]:
+    """Принудительно перечитать интент из GAS (мимо кэша) и положить в кэш."""
+    _assert_env()
+    args = args or {}
+    key = _canon_key(intent, args)
+    return await _single_flight(key, lambda: _fetch_and_store(key, intent, args, None, priority))
 
-    payload = {
-        "key": GAS_SECRET,
-        "intent": intent,
-        "args": args or {},
-        "user": user or {},
-    }
 
-    async with GAS_SEMAPHORE:
-        async with httpx.AsyncClient(
-            timeout=30,
-            follow_redirects=True,
-            verify=False,
-            trust_env=True,
-        ) as cli:
-            r = await cli.post(GAS_URL, json=payload)
-            r.raise_for_status()
-            return r.json()
+def revalidate(intent: str, args: Optional[Dict[str, Any]] = None) -> None:
+    """Обновить запись кэша в фоне; до завершения читатели получают прежнюю копию."""
+    _assert_env()
+    args = args or {}
+    _revalidate_key(_canon_key(intent, args), intent, args)
+
+
+def gas_stats() -> Dict[str, Any]:
+    """Метрики транспорта GAS (для /gas_stats и логов)."""
+    return {
+        "scheduler": SCHEDULER.stats(),
+        "limiter": LIMITER.stats() if LIMITER is not None else None,
+        "breaker": BREAKER.stats(),
+        "retry": {**_RETRY_STATS, "idempotency_confirmed": _IDEMPOTENCY_SUPPORTED},
+        "shared": {**_SHARED_STATS, "enabled": shared.enabled(), "gen": _SHARED_GEN},
+        "batch": {
+            "supported": _BATCH_SUPPORTED,
+            "auto": _BATCHER.stats() if _BATCHER is not None else None,
+        },
+        "single_flight": {**_SF_STATS, "inflight": len(_INFLIGHT)},
+        "cache": CACHE.stats(),
+        "local": {**_LOCAL_STATS, "attached": _LOCAL_SOURCE is not None},
+    }
 
 async def list_managers() -> dict:
     return await gas_call("list_managers", {})
@@ -72,18 +828,19 @@ async def list_projects_by_status(unit: str | None = None) -> dict:
 
 # ===== Удобные врапперы под конкретные интенты =====
 
-async def load_all(**kwargs) -> Dict[str, Any]:
+async def load_all(*, stale_ok: bool = False, **kwargs) -> Dict[str, Any]:
     """
     kwargs: from="YYYY-MM-DD", to="YYYY-MM-DD" (опционально)
+    stale_ok: отдать последний отчёт сразу и обновить в фоне (см. gas_call)
     """
-    return await gas_call("get_all_load", kwargs)
+    return await gas_call("get_all_load", kwargs, stale_ok=stale_ok)
 
 
-async def load_unit(**kwargs) -> Dict[str, Any]:
+async def load_unit(*, stale_ok: bool = False, **kwargs) -> Dict[str, Any]:
     """
     kwargs: unit="2.1" (обязательно), from/to (опционально)
     """
-    return await gas_call("get_unit_load", kwargs)
+    return await gas_call("get_unit_load", kwargs, stale_ok=stale_ok)
 
 async def list_units() -> dict:
     return await gas_call("list_units", {})
@@ -111,8 +868,8 @@ async def remove_project(**kwargs) -> Dict[str, Any]:
 async def set_manager(**kwargs) -> Dict[str, Any]:
     return await gas_call("set_manager", kwargs)
 
-async def list_units_min() -> dict:
-    return await gas_call("list_units_min", {})
+async def list_units_min(stale_ok: bool = False) -> dict:
+    return await gas_call("list_units_min", {}, stale_ok=stale_ok)
 
 async def list_active_projects(unit: str) -> dict:
     return await gas_call("list_active_projects", {"unit": unit})
@@ -128,11 +885,11 @@ async def mark_pending(unit: str, project: str) -> dict:
     return await gas_call("mark_pending", {"unit": unit, "project": project})
 
 # === Завершения проектов ===
-async def list_endings_in_month(unit: str, month: int, year: int):
-    return await gas_call("list_endings_in_month", {"unit": unit, "month": month, "year": year})
+async def list_endings_in_month(unit: str, month: int, year: int, stale_ok: bool = False):
+    return await gas_call("list_endings_in_month", {"unit": unit, "month": month, "year": year}, stale_ok=stale_ok)
 
-async def list_endings_within_months(unit: str, n: int):
-    return await gas_call("list_endings_within_months", {"unit": unit, "months": n})
+async def list_endings_within_months(unit: str, n: int, stale_ok: bool = False):
+    return await gas_call("list_endings_within_months", {"unit": unit, "months": n}, stale_ok=stale_ok)
 
 async def add_project(unit: str, project: str, start: str | None = None, end: str | None = None, manager: str | None = None) -> dict:
     payload: dict = {"unit": unit, "project": project}
@@ -1,7 +1,7 @@
 # bot/handlers/add_project.py
 from __future__ import annotations
 
-import re, asyncio
+import re, asyncio, html
 from datetime import date, timedelta, datetime
 from aiogram import Router, F
 from aiogram.fsm.state import StatesGroup, State
@@ -11,7 +11,9 @@ from aiogram.utils.markdown import hbold, hcode
 from aiogram.enums import ChatAction
 
 from ..keyboards.units import units_keyboard
-from ..gas_client import list_units_min, list_units_and_managers, add_project
+from ..gas_client import list_units_min, list_units_and_managers
+from ..write_queue import submit
+from ..list_store import LISTS
 
 from bot.utils.tg_utils import pn, strip_codes_in_text, answer_html, edit_html, split_text, gas_guard, loading_message
 
@@ -144,15 +146,17 @@ async def mgr_pick(cb: CallbackQuery, state: FSMContext):
     buttons.append([InlineKeyboardButton(text="Другое (ввести)", callback_data="addproj:mgr_manual")])
     kb = InlineKeyboardMarkup(inline_keyboard=buttons)
     await cb.message.answer("Выбери менеджера:", reply_markup=kb)
-    await state.update_data(_mgr_pool=all_mgrs)
+    await state.update_data(_mgr_ref=await LISTS.put("managers", all_mgrs))
 
 @router.callback_query(F.data.startswith("addproj:mgr_choose:"))
 async def mgr_choose(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
     idx = int((cb.data or "").split(":")[-1])
-    pool: list[str] = (await state.get_data()).get("_mgr_pool") or []
-    manager = pool[idx] if 0 <= idx < len(pool) else None
-    await state.update_data(manager=manager, _mgr_pool=None)
+    manager = await LISTS.item((await state.get_data()).get("_mgr_ref"), idx)
+    if manager is None:
+        await cb.message.answer("Список менеджеров устарел — нажми «Выбрать» ещё раз или введи вручную.")
+        return
+    await state.update_data(manager=manager, _mgr_ref=None)
     await state.set_state(AddProj.enter_dates)
     await cb.message.answer(hbold(f"Менеджер: {manager or '—'}"))
     await cb.message.answer(hbold("Даты (необязательно):"), reply_markup=_kb_date_actions())
@@ -221,20 +225,21 @@ async def on_confirm(cb: CallbackQuery, state: FSMContext):
     manager, start, end = data.get("manager"), data.get("start"), data.get("end")
     if not unit or not name:
         await cb.message.answer("Не хватает данных. Начни заново: «➕ Добавить проект»."); await state.clear(); return
-    stop = asyncio.Event()
-    typing_task = asyncio.create_task(_keep_typing(cb, stop))
-    loading = await cb.message.answer("⏳ Добавляю проект…")
+    # запись уходит в журнал и очередь; итог придёт ответом на это сообщение
+    queued = await cb.message.answer("🕓 Проект принят, добавляю в фоне…")
+    # пустые поля не шлём вовсе — как раньше gas_client.add_project
+    args = {"unit": unit, "project": name}
+    if start:   args["start"]   = start
+    if end:     args["end"]     = end
+    if manager: args["manager"] = manager
     try:
-        resp = await add_project(unit=unit, project=name, start=start, end=end, manager=manager)
-        if not resp or not resp.get("ok"): raise RuntimeError(resp.get("error") or "unknown error")
-        unit_label = resp.get("unit") or unit; row = resp.get("row"); note = resp.get("note") or "ok"
-        await loading.edit_text(
-            f"✅ Проект добавлен\n{hbold(unit_label)}\n• {name}\n"
-            f"{'(менеджер: ' + manager + ')' if manager else ''}\n"
-            f"{'(строка: ' + str(row) + ')' if row else ''}\n({note})"
+        await submit(
+            "add_project", args,
+            chat=cb.message.chat.id, reply_to=queued.message_id,
+            done=f"✅ Проект добавлен\n<b>{{unit}}</b>\n• {html.escape(name)}"
+                 + (f"\n(менеджер: {html.escape(manager)})" if manager else ""),
+            fail=f"⚠️ Ошибка при добавлении: {html.escape(name)}",
         )
         await state.clear()
     except Exception as e:
-        await loading.edit_text(f"⚠️ Ошибка при добавлении: {hcode(str(e))}")
-    finally:
-        stop.set(); typing_task.cancel()
+        await queued.edit_text(f"⚠️ Ошибка при добавлении: {hcode(str(e))}")
@@ -1,12 +1,11 @@
 # bot/handlers/change_manager.py
 from __future__ import annotations
 
-import asyncio
+import html
 from aiogram import Router, F
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.enums import ChatAction
 from aiogram.utils.markdown import hbold, hcode
 
 from ..keyboards.units import units_keyboard
@@ -14,12 +13,13 @@ from ..keyboards.projects import projects_keyboard
 from ..keyboards.main_menu import main_menu_kb
 from ..gas_client import (
     list_units_min,
-    list_projects_for_unit,
     list_managers, 
     list_units_and_managers,
-    set_manager as gas_set_manager,
+    gas_batch,
 )
 from ..utils.tg_utils import gas_guard, loading_message
+from ..write_queue import submit
+from ..list_store import LISTS
 
 router = Router(name="change_manager")
 
@@ -86,10 +86,11 @@ async def _send_sub_units(cb, top_code, page=1):
 
 async def _send_projects(cb: CallbackQuery, code, page=1, state: FSMContext | None = None):
     async with loading_message(cb, "⏳ Загружаю проекты…"):
-        resp = await list_projects_for_unit(code)
+        # менеджеров тянем тем же походом в GAS — следующий шаг возьмёт их из кэша
+        resp, _ = await gas_batch([("list_projects_for_unit", {"unit": code}), ("list_managers", {})])
     projects = resp.get("projects") or []
     if state is not None:
-        await state.update_data(_proj_pool=projects)  # <— сохранили пул
+        await state.update_data(_proj_ref=await LISTS.put(f"projects:{code}", projects))  # <— ссылка на пул
     if not projects:
         await cb.message.edit_text(f"{hbold(resp.get('unit') or code)}\nПроекты не найдены.")
         return
@@ -104,9 +105,9 @@ async def _send_managers(cb, unit, project, page=1, state=None):
     if not managers:
         await cb.message.edit_text("⚠️ В таблице не настроена валидация списка менеджеров в колонке B.")
         return
-    # сохраняем пул в state, чтобы по индексу достать имя
+    # ссылка на пул в state, чтобы по индексу достать имя
     if state:
-        await state.update_data(_mgr_pool=managers)
+        await state.update_data(_mgr_ref=await LISTS.put("managers", managers))
     kb = _managers_kb(managers, page=page, action_prefix="cm_mgr")
     await cb.message.edit_text(hbold(f"{unit}\nПроект: {project}\nВыбери менеджера:"), reply_markup=kb)
 
@@ -197,10 +198,12 @@ async def cm_proj_router(cb: CallbackQuery, state: FSMContext):
         project = token
         if token.isdigit():
             data = await state.get_data()
-            pool: list[str] = (data.get("_proj_pool") or [])
-            idx = int(token)
-            if 0 <= idx < len(pool):
-                project = pool[idx]
+            project = await LISTS.item(data.get("_proj_ref"), int(token))
+            if project is None:
+                # пул устарел (или индекс мимо) — показываем свежий список
+                await cb.message.answer("Список проектов устарел — показываю заново.")
+                await _send_projects(cb, code=unit, page=1, state=state)
+                return
         await state.update_data(unit=unit, project=project)
         await state.set_state(ChangeMgr.choose_manager)
         await _send_managers(cb, unit=unit, project=project, page=1, state=state)
@@ -231,10 +234,7 @@ async def cm_mgr_router(cb: CallbackQuery, state: FSMContext):
         token = payload.rsplit(":", 1)[-1]
         manager = None
         if token.isdigit():
-            idx = int(token)
-            pool: list[str] = (data.get("_mgr_pool") or [])
-            if 0 <= idx < len(pool):
-                manager = pool[idx]
+            manager = await LISTS.item(data.get("_mgr_ref"), int(token))
         else:
             # на случай старых кнопок
             manager = token
@@ -247,34 +247,22 @@ async def cm_mgr_router(cb: CallbackQuery, state: FSMContext):
         await _apply_manager(cb, unit=unit, project=project, manager=manager, state=state)
 
 async def _apply_manager(cb: CallbackQuery, unit: str, project: str, manager: str, state: FSMContext):
-    # сервисное «печатает…»
-    stop = asyncio.Event()
-    async def typer():
-        try:
-            while not stop.is_set():
-                await cb.bot.send_chat_action(cb.message.chat.id, ChatAction.TYPING)
-                await asyncio.sleep(3)
-        except Exception:
-            pass
-    typing_task = asyncio.create_task(typer())
-
+    # мутация уходит в журнал/очередь, итог придёт ответом на это сообщение
     try:
-        wait = await cb.message.edit_text("⏳ Ставлю менеджера…")
-        resp = await gas_set_manager(unit=unit, project=project, manager=manager)
-        if not resp or not resp.get("ok"):
-            raise RuntimeError(resp.get("error") or "unknown error")
-        unit_label = resp.get("unit") or unit
-        proj = resp.get("project") or project
-        mgr = resp.get("manager") or manager
-        await wait.edit_text(f"✅ Готово\n{hbold(unit_label)}\n• {proj}\nменеджер: {hbold(mgr)}")
+        wait = await cb.message.edit_text("🕓 Менеджер принят, ставлю в фоне…")
+        await submit(
+            "set_manager", {"unit": unit, "project": project, "manager": manager},
+            chat=cb.message.chat.id,
+            reply_to=wait.message_id if isinstance(wait, Message) else cb.message.message_id,
+            done=f"✅ Готово\n<b>{{unit}}</b>\n• {html.escape(project)}\nменеджер: {hbold(manager)}",
+            fail="⚠️ Ошибка при смене менеджера",
+        )
         await state.clear()
     except Exception as e:
         try:
             await cb.message.edit_text(f"⚠️ Ошибка при смене менеджера:\n{hcode(str(e))}")
         except Exception:
             await cb.message.answer(f"⚠️ Ошибка при смене менеджера:\n{hcode(str(e))}")
-    finally:
-        stop.set(); typing_task.cancel()
 
 # generic "home" (inline back to main menu)
 @router.callback_query(F.data == "home")
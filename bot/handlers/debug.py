@@ -1,10 +1,39 @@
 # bot/handlers/debug.py
+import json
 import logging
-from aiogram import Router
-from aiogram.types import CallbackQuery
+import os
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, Message
+from aiogram.utils.markdown import hcode
+
+from ..gas_client import gas_stats
+from ..list_store import LISTS
+from ..render_cache import render_stats
+from ..report_pages import PAGES
+from ..mirror import MIRROR
+from ..prefetch import is_ready
+from ..utils.tg_throttle import SEND_THROTTLE
+from ..write_queue import QUEUE
 
 router = Router()
 
+# Telegram id тех, кому доступны отладочные команды (через запятую); пусто — никому
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if x}
+
+def is_admin(msg: Message) -> bool:
+    return msg.from_user is not None and msg.from_user.id in ADMIN_IDS
+
+@router.message(F.text == "/gas_stats")
+async def show_gas_stats(msg: Message):
+    # очередь/ожидание планировщика и прочие метрики транспорта GAS — только админам
+    if not is_admin(msg):
+        return
+    stats = {"warm": is_ready(), **gas_stats(), "mirror": MIRROR.stats(),
+             "write_queue": QUEUE.stats(), "telegram": SEND_THROTTLE.stats(),
+             "lists": LISTS.stats(), "render": render_stats(),
+             "reports": PAGES.stats()}
+    await msg.answer(hcode(json.dumps(stats, ensure_ascii=False, indent=1)))
+
 @router.callback_query()
 async def catch_all_callbacks(cb: CallbackQuery):
     # Логируем любые callback_data, чтобы понимать — приходят ли клики
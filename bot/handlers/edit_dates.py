@@ -1,6 +1,6 @@
 # bot/handlers/edit_dates.py
 from __future__ import annotations
-import re, asyncio
+import re, asyncio, html
 from datetime import date, timedelta, datetime
 from aiogram import Router, F
 from aiogram.fsm.state import StatesGroup, State
@@ -9,14 +9,16 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.utils.markdown import hbold, hcode
 from aiogram.enums import ChatAction
 from ..keyboards.projects import projects_keyboard
-from ..gas_client import list_units_min, extend_deadline, move_project, list_projects_for_unit
-from ..gas_client import list_units_min, extend_deadline, move_project, list_projects_for_unit, get_project_info
+from ..gas_client import list_units_min, list_projects_for_unit
+from ..gas_client import list_units_min, list_projects_for_unit, get_project_info
 from ..utils.tg_utils import edit_html
 
 from ..keyboards.units import units_keyboard
-from ..gas_client import list_units_min, extend_deadline, move_project
+from ..gas_client import list_units_min
 
 from ..utils.tg_utils import edit_html, gas_guard, loading_message
+from ..write_queue import submit
+from ..list_store import LISTS
 
 router = Router(name="edit_dates")
 
@@ -156,7 +158,9 @@ async def _show_projects_list(cb: CallbackQuery, state: FSMContext, unit_code: s
         await cb.message.answer(f"⚠️ Не удалось получить проекты для UNIT {unit_code}: {err}")
         return
     projects: list[str] = resp.get("projects") or []
-    await state.update_data(unit=unit_code, _proj_list=projects, _proj_page=page)
+    # в FSM — только ссылка на список (общий для всех, кто смотрит этот юнит)
+    await state.update_data(unit=unit_code, _proj_ref=await LISTS.put(f"projects:{unit_code}", projects),
+                            _proj_page=page)
     if not projects:
         await cb.message.answer(f"В (UNIT {unit_code}) проектов не найдено.")
         return
@@ -174,8 +178,12 @@ async def on_proj_page(cb: CallbackQuery, state: FSMContext):
         page = 1
     d = await state.get_data()
     unit = d.get("unit")
-    projects: list[str] = d.get("_proj_list") or []
-    if not (unit and projects):
+    if not unit:
+        return
+    projects = await LISTS.resolve(d.get("_proj_ref"))
+    if projects is None:
+        # ссылка устарела — перечитываем список
+        await _show_projects_list(cb, state, unit_code=unit, page=page)
         return
     await state.update_data(_proj_page=page)
     kb = projects_keyboard(projects, page=page, action_prefix="edproj")
@@ -187,18 +195,20 @@ async def on_proj_page(cb: CallbackQuery, state: FSMContext):
 async def on_proj_pick(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
     d = await state.get_data()
-    projects: list[str] = d.get("_proj_list") or []
+    unit = d.get("unit")
     try:
         idx = int((cb.data or "").split(":")[-1])
     except Exception:
         idx = -1
-    if idx < 0 or idx >= len(projects):
+    name = await LISTS.item(d.get("_proj_ref"), idx)
+    if name is None:
+        if unit and await LISTS.resolve(d.get("_proj_ref")) is None:
+            await cb.message.answer("Список проектов устарел — показываю заново.")
+            await _show_projects_list(cb, state, unit_code=unit, page=d.get("_proj_page") or 1)
+            return
         await cb.message.answer("Не удалось определить проект. Попробуйте ещё раз.")
         return
 
-    name = projects[idx]
-    unit = d.get("unit")
-
     # ← тянем текущие даты проекта из GAS
     async with loading_message(cb, "⏳ Читаю текущие даты…"):
         info = await get_project_info(unit=unit, project=name)
@@ -310,23 +320,16 @@ async def on_ok(cb: CallbackQuery, state: FSMContext):
     unit, proj = d["unit"], d["project"]
     s_new, e_new = d.get("new_start"), d.get("new_end")
 
-    # индикатор загрузки
-    stop = asyncio.Event()
-    typing = asyncio.create_task(_typing(cb, stop))
-    loading = await cb.message.answer("⏳ Применяю изменения…")
-
+    # запись уходит в журнал и очередь; итог придёт ответом на это сообщение
+    queued = await cb.message.answer("🕓 Изменения приняты, применяю в фоне…")
+    if s_new and e_new:
+        intent, args = "move_project", {"unit": unit, "project": proj, "new_start": s_new, "new_end": e_new}
+    else:
+        intent, args = "extend_deadline", {"unit": unit, "project": proj, "new_end": e_new}
     try:
-        if s_new and e_new:
-            resp = await move_project(unit=unit, project=proj, new_start=s_new, new_end=e_new)
-        else:
-            resp = await extend_deadline(unit=unit, project=proj, new_end=e_new)
-
-        if not resp or not resp.get("ok"):
-            raise RuntimeError(resp.get("error") or "unknown error")
-
-        await loading.edit_text(f"✅ Готово\n{hbold(resp.get('unit') or unit)}\n• {proj}")
+        await submit(intent, args, chat=cb.message.chat.id, reply_to=queued.message_id,
+                     done=f"✅ Готово\n<b>{{unit}}</b>\n• {html.escape(proj)}",
+                     fail=f"⚠️ Сроки не изменены: {html.escape(proj)}")
         await state.clear()
     except Exception as e:
-        await loading.edit_text(f"⚠️ Ошибка: {hcode(str(e))}")
-    finally:
-        stop.set(); typing.cancel()
+        await queued.edit_text(f"⚠️ Ошибка: {hcode(str(e))}")
@@ -5,12 +5,13 @@ from aiogram.utils.markdown import hbold
 
 from ..keyboards.periods import periods_kb, PeriodCB
 from ..utils.date_ranges import period_to_range
-from ..utils.tg_utils import split_text
+from ..utils.tg_utils import pack_html, TG_LIMIT
 from ..gas_client import load_all as gas_load_all
-from bot.utils.tg_utils import strip_codes_in_text, loading_message, pn, answer_html, edit_html, gas_guard
+from ..render_cache import rendered
+from ..report_pages import send_pages
+from bot.utils.tg_utils import strip_codes_in_text, edit_html, gas_guard, stale_note
 
 import re
-from ..utils.tg_utils import split_text, strip_codes_in_text, answer_html
 
 
 router = Router(name="load_all")
@@ -25,6 +26,13 @@ def _beautify(text: str) -> str:
     # 3) убираем в конце строки " (N)" — количество недель
     t = _WEEKS_TAIL_RE.sub('', t)
     return t
+
+_NOTE_ROOM = 64  # место в первой странице под пометку stale_note — её вставляем после кэша рендера
+
+def _render(title: str, chunks: list[str]) -> list[str]:
+    # заголовок — один раз, мелкие чанки склеиваются в страницы до лимита Telegram
+    return pack_html([_beautify(chunk) for chunk in chunks], title=title, limit=TG_LIMIT - _NOTE_ROOM)
+
 @router.callback_query(F.data == "menu:load_all")
 @gas_guard()
 async def open_periods_menu(cb: CallbackQuery):
@@ -51,29 +59,26 @@ async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
         rng = period_to_range(period)  # -> {"from": "...", "to": "..."} или None
         args = rng or {}
 
-        resp = await gas_load_all(**args)
+        # последний отчёт отдаём сразу, свежий подтянется в фоне к следующему клику
+        resp = await gas_load_all(stale_ok=True, **args)
         if not (resp and resp.get("ok")):
             raise RuntimeError(resp.get("error") or "unknown error")
 
         # GAS может возвращать заранее разбитые части
         chunks = resp.get("chunks") or []
         title = hbold("Общая загруженность")
+        note = stale_note(resp)
+        head = f"{title}\n<i>{note}</i>" if note else title
 
-        # 3) Удалим плейсхолдер и отправим результат батчами
-        try:
-            await wait_msg.delete()
-        except Exception:
-            pass
-
+        # 3) Плейсхолдер превращается в отчёт: одна страница + ◀ ▶ (см. bot/report_pages.py)
         if not chunks:
-            await cb.message.answer(f"{title}\n\nНет данных за выбранный период.")
+            await edit_html(wait_msg, f"{head}\n\nНет данных за выбранный период.")
         else:
-            for chunk in chunks:
-                text = f"{title}\n\n{_beautify(chunk)}".strip()
-                for part in split_text(text, limit=3900):
-                    # HTML-режим, чтобы <b> работал
-                    await answer_html(cb, part)
-
+            # те же данные и тот же заголовок — готовые части из кэша рендера;
+            # пометка меняется каждую минуту, поэтому в ключ не входит
+            parts = rendered("get_all_load", args, chunks, title, lambda: _render(title, chunks))
+            parts[0] = head + parts[0][len(title):]
+            await send_pages(cb.message, parts, edit=wait_msg)
 
         # 4) Вернём клавиатуру выбора периода
         await cb.message.answer("Выберите период:", reply_markup=periods_kb("load_all"))
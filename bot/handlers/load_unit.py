@@ -1,16 +1,16 @@
 # bot/handlers/load_unit.py
 from __future__ import annotations
 
-import os, json, tempfile, time
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.utils.markdown import hbold
 
-from ..gas_client import list_units_min, list_active_projects
+from ..gas_client import list_units_min, list_active_projects, cached, revalidate
 from ..keyboards.units import units_keyboard
 from ..keyboards.periods import periods_kb
+from ..report_pages import send_pages
 from ..utils.tg_utils import (
-    split_text,
+    pack_html,
     strip_codes_in_text,
     loading_message,
     pn,
@@ -21,61 +21,29 @@ from ..utils.tg_utils import (
 
 router = Router(name="unit_load")
 
-# ---- простейший кэш в памяти процесса бота ----
-_UNITS_CACHE: list[dict] | None = None
-_UNITS_TS: float = 0.0
-_UNITS_TTL = 300  # 5 минут
 
-# персистентный кэш на диск — чтобы даже при перезапуске не дергать GAS
-_CACHE_FILE = os.path.join(tempfile.gettempdir(), "bot_units_cache_v2.json")
-_PERSIST_TTL = 3600  # 1 час
-
-
-async def _get_all_units(force_refresh: bool = False) -> list[dict]:
+async def _get_all_units(stale_ok: bool = False) -> list[dict]:
     """
     ВНИМАНИЕ: это помощник, НЕ хэндлер. Не вешаем @gas_guard здесь.
-    Ограничение конкуренции и «Загрузка…» ставим в вызывающих местах.
+    Кэширует сам gas_client (list_units_min), здесь только дописываем label.
     """
-    global _UNITS_CACHE, _UNITS_TS
-    now = time.time()
-
-    # 1) кэш в памяти процесса
-    if not force_refresh and _UNITS_CACHE and (now - _UNITS_TS) < _UNITS_TTL:
-        return _UNITS_CACHE
-
-    # 2) кэш на диске
-    if not force_refresh and os.path.exists(_CACHE_FILE):
-        try:
-            with open(_CACHE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if (now - float(data.get("ts", 0))) < _PERSIST_TTL and isinstance(data.get("units"), list):
-                _UNITS_CACHE = data["units"]
-                _UNITS_TS = now
-                return _UNITS_CACHE
-        except Exception:
-            pass  # игнорим битый файл
-
-    # 3) запрос к GAS
-    resp = await list_units_min()
+    resp = await list_units_min(stale_ok=stale_ok)
     if not (resp and resp.get("ok")):
         raise RuntimeError((resp or {}).get("error") or "Не удалось получить список юнитов")
+    return _with_labels(resp.get("units") or [])
 
-    units = resp.get("units") or []
+
+def _with_labels(units: list[dict]) -> list[dict]:
     for u in units:
         if not u.get("label"):
             u["label"] = f"(UNIT {u.get('code')})"
+    return units
 
-    _UNITS_CACHE = units
-    _UNITS_TS = now
-
-    # 4) сохраняем на диск
-    try:
-        with open(_CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump({"ts": now, "units": units}, f, ensure_ascii=False)
-    except Exception:
-        pass
 
-    return units
+def _cached_label(code: str) -> str:
+    """Лейбл юнита из кэша gas_client — без похода в GAS, иначе дефолт."""
+    units = _with_labels((cached("list_units_min") or {}).get("units") or [])
+    return next((u.get("label") for u in units if str(u.get("code")) == str(code)), f"(UNIT {code})")
 
 
 def _top_units(units: list[dict]) -> list[dict]:
@@ -107,26 +75,31 @@ async def _send_active_preview(cb: CallbackQuery, code: str):
     Шлёт список актуальных (не завершённых) проектов выбранного юнита.
     Обязательно показываем лоадер, т.к. это вызов к GAS.
     """
+    holder = None
     try:
-        async with loading_message(cb, "⏳ Загружаю актуальные проекты…"):
-            resp = await list_active_projects(code)
+        # «⏳»-сообщение не удаляем, а превращаем в сам список
+        holder = await answer_html(cb, "⏳ Загружаю актуальные проекты…")
+        resp = await list_active_projects(code)
 
         if not resp or not resp.get("ok"):
             err = (resp or {}).get("error") or "неизвестная ошибка"
-            await cb.message.answer(f"⚠️ Не удалось получить проекты для UNIT {code}: {err}")
+            await edit_html(holder, f"⚠️ Не удалось получить проекты для UNIT {code}: {err}")
             return
 
         chunks = resp.get("chunks") or []
         if not chunks:
-            await cb.message.answer(f"🧩 (UNIT {code})\nАктуальных проектов нет.")
+            await edit_html(holder, f"🧩 (UNIT {code})\nАктуальных проектов нет.")
             return
 
-        for ch in chunks:
-            cleaned = strip_codes_in_text(ch)
-            for part in split_text(cleaned, limit=3900):
-                await answer_html(cb, part)  # HTML, чтобы <b> работал
+        # чанки склеиваются в минимум страниц, дальше — листание ◀ ▶
+        pages = pack_html([strip_codes_in_text(ch) for ch in chunks])
+        await send_pages(cb.message, pages, edit=holder)
     except Exception as e:
-        await cb.message.answer(f"⚠️ Ошибка при загрузке проектов UNIT {code}: {e!s}")
+        err = f"⚠️ Ошибка при загрузке проектов UNIT {code}: {e!s}"
+        try:
+            await holder.edit_text(err)
+        except Exception:
+            await cb.message.answer(err)
 
 
 async def _ask_endings_period(cb: CallbackQuery, code: str, label: str | None = None):
@@ -140,14 +113,14 @@ async def _ask_endings_period(cb: CallbackQuery, code: str, label: str | None =
     )
 
 
-async def _show_top_units(msg_or_cb: Message | CallbackQuery, page: int = 1):
+async def _show_top_units(msg_or_cb: Message | CallbackQuery, page: int = 1, stale_ok: bool = False):
     loading_txt = "⏳ Загружаю отделы…"
     try:
         if isinstance(msg_or_cb, CallbackQuery):
             # для инлайн-кейса редактируем текущее сообщение → покажем лоадер
             await msg_or_cb.answer()
             await msg_or_cb.message.edit_text(loading_txt)
-            units = await _get_all_units()
+            units = await _get_all_units(stale_ok=stale_ok)
             tops = _top_units(units)
             kb = units_keyboard(
                 tops,
@@ -159,7 +132,7 @@ async def _show_top_units(msg_or_cb: Message | CallbackQuery, page: int = 1):
         else:
             # для message сначала шлём плейсхолдер «⏳», потом редактируем его же
             holder = await msg_or_cb.answer(loading_txt)
-            units = await _get_all_units()
+            units = await _get_all_units(stale_ok=stale_ok)
             tops = _top_units(units)
             kb = units_keyboard(
                 tops,
@@ -193,13 +166,10 @@ async def on_unit_load_entry(msg: Message):
 @gas_guard()
 async def on_unitload_refresh(cb: CallbackQuery):
     await cb.answer("Обновляю список…")
-    global _UNITS_CACHE, _UNITS_TS
-    _UNITS_CACHE, _UNITS_TS = None, 0.0
-    try:
-        os.remove(_CACHE_FILE)
-    except OSError:
-        pass
-    await _show_top_units(cb, page=1)
+    # не сбрасываем кэш и не ждём GAS: текущий список показываем сразу,
+    # свежий подтянется в фоне и будет на следующем клике
+    revalidate("list_units_min")
+    await _show_top_units(cb, page=1, stale_ok=True)
 
 
 @router.callback_query(F.data == "unitload_top")
@@ -259,10 +229,7 @@ async def on_unitload_sub(cb: CallbackQuery):
         await _send_active_preview(cb, code)  # ← список актуальных
         # затем — клавиатура завершений для выбранного под-юнита
         # НЕ дергаем GAS ради лейбла: используем кэш, иначе дефолт.
-        label = next(
-            (u.get("label") for u in (_UNITS_CACHE or []) if str(u.get("code")) == str(code)),
-            f"(UNIT {code})"
-        )
+        label = _cached_label(code)
         await _ask_endings_period(cb, code=code, label=label)
         return
 
@@ -274,8 +241,5 @@ async def on_unitload_show_dept(cb: CallbackQuery):
     code = (cb.data or "").split(":")[-1]
     await _send_active_preview(cb, code)
     # Для подписи снова НЕ ходим в GAS — берём лейбл из кэша или дефолт
-    label = next(
-        (u.get("label") for u in (_UNITS_CACHE or []) if str(u.get("code")) == str(code)),
-        f"(UNIT {code})"
-    )
+    label = _cached_label(code)
     await _ask_endings_period(cb, code=code, label=label)
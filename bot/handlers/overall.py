@@ -7,6 +7,8 @@ from aiogram.utils.markdown import hcode
 
 from ..gas_client import load_all
 from ..utils.periods import period_bounds
+from ..utils.tg_utils import pack_html
+from ..report_pages import send_pages
 
 router = Router(name="overall")
 
@@ -24,8 +26,13 @@ async def _send_overall_for_period(target: CallbackQuery | Message, period_key:
             raise RuntimeError(data.get("error") or "unknown error")
 
         chunks = data.get("chunks") or []
-        text = f"📊 Период: {dt_from} — {dt_to}\n\n" + "\n\n".join(chunks) if chunks else f"Данных нет за период {dt_from} — {dt_to}."
-        await msg.edit_text(text[:4096])
+        if not chunks:
+            await msg.edit_text(f"Данных нет за период {dt_from} — {dt_to}.")
+            return
+        # раньше текст обрезался до 4096 символов — теперь все страницы, листание ◀ ▶
+        head = f"📊 Период: {dt_from} — {dt_to}"
+        pages = pack_html(chunks, title=head)
+        await send_pages(msg, pages, edit=msg)
     except Exception as e:
         err = f"⚠️ Ошибка при запросе общей загруженности:\n{hcode(str(e))}"
         if isinstance(target, CallbackQuery):
@@ -10,7 +10,8 @@ from aiogram.enums import ChatAction
 
 from ..keyboards.periods import PeriodCB
 from ..utils.date_ranges import period_to_range
-from ..utils.tg_utils import split_text, answer_html
+from ..utils.tg_utils import pack_html, stale_note
+from ..report_pages import send_pages
 from ..gas_client import (
     load_all as gas_load_all,
     load_unit as gas_load_unit,
@@ -22,6 +23,7 @@ router = Router(name="period_select")
 
 @router.callback_query(PeriodCB.filter())
 async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
+    loading = None   # «⏳»-сообщение: при ошибке в него же пишем, что пошло не так
     try:
         scope = (callback_data.scope or "").replace("__", ":")   # "endings__ALL" → "endings:ALL"
         token = callback_data.period or "quarter"
@@ -33,15 +35,18 @@ async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
                 await cb.answer("Готовлю отчёт…", show_alert=False)
             except Exception:
                 pass
-            resp = await gas_load_all(**rng)
+            loading = await cb.message.answer("⏳ Формирую отчёт…")
+            resp = await gas_load_all(stale_ok=True, **rng)
             chunks = resp.get("chunks") or []
             title = hbold("📊 Общая загруженность")
+            note = stale_note(resp)
             if not chunks:
-                await cb.message.answer(f"{title}\nнет проектов в выбранном периоде")
+                await loading.edit_text(f"{title}\nнет проектов в выбранном периоде")
             else:
-                for ch in chunks:
-                    for part in split_text(ch, limit=3900):
-                        await cb.message.answer(part)
+                if note:
+                    title = f"{title}\n<i>{note}</i>"
+                # весь отчёт — одно сообщение с листанием, заголовок один раз
+                await send_pages(cb.message, pack_html(chunks, title=title), edit=loading)
             return
 
         # 2) Завершения (по всем юнитам или по конкретному)
@@ -70,36 +75,34 @@ async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
                 # 1) дергаем нужный эндпоинт GAS по выбранному периоду
                 today = date.today()
                 token = callback_data.period or "quarter"
+                # (последний список отдаём сразу, свежий подтянется в фоне)
                 if token == "this_month":
-                    resp = await list_endings_in_month(unit, month=today.month, year=today.year)
+                    resp = await list_endings_in_month(unit, month=today.month, year=today.year, stale_ok=True)
                 elif token == "next_month":
                     nm, ny = today.month + 1, today.year
                     if nm == 13:
                         nm, ny = 1, ny + 1
-                    resp = await list_endings_in_month(unit, month=nm, year=ny)
+                    resp = await list_endings_in_month(unit, month=nm, year=ny, stale_ok=True)
                 elif token == "quarter":
-                    resp = await list_endings_within_months(unit, n=3)
+                    resp = await list_endings_within_months(unit, n=3, stale_ok=True)
                 elif token == "half_year":
-                    resp = await list_endings_within_months(unit, n=6)
+                    resp = await list_endings_within_months(unit, n=6, stale_ok=True)
                 elif token == "year":
-                    resp = await list_endings_within_months(unit, n=12)
+                    resp = await list_endings_within_months(unit, n=12, stale_ok=True)
                 else:
-                    resp = await list_endings_within_months(unit, n=3)
+                    resp = await list_endings_within_months(unit, n=3, stale_ok=True)
 
                 # 2) рендер
                 chunks = resp.get("chunks") or []
-                parts = []
-                for ch in chunks:
-                    parts.extend(split_text(ch, limit=3900))
+                note = stale_note(resp)
+                # пометку видно сразу, на первой странице
+                parts = pack_html(chunks, title=f"<i>{note}</i>" if note else "") if chunks else []
 
                 if not parts:
                     await loading.edit_text("🔚 Завершения\nВ выбранный период завершений не найдено.")
                 else:
-                    # первый кусок — редактируем «⏳»-сообщение
-                    await loading.edit_text(parts[0])
-                    # остальные — как новые сообщения
-                    for p in parts[1:]:
-                        await answer_html(cb, p)
+                    # «⏳»-сообщение становится отчётом с листанием
+                    await send_pages(cb.message, parts, edit=loading)
             finally:
                 typing_task.cancel()
             return
@@ -110,13 +113,16 @@ async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
             unit = scope.split(":", 1)[1]
             rng = period_to_range(token) or {}
             args = {"unit": unit, **rng}
-            resp = await gas_load_unit(**args)
-            text = resp.get("text") or "Пусто"
-            await cb.message.answer(text[:4096])
             try:
                 await cb.answer()
             except Exception:
                 pass
+            loading = await cb.message.answer("⏳ Формирую отчёт…")
+            resp = await gas_load_unit(stale_ok=True, **args)
+            note = stale_note(resp)
+            # раньше текст обрезался до 4096 — теперь страницы с листанием
+            pages = pack_html([resp.get("text") or "Пусто"], title=f"<i>{note}</i>" if note else "")
+            await send_pages(cb.message, pages, edit=loading)
             return
 
         # 4) Неизвестный scope
@@ -124,7 +130,16 @@ async def on_period_selected(cb: CallbackQuery, callback_data: PeriodCB):
         await cb.answer()
 
     except Exception as e:
-        await cb.message.answer(f"⚠️ Ошибка при обработке периода:\n{hcode(str(e))}")
+        err = f"⚠️ Ошибка при обработке периода:\n{hcode(str(e))}"
+        edited = False
+        if loading is not None:
+            try:
+                await loading.edit_text(err)
+                edited = True
+            except Exception:
+                pass
+        if not edited:
+            await cb.message.answer(err)
         try:
             await cb.answer()
         except Exception:
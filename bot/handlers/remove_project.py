@@ -1,6 +1,7 @@
 # bot/handlers/remove_project.py
 from __future__ import annotations
 
+import html
 import re
 from typing import List, Dict, Any, Optional
 
@@ -10,8 +11,10 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.utils.markdown import hbold
 
-from ..gas_client import list_units_min, list_projects_for_unit, remove_project
+from ..gas_client import list_units_min, list_projects_for_unit
 from ..utils.tg_utils import gas_guard
+from ..write_queue import submit
+from ..list_store import LISTS
 
 router = Router(name="remove_project")
 
@@ -75,33 +78,64 @@ def _page_kb(items: List[tuple[str, str]], page: int, per_page: int,
     rows.append([("⬅️ Назад", back_cb), ("❌ Отмена", cancel_cb)])
     return _mk_kb(rows)
 
+async def _units() -> List[Dict[str, Any]]:
+    resp = await list_units_min()
+    if not resp or not resp.get("ok"):
+        raise RuntimeError((resp or {}).get("error") or "list_units_min failed")
+    return resp.get("units") or []
+
+async def _top_items() -> List[tuple[str, str]]:
+    units = await _units()
+    # сгруппируем по верхнему юниту
+    by_top: Dict[str, Dict[str, Any]] = {}
+    for u in units:
+        code = str(u.get("code") or "")
+        top = str(u.get("top") or "")
+        label = str(u.get("label") or "")
+        by_top.setdefault(top, {"top": top, "display": _strip_unit_prefix(label)})
+        # если это точный заголовок (без подюнита), используем его в качестве "display"
+        if "." not in code:
+            by_top[top]["display"] = _strip_unit_prefix(label)
+
+    tops_sorted = sorted(by_top.values(), key=lambda x: (int(x["top"]) if x["top"].isdigit() else 999, x["top"]))
+
+    # кнопки топ-юнитов
+    return [(f"UNIT {t['top']} — {t['display'] or ''}".strip(), f"del:top:{t['top']}") for t in tops_sorted]
+
+async def _unit_items(top: str) -> List[tuple[str, str]]:
+    units = await _units()
+    subs = [u for u in units if str(u.get("top")) == top and "." in str(u.get("code") or "")]
+    subs_sorted = sorted(subs, key=lambda u: tuple(int(x) if x.isdigit() else 0 for x in str(u["code"]).split(".")))
+
+    # кнопки подюнитов + "верхний UNIT без подюнита"
+    items = []
+    items.append((f"⬆️ UNIT {top} (без подюнита)", f"del:unit:{top}"))
+    for u in subs_sorted:
+        code = str(u.get("code"))
+        items.append((f"UNIT {code} — {_strip_unit_prefix(u.get('label'))}", f"del:unit:{code}"))
+    return items
+
+def _project_items(projects: List[str]) -> List[tuple[str, str]]:
+    return [(name, f"del:proj:{i}") for i, name in enumerate(projects)]
+
+async def _ref_list(state: FSMContext, ref_name: str, list_key: str, reload) -> List[Any]:
+    """Список по ссылке из FSM; устаревшую ссылку перечитываем и обновляем."""
+    data = await state.get_data()
+    items = await LISTS.resolve(data.get(ref_name))
+    if items is None:
+        items = await reload()
+        await state.update_data(**{ref_name: await LISTS.put(list_key, items)})
+    return items
+
 # ---------- STEP 0: entry ----------
 @router.message(F.text == "🗑 Удалить проект")
 async def start_delete(msg: Message, state: FSMContext):
     wait = await msg.answer("⏳ Загрузка…")
     try:
-        resp = await list_units_min()
-        if not resp or not resp.get("ok"):
-            raise RuntimeError((resp or {}).get("error") or "list_units_min failed")
-
-        units: List[Dict[str, Any]] = resp.get("units") or []
-        # сгруппируем по верхнему юниту
-        by_top: Dict[str, Dict[str, Any]] = {}
-        for u in units:
-            code = str(u.get("code") or "")
-            top = str(u.get("top") or "")
-            label = str(u.get("label") or "")
-            by_top.setdefault(top, {"top": top, "display": _strip_unit_prefix(label)})
-            # если это точный заголовок (без подюнита), используем его в качестве "display"
-            if "." not in code:
-                by_top[top]["display"] = _strip_unit_prefix(label)
-
-        tops_sorted = sorted(by_top.values(), key=lambda x: (int(x["top"]) if x["top"].isdigit() else 999, x["top"]))
-
-        # построим кнопки топ-юнитов
-        items = [(f"UNIT {t['top']} — {t['display'] or ''}".strip(), f"del:top:{t['top']}") for t in tops_sorted]
+        items = await _top_items()
         kb = _page_kb(items, page=0, per_page=10, back_cb="del:cancel", cancel_cb="del:cancel")
-        await state.update_data(_tops=items, _page=0)
+        # в FSM — ссылки на списки (bot/list_store.py), не сами списки
+        await state.update_data(_tops_ref=await LISTS.put("del:tops", items), _page=0)
         await state.set_state(DelStates.choose_top)
         await wait.edit_text(hbold("Выбери верхний UNIT"), reply_markup=kb)
     except Exception as e:
@@ -110,8 +144,7 @@ async def start_delete(msg: Message, state: FSMContext):
 # пагинация топ-юнитов
 @router.callback_query(DelStates.choose_top, F.data.startswith("del:page:"))
 async def page_tops(cb: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    items = data.get("_tops") or []
+    items = await _ref_list(state, "_tops_ref", "del:tops", _top_items)
     try:
         page = int(cb.data.split(":")[-1])
     except Exception:
@@ -127,23 +160,9 @@ async def pick_top(cb: CallbackQuery, state: FSMContext):
     top = cb.data.split(":")[-1]
     wait = await cb.message.edit_text("⏳ Загрузка…")
     try:
-        resp = await list_units_min()
-        if not resp or not resp.get("ok"):
-            raise RuntimeError((resp or {}).get("error") or "list_units_min failed")
-
-        units: List[Dict[str, Any]] = resp.get("units") or []
-        subs = [u for u in units if str(u.get("top")) == top and "." in str(u.get("code") or "")]
-        subs_sorted = sorted(subs, key=lambda u: tuple(int(x) if x.isdigit() else 0 for x in str(u["code"]).split(".")))
-
-        # кнопки подюнитов + "верхний UNIT без подюнита"
-        items = []
-        items.append((f"⬆️ UNIT {top} (без подюнита)", f"del:unit:{top}"))
-        for u in subs_sorted:
-            code = str(u.get("code"))
-            items.append((f"UNIT {code} — {_strip_unit_prefix(u.get('label'))}", f"del:unit:{code}"))
-
+        items = await _unit_items(top)
         kb = _page_kb(items, page=0, per_page=10, back_cb="del:back:tops", cancel_cb="del:cancel")
-        await state.update_data(top=top, _units=items, _page=0)
+        await state.update_data(top=top, _units_ref=await LISTS.put(f"del:units:{top}", items), _page=0)
         await state.set_state(DelStates.choose_unit)
         await wait.edit_text(hbold(f"UNIT {top} — выбери подюнит"), reply_markup=kb)
     except Exception as e:
@@ -152,9 +171,8 @@ async def pick_top(cb: CallbackQuery, state: FSMContext):
 # назад к топам
 @router.callback_query(DelStates.choose_unit, F.data == "del:back:tops")
 async def back_to_tops(cb: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    items = data.get("_tops") or []
-    page = data.get("_page") or 0
+    items = await _ref_list(state, "_tops_ref", "del:tops", _top_items)
+    page = (await state.get_data()).get("_page") or 0
     kb = _page_kb(items, page=page, per_page=10, back_cb="del:cancel", cancel_cb="del:cancel")
     await state.set_state(DelStates.choose_top)
     await cb.message.edit_text(hbold("Выбери верхний UNIT"), reply_markup=kb)
@@ -163,8 +181,8 @@ async def back_to_tops(cb: CallbackQuery, state: FSMContext):
 # пагинация подюнитов
 @router.callback_query(DelStates.choose_unit, F.data.startswith("del:page:"))
 async def page_units(cb: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    items = data.get("_units") or []
+    top = (await state.get_data()).get("top") or ""
+    items = await _ref_list(state, "_units_ref", f"del:units:{top}", lambda: _unit_items(top))
     try:
         page = int(cb.data.split(":")[-1])
     except Exception:
@@ -191,11 +209,11 @@ async def pick_unit(cb: CallbackQuery, state: FSMContext):
             await wait.edit_text(f"{hbold(unit_label)}\nПроекты не найдены.")
             return
 
-        # строим список кнопок-проектов
-        items = [(name, f"del:proj:{i}") for i, name in enumerate(projects)]
-        kb = _page_kb(items, page=0, per_page=10, back_cb="del:back:units", cancel_cb="del:cancel")
+        # кнопки-проекты строятся из списка, в FSM — только ссылка на него
+        kb = _page_kb(_project_items(projects), page=0, per_page=10, back_cb="del:back:units", cancel_cb="del:cancel")
 
-        await state.update_data(unit=unit_code, unit_label=unit_label, projects=projects, _items=items, _page=0)
+        await state.update_data(unit=unit_code, unit_label=unit_label,
+                                _proj_ref=await LISTS.put(f"projects:{unit_code}", projects), _page=0)
         await state.set_state(DelStates.choose_project)
         await wait.edit_text(hbold(f"{unit_label}\nВыбери проект для удаления:"), reply_markup=kb)
     except Exception as e:
@@ -205,19 +223,29 @@ async def pick_unit(cb: CallbackQuery, state: FSMContext):
 @router.callback_query(DelStates.choose_project, F.data == "del:back:units")
 async def back_to_units(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
-    top = data.get("top")
-    items = data.get("_units") or []
+    top = data.get("top") or ""
+    items = await _ref_list(state, "_units_ref", f"del:units:{top}", lambda: _unit_items(top))
     page = data.get("_page") or 0
     kb = _page_kb(items, page=page, per_page=10, back_cb="del:back:tops", cancel_cb="del:cancel")
     await state.set_state(DelStates.choose_unit)
     await cb.message.edit_text(hbold(f"UNIT {top} — выбери подюнит"), reply_markup=kb)
     await cb.answer()
 
+async def _projects(state: FSMContext) -> List[str]:
+    unit = (await state.get_data()).get("unit") or ""
+
+    async def reload() -> List[str]:
+        resp = await list_projects_for_unit(unit=unit)
+        if not resp or not resp.get("ok"):
+            raise RuntimeError((resp or {}).get("error") or "list_projects_for_unit failed")
+        return resp.get("projects") or []
+
+    return await _ref_list(state, "_proj_ref", f"projects:{unit}", reload)
+
 # пагинация проектов
 @router.callback_query(DelStates.choose_project, F.data.startswith("del:page:"))
 async def page_projects(cb: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    items = data.get("_items") or []
+    items = _project_items(await _projects(state))
     try:
         page = int(cb.data.split(":")[-1])
     except Exception:
@@ -231,16 +259,24 @@ async def page_projects(cb: CallbackQuery, state: FSMContext):
 @router.callback_query(DelStates.choose_project, F.data.startswith("del:proj:"))
 async def pick_project(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
-    projects: List[str] = data.get("projects") or []
     try:
         idx = int(cb.data.split(":")[-1])
     except Exception:
         await cb.answer("Ошибка выбора", show_alert=True)
         return
-    if idx < 0 or idx >= len(projects):
+    if await LISTS.resolve(data.get("_proj_ref")) is None:
+        # индекс относится к версии списка, которой уже нет — показываем свежий список
+        kb = _page_kb(_project_items(await _projects(state)), page=0, per_page=10,
+                      back_cb="del:back:units", cancel_cb="del:cancel")
+        await state.update_data(_page=0)
+        await cb.message.edit_text(hbold(f"{data.get('unit_label') or ''}\nСписок обновился, выбери проект ещё раз:"),
+                                   reply_markup=kb)
+        await cb.answer()
+        return
+    project = await LISTS.item(data.get("_proj_ref"), idx)
+    if project is None:
         await cb.answer("Проект не найден", show_alert=True)
         return
-    project = projects[idx]
 
     kb = _mk_kb([
         [("✅ Да, удалить", "del:confirm:yes"), ("↩️ Нет, назад", "del:back:proj")],
@@ -256,7 +292,7 @@ async def pick_project(cb: CallbackQuery, state: FSMContext):
 async def back_from_confirm(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     unit_label = data.get("unit_label") or ""
-    items = data.get("_items") or []
+    items = _project_items(await _projects(state))
     page = data.get("_page") or 0
     kb = _page_kb(items, page=page, per_page=10, back_cb="del:back:units", cancel_cb="del:cancel")
     await state.set_state(DelStates.choose_project)
@@ -271,14 +307,17 @@ async def do_delete(cb: CallbackQuery, state: FSMContext):
     unit_label = data.get("unit_label") or f"(UNIT {unit})"
     project = data.get("project")
 
-    wait = await cb.message.edit_text("⏳ Удаляю…")
+    wait = await cb.message.edit_text("🕓 Удаление принято, выполняю в фоне…")
     try:
-        resp = await remove_project(unit=unit, project=project)
-        if not resp or not resp.get("ok"):
-            raise RuntimeError((resp or {}).get("error") or "remove_project failed")
-        await wait.edit_text(f"🗑 Готово.\n{hbold(unit_label)}\nУдалено: {project}")
+        await submit(
+            "remove_project", {"unit": unit, "project": project},
+            chat=cb.message.chat.id,
+            reply_to=wait.message_id if isinstance(wait, Message) else cb.message.message_id,
+            done=f"🗑 Готово.\n{hbold(unit_label)}\nУдалено: {html.escape(project or '')}",
+            fail="⚠️ Ошибка при удалении",
+        )
     except Exception as e:
-        await wait.edit_text(f"⚠️ Ошибка при удалении.\n<code>{e}</code>")
+        await wait.edit_text(f"⚠️ Ошибка при удалении.\n<code>{html.escape(str(e))}</code>")
     finally:
         await state.clear()
     await cb.answer()
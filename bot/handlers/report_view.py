@@ -0,0 +1,30 @@
+# bot/handlers/report_view.py
+from __future__ import annotations
+
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery
+
+from ..report_pages import PAGES, pages_kb
+
+router = Router(name="report_view")
+
+# ◀ / ▶ в отчёте: rv:<id отчёта>:<страница>
+@router.callback_query(F.data.startswith("rv:"))
+async def on_report_page(cb: CallbackQuery):
+    parts = (cb.data or "").split(":")
+    if len(parts) != 3 or not parts[2].isdigit():
+        await cb.answer()   # rv:noop — кнопка с номером страницы
+        return
+    rid, page = parts[1], int(parts[2])
+    pages = await PAGES.load(rid)
+    if not pages:
+        await cb.answer("Отчёт устарел — запросите его заново.", show_alert=True)
+        return
+    page = min(page, len(pages) - 1)
+    try:
+        await cb.message.edit_text(pages[page], reply_markup=pages_kb(rid, page, len(pages)))
+    except TelegramBadRequest as e:
+        if "not modified" not in str(e):
+            raise
+    await cb.answer()
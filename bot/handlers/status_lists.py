@@ -7,6 +7,7 @@ from aiogram.types import Message
 from aiogram.utils.markdown import hbold
 
 from ..gas_client import list_projects_by_status
+from ..render_cache import rendered
 from bot.utils.tg_utils import pretty_name, esc, loading_message, answer_html, edit_html, split_text
 
 
@@ -61,28 +62,13 @@ async def show_status_lists(msg: Message):
     paused  = resp.get("paused")  or []
 
     want = msg.text or ""
-    if "📋" in want:
-        head = hbold("Статусы проектов по всем юнитам")
-        block = "\n\n".join([
-            _format_block("🟡 На согласовании / закрытие:", pending),
-            _format_block("⏸ На паузе / не начат:",        paused),
-        ])
-        text = f"{head}\n\n{block}"
-        for part in _split_long(text):
-            await answer_html(msg, part)
-        return
-
-    if "🟡" in want:
-        text = _format_block(hbold("🟡 На согласовании / закрытие:"), pending)
-        for part in _split_long(text):
-            await answer_html(msg, part)
-        return
-
-    if "⏸" in want:
-        text = _format_block(hbold("⏸ На паузе / не начат:"), paused)
-        for part in _split_long(text):
-            await answer_html(msg, part)
+    show = "all" if "📋" in want else "pending" if "🟡" in want else "paused" if "⏸" in want else ""
+    if not show:
         return
+    parts = rendered("list_projects_by_status", {}, (pending, paused), f"block:{show}",
+                     lambda: _split_long(_render_statuses(_format_block, show, pending, paused)))
+    for part in parts:
+        await answer_html(msg, part)
 
 # ====== Группировка с подюнитами (если используешь вторую версию) ======
 
@@ -120,6 +106,18 @@ def _format_grouped_by_unit(title: str, items: list[dict]) -> str:
         lines.append("")
     return "\n".join(lines).rstrip()
 
+def _render_statuses(fmt, show: str, pending: list[dict], paused: list[dict]) -> str:
+    if show == "all":
+        head = hbold("Статусы проектов по всем юнитам")
+        block = "\n\n".join([
+            fmt("🟡 На согласовании / закрытие:", pending),
+            fmt("⏸ На паузе / не начат:",        paused),
+        ])
+        return f"{head}\n\n{block}"
+    if show == "pending":
+        return fmt(hbold("🟡 На согласовании / закрытие:"), pending)
+    return fmt(hbold("⏸ На паузе / не начат:"), paused)
+
 async def _send_statuses(msg: Message, show: str):
     wait = await answer_html(msg, "⏳ Загрузка…")
     try:
@@ -136,34 +134,12 @@ async def _send_statuses(msg: Message, show: str):
     pending = resp.get("pending") or []
     paused  = resp.get("paused")  or []
 
-    if show == "all":
-        head = hbold("Статусы проектов по всем юнитам")
-        block = "\n\n".join([
-            _format_grouped_by_unit("🟡 На согласовании / закрытие:", pending),
-            _format_grouped_by_unit("⏸ На паузе / не начат:",        paused),
-        ])
-        text = f"{head}\n\n{block}"
-        parts = _split_long(text)
-        await edit_html(wait, parts[0])
-        for p in parts[1:]:
-            await answer_html(msg, p)
-        return
-
-    if show == "pending":
-        text = _format_grouped_by_unit(hbold("🟡 На согласовании / закрытие:"), pending)
-        parts = _split_long(text)
-        await edit_html(wait, parts[0])
-        for p in parts[1:]:
-            await answer_html(msg, p)
-        return
-
-    if show == "paused":
-        text = _format_grouped_by_unit(hbold("⏸ На паузе / не начат:"), paused)
-        parts = _split_long(text)
-        await edit_html(wait, parts[0])
-        for p in parts[1:]:
-            await answer_html(msg, p)
-        return
+    # тот же ответ GAS — готовые части из кэша рендера
+    parts = rendered("list_projects_by_status", {}, (pending, paused), f"grouped:{show}",
+                     lambda: _split_long(_render_statuses(_format_grouped_by_unit, show, pending, paused)))
+    await edit_html(wait, parts[0])
+    for p in parts[1:]:
+        await answer_html(msg, p)
 
 @router.message(F.text == "🟡 На согласовании/закрытие")
 async def show_pending(msg: Message):
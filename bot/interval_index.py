@@ -0,0 +1,132 @@
+# bot/interval_index.py
+"""
+Индексы по датам проектов для отчётов «завершения» и «загрузка за период».
+
+  IntervalTree — центрированное дерево отрезков [start, end]: все проекты,
+                 пересекающие [a, b], за O(log n + k);
+  EndIndex     — отсортированные даты окончания: завершения в [a, b] через bisect.
+
+ProjectIndex держит пару индексов на каждую область: "ALL", отдел ("2") и каждый
+юнит ниже ("2.1") — как области в period_select (endings:ALL / endings:<код>).
+Индекс неизменяемый: после синхронизации зеркало строит новый (см. bot/mirror.py).
+
+Какие проекты попадают:
+  • загрузка — active и pending (LOAD_STATUSES, как в bot/load_engine.py);
+  • завершения — тоже только active и pending (ENDING_STATUSES). Приостановленный
+    (paused) проект к своей дате окончания не завершится — в «завершения» он
+    вернётся, когда его снова переведут в active. done не попадает никуда.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .load_engine import LOAD_STATUSES
+from .sheet import parse_iso
+
+ENDING_STATUSES = ("active", "pending")
+
+Interval = Tuple[int, int, Dict[str, Any]]   # (начало, конец — ordinal дат, строка)
+
+
+class IntervalTree:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, items: List[Interval]):
+        # items непустой; центр — медиана концов отрезков
+        points = sorted(x for s, e, _ in items for x in (s, e))
+        self.center = c = points[len(points) // 2]
+        here = [it for it in items if it[0] <= c <= it[1]]
+        self.by_start = sorted(here, key=lambda it: it[0])
+        self.by_end = sorted(here, key=lambda it: it[1], reverse=True)
+        left = [it for it in items if it[1] < c]
+        right = [it for it in items if it[0] > c]
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    @classmethod
+    def build(cls, items: Iterable[Interval]) -> Optional["IntervalTree"]:
+        items = list(items)
+        return cls(items) if items else None
+
+    def overlapping(self, a: int, b: int, out: List[Dict[str, Any]]) -> None:
+        """Добавить в out строки, чьи отрезки пересекают [a, b]."""
+        node: Optional[IntervalTree] = self
+        while node is not None:
+            c = node.center
+            if b < c:
+                # всё левее центра: у отрезков узла конец ≥ c > b, отсекаем по началу
+                for s, _, row in node.by_start:
+                    if s > b:
+                        break
+                    out.append(row)
+                node = node.left
+            elif a > c:
+                for _, e, row in node.by_end:
+                    if e < a:
+                        break
+                    out.append(row)
+                node = node.right
+            else:
+                out.extend(row for _, _, row in node.by_start)
+                if node.left is not None:
+                    node.left.overlapping(a, b, out)
+                node = node.right
+
+
+class EndIndex:
+    def __init__(self, items: Iterable[Tuple[int, Dict[str, Any]]]):
+        pairs = sorted(items, key=lambda it: (it[0], it[1]["name"]))
+        self.keys = [k for k, _ in pairs]
+        self.rows = [r for _, r in pairs]
+
+    def between(self, a: int, b: int) -> List[Dict[str, Any]]:
+        """Строки с окончанием в [a, b] — по дате, затем по имени."""
+        return self.rows[bisect_left(self.keys, a):bisect_right(self.keys, b)]
+
+
+def _scopes(code: str) -> List[str]:
+    parts = code.split(".")
+    return ["ALL"] + [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+class ProjectIndex:
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        spans: Dict[str, List[Interval]] = {}
+        ends: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self.size = 0
+        for r in rows:
+            status = r.get("status", "active")
+            s, e = parse_iso(r.get("start")), parse_iso(r.get("end"))
+            scopes = _scopes(str(r["unit"]))
+            if e is not None and status in ENDING_STATUSES:
+                for sc in scopes:
+                    ends.setdefault(sc, []).append((e.toordinal(), r))
+            if status not in LOAD_STATUSES:
+                continue
+            s, e = s or e, e or s
+            if s is None or s > e:
+                continue
+            self.size += 1
+            for sc in scopes:
+                spans.setdefault(sc, []).append((s.toordinal(), e.toordinal(), r))
+        self._trees = {sc: IntervalTree.build(items) for sc, items in spans.items()}
+        self._ends = {sc: EndIndex(items) for sc, items in ends.items()}
+
+    @staticmethod
+    def _scope(unit: Optional[str]) -> str:
+        return "ALL" if not unit or str(unit).upper() == "ALL" else str(unit)
+
+    def overlapping(self, unit: Optional[str], a: Optional[date], b: Optional[date]) -> List[Dict[str, Any]]:
+        """Проекты области, пересекающие [a, b] (без границы — открыто)."""
+        tree = self._trees.get(self._scope(unit))
+        out: List[Dict[str, Any]] = []
+        if tree is not None:
+            tree.overlapping(a.toordinal() if a else 0, b.toordinal() if b else date.max.toordinal(), out)
+        return out
+
+    def ending(self, unit: Optional[str], a: date, b: date) -> List[Dict[str, Any]]:
+        """Проекты области с окончанием в [a, b], по дате окончания и имени."""
+        idx = self._ends.get(self._scope(unit))
+        return idx.between(a.toordinal(), b.toordinal()) if idx is not None else []
@@ -0,0 +1,107 @@
+# bot/list_store.py
+"""
+Общее хранилище списков для FSM-диалогов (проекты юнита, менеджеры, кнопки юнитов).
+
+Раньше каждый диалог копировал весь список в FSM-данные пользователя и
+перечитывал/переписывал его на каждом update_data. Теперь в FSM лежит только
+ссылка {"k": ключ, "v": версия} (десятки байт), а кнопки несут индекс.
+
+  • версия — хэш содержимого: одинаковые списки у сотни пользователей хранятся
+    один раз, а изменившийся список получает новую версию;
+  • ссылка разрешается в ТУ версию, которую пользователь видел на кнопках, —
+    индексы не «съезжают», даже если лист за это время поменялся;
+  • версия выпала (LIST_STORE_TTL, вытеснение, рестарт) — resolve() вернёт None,
+    хэндлер перечитывает список и показывает его заново.
+При REDIS_URL версии дублируются в Redis — ссылку разрешит любой процесс бота.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import shared
+
+LIST_STORE_TTL = int(os.getenv("LIST_STORE_TTL", "3600"))       # с; сколько живёт версия списка
+LIST_STORE_MAX = int(os.getenv("LIST_STORE_MAX", "512"))        # версий в памяти процесса
+
+Ref = Dict[str, str]
+
+
+def _version(items: Sequence[Any]) -> str:
+    raw = json.dumps(list(items), ensure_ascii=False, separators=(",", ":")).encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class ListStore:
+    def __init__(self, ttl: int = LIST_STORE_TTL, max_items: int = LIST_STORE_MAX):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items: "OrderedDict[tuple[str, str], tuple[float, List[Any]]]" = OrderedDict()
+        self.stats_ = {"put": 0, "hit": 0, "remote": 0, "stale": 0}
+
+    def _remember(self, k: str, v: str, items: List[Any]) -> None:
+        self._items[(k, v)] = (time.monotonic(), items)
+        self._items.move_to_end((k, v))
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    async def put(self, k: str, items: Sequence[Any]) -> Ref:
+        """Сохранить список (если такой версии ещё нет) и вернуть ссылку для FSM."""
+        items = [list(x) if isinstance(x, tuple) else x for x in items]   # как после JSON
+        v = _version(items)
+        self.stats_["put"] += 1
+        known = self._items.get((k, v))
+        if known is not None and time.monotonic() - known[0] < self.ttl / 2:
+            self._items.move_to_end((k, v))   # уже есть и ещё поживёт — ничего не пишем
+            return {"k": k, "v": v}
+        self._remember(k, v, items)
+        if shared.enabled():
+            try:
+                await shared.redis_client().set(shared.key("list", k, v), json.dumps(items, ensure_ascii=False),
+                                                ex=self.ttl)
+            except Exception as e:
+                logging.warning("list-store: не записал %s в Redis: %s", k, e)
+        return {"k": k, "v": v}
+
+    async def resolve(self, ref: Optional[Ref]) -> Optional[List[Any]]:
+        """Список той версии, на которую ссылается FSM; None — ссылка устарела."""
+        if not ref or "k" not in ref or "v" not in ref:
+            return None
+        k, v = ref["k"], ref["v"]
+        known = self._items.get((k, v))
+        if known is not None and time.monotonic() - known[0] < self.ttl:
+            self._items.move_to_end((k, v))
+            self.stats_["hit"] += 1
+            return known[1]
+        if shared.enabled():
+            try:
+                raw = await shared.redis_client().get(shared.key("list", k, v))
+            except Exception as e:
+                logging.warning("list-store: Redis недоступен: %s", e)
+                raw = None
+            if raw is not None:
+                items = json.loads(raw)
+                self._remember(k, v, items)
+                self.stats_["remote"] += 1
+                return items
+        self._items.pop((k, v), None)
+        self.stats_["stale"] += 1
+        return None
+
+    async def item(self, ref: Optional[Ref], idx: int) -> Optional[Any]:
+        """Элемент по индексу с кнопки; None — ссылка устарела или индекс вне списка."""
+        items = await self.resolve(ref)
+        if items is None or not 0 <= idx < len(items):
+            return None
+        return items[idx]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_, "versions": len(self._items)}
+
+
+LISTS = ListStore()
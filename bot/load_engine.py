@@ -0,0 +1,122 @@
+# bot/load_engine.py
+"""
+Расчёт загрузки по строкам листа — то же, что get_all_load / get_unit_load в GAS,
+но локально и за миллисекунды.
+
+Загрузка проекта за период — число календарных недель (с понедельника), которые
+задевает пересечение [start, end] проекта с [from, to]. Нет одной из дат — проект
+считаем точкой на известной дате; нет обеих — в загрузку не входит.
+Учитываются статусы active и pending (paused/done — нет).
+
+Результат:
+  compute()      — структура: отделы → юниты → проекты с неделями и итоги;
+  all_load()     — {"ok", "chunks"} как get_all_load (кусок на отдел, длинные режутся);
+  unit_load()    — {"ok", "chunks", "text"} как get_unit_load.
+
+Итоги по юнитам (проектов, недель) можно передать готовыми — totals
+{код: {"projects", "weeks"}}, как отдаёт LoadMatrix.occupancy(); тогда строки
+проектов берутся из rows, а заголовки юнитов и суммы по отделам — из totals.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sheet import parse_iso, split_chunks, unit_sort_key
+
+LOAD_STATUSES = ("active", "pending")
+
+Item = Tuple[str, int, date, date]   # (проект, недель, начало в периоде, конец в периоде)
+
+
+def monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def weeks_between(a: date, b: date) -> int:
+    """Сколько календарных недель (с понедельника) задевает отрезок [a, b]."""
+    return (monday(b) - monday(a)).days // 7 + 1
+
+
+def clip(row: Dict[str, Any], frm: Optional[date], to: Optional[date]) -> Optional[Tuple[date, date]]:
+    """Пересечение дат проекта с периодом (None — не пересекается или дат нет)."""
+    s, e = parse_iso(row.get("start")), parse_iso(row.get("end"))
+    s, e = s or e, e or s
+    if s is None:
+        return None
+    a = max(s, frm) if frm else s
+    b = min(e, to) if to else e
+    return (a, b) if a <= b else None
+
+
+def _in_scope(code: str, unit: Optional[str]) -> bool:
+    return not unit or code == unit or code.startswith(unit + ".")
+
+
+def compute(
+    rows: Iterable[Dict[str, Any]],
+    units: List[Dict[str, Any]],
+    unit: Optional[str] = None,
+    frm: Optional[str] = None,
+    to: Optional[str] = None,
+    totals: Optional[Dict[str, Dict[str, int]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Загрузка по отделам верхнего уровня (в порядке кодов):
+    [{"top": "2", "units": [{"code", "label", "projects": [Item…], "count", "weeks"}…], "weeks"}…]
+    Юниты без проектов в периоде и пустые отделы опускаются.
+    """
+    unit = None if not unit or str(unit).upper() == "ALL" else str(unit)
+    f, t = parse_iso(frm), parse_iso(to)
+    by_unit: Dict[str, List[Item]] = {}
+    for r in rows:
+        code = str(r["unit"])
+        if r.get("status", "active") not in LOAD_STATUSES or not _in_scope(code, unit):
+            continue
+        span = clip(r, f, t)
+        if span is not None:
+            by_unit.setdefault(code, []).append((r["name"], weeks_between(*span), span[0], span[1]))
+
+    ordered = sorted(units, key=lambda u: unit_sort_key(u["code"]))
+    out: List[Dict[str, Any]] = []
+    for top in (u for u in ordered if "." not in str(u["code"])):
+        blocks = []
+        for u in ordered:
+            items = by_unit.get(str(u["code"]))
+            if str(u.get("top") or u["code"]).split(".", 1)[0] != str(top["code"]) or not items:
+                continue
+            items.sort(key=lambda x: (x[2], x[0]))
+            tot = totals.get(str(u["code"]), {}) if totals is not None else {}
+            blocks.append({"code": str(u["code"]), "label": u.get("label", ""), "projects": items,
+                           "count": tot.get("projects", len(items)),
+                           "weeks": tot.get("weeks", sum(w for _, w, _, _ in items))})
+        if blocks:
+            out.append({"top": str(top["code"]), "units": blocks, "weeks": sum(b["weeks"] for b in blocks)})
+    return out
+
+
+def _lines(top: Dict[str, Any]) -> List[str]:
+    lines: List[str] = []
+    for b in top["units"]:
+        if lines:
+            lines.append("")
+        lines.append(f"🧩 {b['label']} — проектов: {b['count']}, недель: {b['weeks']}")
+        lines.extend(f"• {name} ({w})" for name, w, _, _ in b["projects"])
+    return lines
+
+
+def all_load(rows: Iterable[Dict[str, Any]], units: List[Dict[str, Any]],
+             frm: Optional[str] = None, to: Optional[str] = None,
+             totals: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+    chunks: List[str] = []
+    for top in compute(rows, units, None, frm, to, totals):
+        chunks.extend(split_chunks(_lines(top)))
+    return {"ok": True, "chunks": chunks}
+
+
+def unit_load(rows: Iterable[Dict[str, Any]], units: List[Dict[str, Any]], unit: str,
+              frm: Optional[str] = None, to: Optional[str] = None,
+              totals: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+    lines = [line for top in compute(rows, units, unit, frm, to, totals) for line in _lines(top)]
+    chunks = split_chunks(lines)
+    return {"ok": True, "chunks": chunks, "text": "\n\n".join(chunks)}
@@ -0,0 +1,175 @@
+# bot/load_matrix.py
+"""
+Матрица занятости «юниты × недели» (NumPy) поверх строк листа.
+
+Колонка — календарная неделя с понедельника, начиная с origin. В ячейке counts —
+сколько проектов юнита задевают неделю; сумма по срезу колонок — проекто-недели
+(«недель» в отчёте о загрузке). Ещё две матрицы — starts/ends: сколько проектов
+юнита начинается/заканчивается в неделю; по их накопленным суммам число разных
+проектов в периоде считается без прохода по строкам: начавшиеся до конца периода
+минус закончившиеся до начала.
+
+Границы периода редко совпадают с границами недель, поэтому рядом лежат те же
+starts/ends по дням (day_starts/day_ends). Проект, который задевает крайнюю неделю
+периода только днями вне [from, to] (кончился до from или начался после to),
+вычитается из итогов — они совпадают с load_engine.compute день в день.
+
+Окно матрицы подгоняется под даты проектов при построении, так что открытые
+границы периода ничего не теряют. Строится одним проходом numpy (разностный
+массив + cumsum), дальше правки точечные: upsert()/remove() трогают одну строку
+матрицы и только колонки старого и нового интервала проекта. Интервал, вылезший
+за окно, upsert() не кладёт и возвращает False — матрицу надо перестроить.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .load_engine import LOAD_STATUSES, monday
+from .sheet import parse_iso
+
+Span = Tuple[int, int, int]   # (строка юнита, первый день, последний день) — дни от origin
+
+
+class LoadMatrix:
+    def __init__(self, units: Iterable[str], origin: date, n_weeks: int):
+        self.codes: List[str] = [str(u) for u in units]
+        self.index: Dict[str, int] = {c: i for i, c in enumerate(self.codes)}
+        self.origin = monday(origin)
+        self.n_weeks = int(n_weeks)
+        shape = (len(self.codes), self.n_weeks)
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.starts = np.zeros(shape, dtype=np.int32)
+        self.ends = np.zeros(shape, dtype=np.int32)
+        self.day_starts = np.zeros((len(self.codes), 7 * self.n_weeks), dtype=np.int32)
+        self.day_ends = np.zeros_like(self.day_starts)
+        self._spans: Dict[Any, Span] = {}    # id проекта → где он лежит в матрице
+        self._cum: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # ---- колонки ----
+    def day(self, d: date) -> int:
+        return (d - self.origin).days
+
+    def _span(self, row: Dict[str, Any]) -> Optional[Span]:
+        u = self.index.get(str(row["unit"]))
+        if u is None or row.get("status", "active") not in LOAD_STATUSES:
+            return None
+        s, e = parse_iso(row.get("start")), parse_iso(row.get("end"))
+        s, e = s or e, e or s
+        if s is None or s > e:
+            return None
+        return u, self.day(s), self.day(e)
+
+    # ---- построение ----
+    @classmethod
+    def build(cls, rows: Iterable[Dict[str, Any]], units: Iterable[str]) -> "LoadMatrix":
+        """Матрица по строкам; окно — от недели самого раннего до недели самого позднего проекта."""
+        rows = list(rows)
+        n = len(rows)
+        codes = [str(u) for u in units]
+        index = {c: i for i, c in enumerate(codes)}
+        uid = np.fromiter((index.get(str(r["unit"]), -1) for r in rows), np.int64, n)
+        live = np.fromiter((r.get("status", "active") in LOAD_STATUSES for r in rows), bool, n)
+        s = np.array([r.get("start") or "NaT" for r in rows], dtype="datetime64[D]")
+        e = np.array([r.get("end") or "NaT" for r in rows], dtype="datetime64[D]")
+        s, e = np.where(np.isnat(s), e, s), np.where(np.isnat(e), s, e)
+        ok = live & (uid >= 0) & ~np.isnat(s) & (s <= e)
+        if not ok.any():
+            return cls(codes, date.today(), 1)
+        lo, hi = s[ok].min().item(), e[ok].max().item()
+        m = cls(codes, lo, (monday(hi) - monday(lo)).days // 7 + 1)
+        origin64 = np.datetime64(m.origin, "D")
+        u = uid[ok]
+        a = (s[ok] - origin64).astype(np.int64)
+        b = (e[ok] - origin64).astype(np.int64)
+        ids = [rows[i]["id"] for i in np.flatnonzero(ok)]
+        m._spans = dict(zip(ids, zip(u.tolist(), a.tolist(), b.tolist())))
+        n_units, w = len(codes), m.n_weeks
+        wa, wb = a // 7, b // 7
+        # разностный массив: +1 в первой колонке, −1 за последней; cumsum по неделям
+        diff = np.zeros(n_units * (w + 1), dtype=np.int32)
+        np.add.at(diff, u * (w + 1) + wa, 1)
+        np.add.at(diff, u * (w + 1) + wb + 1, -1)
+        m.counts = np.cumsum(diff.reshape(n_units, w + 1), axis=1, dtype=np.int32)[:, :w]
+        m.starts = np.bincount(u * w + wa, minlength=n_units * w).astype(np.int32).reshape(n_units, w)
+        m.ends = np.bincount(u * w + wb, minlength=n_units * w).astype(np.int32).reshape(n_units, w)
+        d = 7 * w
+        m.day_starts = np.bincount(u * d + a, minlength=n_units * d).astype(np.int32).reshape(n_units, d)
+        m.day_ends = np.bincount(u * d + b, minlength=n_units * d).astype(np.int32).reshape(n_units, d)
+        return m
+
+    # ---- точечные правки ----
+    def _put(self, sp: Span, sign: int) -> None:
+        u, a, b = sp
+        self.counts[u, a // 7:b // 7 + 1] += sign
+        self.starts[u, a // 7] += sign
+        self.ends[u, b // 7] += sign
+        self.day_starts[u, a] += sign
+        self.day_ends[u, b] += sign
+        self._cum = None
+
+    def remove(self, pid: Any) -> None:
+        sp = self._spans.pop(pid, None)
+        if sp is not None:
+            self._put(sp, -1)
+
+    def upsert(self, row: Dict[str, Any]) -> bool:
+        """
+        Новая или изменённая строка (move_project, extend_deadline, смена статуса).
+        False — интервал вышел за окно матрицы и не записан: нужна перестройка.
+        """
+        self.remove(row["id"])
+        sp = self._span(row)
+        if sp is None:
+            return True
+        if sp[1] < 0 or sp[2] >= 7 * self.n_weeks:
+            return False
+        self._spans[row["id"]] = sp
+        self._put(sp, +1)
+        return True
+
+    # ---- запросы ----
+    def _rows_for(self, unit: Optional[str]) -> np.ndarray:
+        if not unit or str(unit).upper() == "ALL":
+            return np.arange(len(self.codes))
+        unit = str(unit)
+        return np.array([i for i, c in enumerate(self.codes) if c == unit or c.startswith(unit + ".")],
+                        dtype=np.int64)
+
+    def occupancy(self, frm: Optional[str] = None, to: Optional[str] = None,
+                  unit: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        {код юнита: {"projects", "weeks"}} за период: срез колонок минус проекты,
+        задевшие крайние недели только днями вне периода. Юниты без проектов
+        в периоде опускаются.
+        """
+        f, t = parse_iso(frm), parse_iso(to)
+        fd = max(self.day(f), 0) if f else 0
+        td = min(self.day(t), 7 * self.n_weeks - 1) if t else 7 * self.n_weeks - 1
+        rows = self._rows_for(unit)
+        if fd > td or not len(rows):
+            return {}
+        a, b = fd // 7, td // 7
+        if self._cum is None:
+            self._cum = (np.cumsum(self.starts, axis=1), np.cumsum(self.ends, axis=1))
+        cs, ce = self._cum
+        # кончились в неделе from до from / начались в неделе to после to
+        outside = (self.day_ends[rows, 7 * a:fd].sum(axis=1)
+                   + self.day_starts[rows, td + 1:7 * b + 7].sum(axis=1))
+        weeks = self.counts[rows, a:b + 1].sum(axis=1) - outside
+        projects = cs[rows, b] - (ce[rows, a - 1] if a > 0 else 0) - outside
+        return {
+            self.codes[i]: {"projects": int(p), "weeks": int(w)}
+            for i, p, w in zip(rows, projects, weeks) if p
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "units": len(self.codes),
+            "weeks": self.n_weeks,
+            "from": self.origin.isoformat(),
+            "to": (self.origin + timedelta(weeks=self.n_weeks) - timedelta(days=1)).isoformat(),
+            "projects": len(self._spans),
+        }
@@ -17,7 +17,6 @@ load_dotenv(find_dotenv())
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from .handlers.edit_dates import router as edit_dates_router
 from .handlers.add_project import router as add_project_router
@@ -30,7 +29,32 @@ from .handlers.change_manager import router as change_manager_router
 from .handlers.status_lists import router as status_lists_router
 from .handlers.overall import router as overall_router
 from .handlers.debug import router as debug_router
+from .handlers.report_view import router as report_view_router
 from bot.handlers.remove_project import router as remove_project_router
+from .gas_client import start_client as gas_start_client, close_client as gas_close_client
+from .prefetch import start_prefetch, stop_prefetch
+from .mirror import start_mirror, stop_mirror
+from .write_queue import start_write_queue, stop_write_queue
+from .utils.tg_utils import GasChatMiddleware
+from .utils.tg_throttle import SEND_THROTTLE
+from .webhook import WEBHOOK_URL, run_webhook
+from .shared import close_shared, make_storage
+
+def include_routers(dp: Dispatcher) -> None:
+    dp.include_router(start_router)
+    dp.include_router(menu_text_router)
+    dp.include_router(load_all_router)
+    dp.include_router(add_project_router)
+    dp.include_router(period_select_router)
+    dp.include_router(edit_dates_router)
+    dp.include_router(unit_load_router)
+    dp.include_router(change_manager_router)
+    dp.include_router(status_lists_router)
+    dp.include_router(overall_router)
+    dp.include_router(remove_project_router)
+    dp.include_router(report_view_router)
+    # debug ловит все оставшиеся callback'и — только последним
+    dp.include_router(debug_router)
 
 async def main():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -44,25 +68,47 @@ async def main():
         token=token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    # все исходящие сообщения — через лимиты Telegram (чат / группа / бот) и обработку 429
+    bot.session.middleware(SEND_THROTTLE)
 
-    dp = Dispatcher(storage=MemoryStorage())
+    # FSM в памяти процесса или в Redis (REDIS_URL) — тогда можно запускать несколько процессов
+    dp = Dispatcher(storage=make_storage())
 
-    dp.include_router(start_router)
-    dp.include_router(menu_text_router)
-    dp.include_router(load_all_router)
-    dp.include_router(add_project_router)
-    dp.include_router(period_select_router)
-    dp.include_router(edit_dates_router)
-    dp.include_router(unit_load_router)
-    dp.include_router(change_manager_router)
-    dp.include_router(status_lists_router)
-    dp.include_router(overall_router)
-    dp.include_router(remove_project_router)
-    dp.include_router(debug_router)
+    # общий пул соединений к GAS живёт столько же, сколько диспетчер
+    dp.startup.register(gas_start_client)
+    # прогрев кэша (справочники + отчёты за месяц/квартал) — в фоне, рядом с приёмом апдейтов
+    dp.startup.register(start_prefetch)
+    # локальное зеркало листа (GAS_MIRROR=1): справочные чтения без похода в GAS
+    dp.startup.register(start_mirror)
+    dp.shutdown.register(stop_mirror)
+    # мутации пишутся через журнал и фоновую очередь; после рестарта журнал проигрывается
+    dp.startup.register(start_write_queue)
+    dp.shutdown.register(stop_write_queue)
+    dp.shutdown.register(stop_prefetch)
+    dp.shutdown.register(gas_close_client)
+    # клиент Redis для общих локов (если REDIS_URL задан)
+    dp.shutdown.register(close_shared)
+    # чат апдейта → честная очередь в планировщике GAS
+    dp.update.outer_middleware(GasChatMiddleware())
+
+    include_routers(dp)
 
     await setup_bot_commands(bot)
-    print("Bot started. Press Ctrl+C to stop.")
-    await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+    allowed_updates = ["message", "callback_query"]
+
+    # BOT_MODE=webhook — встроенный сервер (см. bot/webhook.py), иначе long polling
+    mode = os.getenv("BOT_MODE", "polling").strip().lower()
+    if mode == "webhook" and not WEBHOOK_URL:
+        logging.warning("BOT_MODE=webhook, но WEBHOOK_URL не задан — работаю через polling")
+        mode = "polling"
+
+    print(f"Bot started ({mode}). Press Ctrl+C to stop.")
+    if mode == "webhook":
+        await run_webhook(dp, bot, allowed_updates)
+    else:
+        # webhook, оставшийся от прошлого запуска, не даст getUpdates работать
+        await bot.delete_webhook()
+        await dp.start_polling(bot, allowed_updates=allowed_updates)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,353 @@
+# bot/mirror.py
+"""
+Локальное зеркало листа планирования (SQLite) с инкрементальной синхронизацией.
+
+GAS отдаёт интент export_rows:
+    {"since": <rev>} → {"ok", "export_version": 1, "revision", "full", "units": [...],
+                        "managers": [...], "rows": [строки, изменённые после rev], "deleted": [id, …]}
+(since=0 или неизвестная ревизия — полная выгрузка, full=true).
+Поддержку скрипт подтверждает явно: полем export_version в ответе, а отказ — кодом
+{"ok": false, "code": "UNKNOWN_INTENT"}. Только по ним зеркало и выключается;
+прочие ошибки — временные, синхронизация повторится.
+
+Пока зеркало свежее (синхронизировано не позже GAS_MIRROR_MAX_LAG назад и после
+последней мутации бота), gas_client отвечает на справочные чтения и отчёты
+о загрузке (bot/load_engine.py) и завершениях отсюда, без похода в GAS.
+Выборки за период идут через индексы дат (bot/interval_index.py): по ним
+load_engine печатает строки проектов. Итоги по юнитам в заголовках — срез
+матрицы занятости (bot/load_matrix.py): она строится на полной выгрузке, а на
+инкрементальной правятся только строки и колонки изменённых проектов.
+Иначе — обычный путь через кэш и GAS.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from . import gas_client
+from .interval_index import ProjectIndex
+from .load_engine import LOAD_STATUSES, all_load, unit_load
+from .load_matrix import LoadMatrix
+from .sheet import (
+    OPEN_STATUSES, endings_report, month_window, months_ahead_window, parse_iso,
+    project_info, projects_by_status,
+)
+from .utils.gas_sched import PRIO_BACKGROUND
+
+GAS_MIRROR = os.getenv("GAS_MIRROR", "0") in ("1", "true", "yes")     # включить зеркало
+GAS_MIRROR_PATH = os.getenv("GAS_MIRROR_PATH", ":memory:")              # файл SQLite (или в памяти)
+GAS_MIRROR_INTERVAL = float(os.getenv("GAS_MIRROR_INTERVAL", "60"))     # период синхронизации, сек
+GAS_MIRROR_MAX_LAG = float(os.getenv("GAS_MIRROR_MAX_LAG", "300"))      # старше — не отвечаем, сек
+
+EXPORT_VERSION = 1   # версия формата export_rows, которую понимает зеркало
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    code TEXT PRIMARY KEY,
+    ord  INTEGER NOT NULL,
+    top  TEXT NOT NULL,
+    data TEXT NOT NULL            -- элемент units как его отдал GAS (JSON)
+);
+CREATE TABLE IF NOT EXISTS managers (
+    name TEXT PRIMARY KEY,
+    ord  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id      INTEGER PRIMARY KEY,
+    unit    TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    manager TEXT,
+    start   TEXT,
+    end     TEXT,
+    status  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_projects_unit ON projects(unit, name);
+CREATE INDEX IF NOT EXISTS ix_projects_status ON projects(status);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v INTEGER NOT NULL
+);
+"""
+
+
+class Mirror:
+    """Хранилище зеркала и ответы на интенты в том же виде, что у GAS."""
+
+    def __init__(self, path: str = ":memory:", max_lag: float = 300.0):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+        self.max_lag = max_lag
+        r = self.db.execute("SELECT v FROM meta WHERE k='rev'").fetchone()
+        self.revision = r["v"] if r else 0
+        self.matrix: Optional[LoadMatrix] = None
+        self._idx: Optional[ProjectIndex] = None
+        self._idx_rev = -1
+        self.synced_at = 0.0    # после рестарта файл есть, но свежесть не доказана до первой синхронизации
+        self._mutations = 0     # мутаций бота, ещё не подтверждённых синхронизацией
+        self.syncs = 0
+        self.full_syncs = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ---- свежесть ----
+    def fresh(self) -> bool:
+        return (
+            self.synced_at > 0
+            and self._mutations == 0
+            and time.time() - self.synced_at < self.max_lag
+        )
+
+    def mark_dirty(self) -> None:
+        """Бот что-то поменял в листе — до следующей синхронизации отвечает GAS."""
+        self._mutations += 1
+
+    # ---- загрузка ----
+    def apply(self, resp: Dict[str, Any], *, mutations_seen: Optional[int] = None) -> int:
+        """Применить ответ export_rows. Возвращает число изменённых строк проектов."""
+        db = self.db
+        with db:
+            db.execute("DELETE FROM units")
+            db.executemany(
+                "INSERT INTO units(code, ord, top, data) VALUES (?,?,?,?)",
+                [(str(u["code"]), i, str(u.get("top") or str(u["code"]).split(".", 1)[0]),
+                  json.dumps(u, ensure_ascii=False)) for i, u in enumerate(resp.get("units") or [])],
+            )
+            db.execute("DELETE FROM managers")
+            db.executemany("INSERT OR IGNORE INTO managers(name, ord) VALUES (?,?)",
+                           [(m, i) for i, m in enumerate(resp.get("managers") or [])])
+            if resp.get("full"):
+                db.execute("DELETE FROM projects")
+            rows = resp.get("rows") or []
+            db.executemany(
+                "INSERT OR REPLACE INTO projects(id, unit, name, manager, start, end, status) "
+                "VALUES (:id, :unit, :name, :manager, :start, :end, :status)",
+                [{"manager": None, "start": None, "end": None, **r, "unit": str(r["unit"])} for r in rows],
+            )
+            deleted = resp.get("deleted") or []
+            db.executemany("DELETE FROM projects WHERE id=?", [(i,) for i in deleted])
+            self.revision = int(resp.get("revision") or 0)
+            db.execute("INSERT OR REPLACE INTO meta(k, v) VALUES ('rev', ?)", (self.revision,))
+
+        self._update_matrix(resp, rows, deleted)
+        self.syncs += 1
+        self.full_syncs += bool(resp.get("full"))
+        self.synced_at = time.time()
+        if mutations_seen is not None:
+            # мутации, случившиеся во время выгрузки, в ней могли не оказаться
+            self._mutations = max(0, self._mutations - mutations_seen)
+        return len(rows) + len(deleted)
+
+    def _update_matrix(self, resp: Dict[str, Any], rows: List[Dict[str, Any]], deleted: List[Any]) -> None:
+        codes = [r["code"] for r in self.db.execute("SELECT code FROM units ORDER BY ord")]
+        m = self.matrix
+        if not resp.get("full") and m is not None and m.codes == codes:
+            # инкрементальная выгрузка: двигаем только изменённые проекты
+            for pid in deleted:
+                m.remove(pid)
+            if all(m.upsert({**r, "unit": str(r["unit"])}) for r in rows):
+                return
+        # полная выгрузка, сменились юниты или проект вылез за окно матрицы
+        self.matrix = LoadMatrix.build(self._rows("SELECT * FROM projects"), codes)
+
+    # ---- выборки ----
+    def _units(self) -> List[Dict[str, Any]]:
+        return [json.loads(r["data"]) for r in self.db.execute("SELECT data FROM units ORDER BY ord")]
+
+    def _labels(self) -> Dict[str, str]:
+        return {u["code"]: u.get("label", "") for u in self._units()}
+
+    def _label(self, code: str) -> str:
+        r = self.db.execute("SELECT data FROM units WHERE code=?", (code,)).fetchone()
+        return json.loads(r["data"]).get("label", "") if r else f"(UNIT {code})"
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self.db.execute(sql, params)]
+
+    def list_units_min(self, **_: Any) -> Dict[str, Any]:
+        return {"ok": True, "units": self._units()}
+
+    def list_managers(self, **_: Any) -> Dict[str, Any]:
+        return {"ok": True, "managers": [r["name"] for r in self.db.execute("SELECT name FROM managers ORDER BY ord")]}
+
+    def list_projects_for_unit(self, unit: str, **_: Any) -> Dict[str, Any]:
+        unit = str(unit)
+        marks = ",".join("?" * len(OPEN_STATUSES))
+        names = [r["name"] for r in self.db.execute(
+            f"SELECT name FROM projects WHERE unit=? AND status IN ({marks}) ORDER BY id",
+            (unit, *OPEN_STATUSES),
+        )]
+        return {"ok": True, "unit": self._label(unit), "projects": names}
+
+    def get_project_info(self, unit: str, project: str, **_: Any) -> Dict[str, Any]:
+        unit = str(unit)
+        rows = self._rows(
+            "SELECT * FROM projects WHERE unit=? AND name=? AND status != 'done' ORDER BY id LIMIT 1",
+            (unit, project),
+        )
+        return project_info(rows[0] if rows else None, self._label(unit))
+
+    def list_projects_by_status(self, unit: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        q, params = "SELECT * FROM projects WHERE status IN ('pending', 'paused')", ()
+        if unit and str(unit).upper() != "ALL":
+            q, params = q + " AND (unit = ? OR unit LIKE ?)", (str(unit), f"{unit}.%")
+        return projects_by_status(self._rows(q + " ORDER BY id", params), self._labels())
+
+    def _load_rows(self, unit: Optional[str]) -> List[Dict[str, Any]]:
+        q = f"SELECT * FROM projects WHERE status IN ({','.join('?' * len(LOAD_STATUSES))})"
+        params: tuple = LOAD_STATUSES
+        if unit and str(unit).upper() != "ALL":
+            q, params = q + " AND (unit = ? OR unit LIKE ?)", params + (str(unit), f"{unit}.%")
+        return self._rows(q, params)
+
+    def _index(self) -> ProjectIndex:
+        """Индекс по датам строится лениво — один раз на ревизию."""
+        if self._idx is None or self._idx_rev != self.revision:
+            # какие статусы идут в загрузку, а какие в завершения, решает сам индекс
+            self._idx = ProjectIndex(self._rows(
+                f"SELECT * FROM projects WHERE status IN ({','.join('?' * len(OPEN_STATUSES))})", OPEN_STATUSES))
+            self._idx_rev = self.revision
+        return self._idx
+
+    def _period_rows(self, unit: Optional[str], frm: Optional[str], to: Optional[str]) -> List[Dict[str, Any]]:
+        if not frm and not to:
+            return self._load_rows(unit)
+        return self._index().overlapping(unit, parse_iso(frm), parse_iso(to))
+
+    def _totals(self, unit: Optional[str], frm: Optional[str], to: Optional[str]) -> Optional[Dict[str, Dict[str, int]]]:
+        return self.matrix.occupancy(frm, to, unit) if self.matrix is not None else None
+
+    def get_all_load(self, **kw: Any) -> Dict[str, Any]:
+        frm, to = kw.get("from"), kw.get("to")
+        return all_load(self._period_rows(None, frm, to), self._units(), frm, to, self._totals(None, frm, to))
+
+    def get_unit_load(self, unit: str, **kw: Any) -> Dict[str, Any]:
+        frm, to = kw.get("from"), kw.get("to")
+        return unit_load(self._period_rows(unit, frm, to), self._units(), str(unit), frm, to,
+                         self._totals(str(unit), frm, to))
+
+    def _endings(self, unit: Optional[str], a: date, b: date) -> Dict[str, Any]:
+        return endings_report(self._index().ending(unit, a, b), self._labels(), a, b)
+
+    def list_endings_in_month(self, month: int, year: int, unit: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        return self._endings(unit, *month_window(month, year))
+
+    def list_endings_within_months(self, months: int, unit: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        return self._endings(unit, *months_ahead_window(months))
+
+    # ---- точка входа для gas_client.set_local_source ----
+    def answer(self, intent: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        fn: Optional[Callable[..., Dict[str, Any]]] = _ANSWERS.get(intent)
+        if fn is None:
+            return None
+        if not self.fresh():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return fn(self, **args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revision": self.revision,
+            "fresh": self.fresh(),
+            "age_s": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+            "projects": self.db.execute("SELECT COUNT(*) FROM projects").fetchone()[0],
+            "pending_mutations": self._mutations,
+            "syncs": self.syncs,
+            "full_syncs": self.full_syncs,
+            "matrix": self.matrix.stats() if self.matrix is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_ANSWERS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "list_units_min": Mirror.list_units_min,
+    "list_managers": Mirror.list_managers,
+    "list_projects_for_unit": Mirror.list_projects_for_unit,
+    "get_project_info": Mirror.get_project_info,
+    "list_projects_by_status": Mirror.list_projects_by_status,
+    "get_all_load": Mirror.get_all_load,
+    "get_unit_load": Mirror.get_unit_load,
+    "list_endings_in_month": Mirror.list_endings_in_month,
+    "list_endings_within_months": Mirror.list_endings_within_months,
+}
+
+
+# ========== фоновая синхронизация ==========
+MIRROR = Mirror(GAS_MIRROR_PATH, GAS_MIRROR_MAX_LAG)
+_KICK = asyncio.Event()    # «синхронизируйся сейчас» (после мутации бота)
+_TASK: Optional[asyncio.Task] = None
+
+
+class _Unsupported(Exception):
+    pass
+
+
+async def sync(mirror: Mirror = MIRROR) -> int:
+    """Одна инкрементальная синхронизация. Возвращает число изменённых строк."""
+    seen = mirror._mutations
+    resp = await gas_client.gas_call("export_rows", {"since": mirror.revision}, priority=PRIO_BACKGROUND)
+    resp = resp or {}
+    if not resp.get("ok"):
+        err = str(resp.get("error") or "нет ответа")
+        if resp.get("code") == "UNKNOWN_INTENT":
+            raise _Unsupported(err)
+        raise gas_client.GasError(f"export_rows: {err}")
+    if resp.get("export_version") != EXPORT_VERSION:
+        raise _Unsupported(f"export_version={resp.get('export_version')!r}, нужна {EXPORT_VERSION}")
+    return mirror.apply(resp, mutations_seen=seen)
+
+
+def _on_mutation(_args: Dict[str, Any]) -> None:
+    MIRROR.mark_dirty()
+    _KICK.set()
+
+
+async def _run() -> None:
+    while True:
+        _KICK.clear()
+        try:
+            changed = await sync()
+            if changed:
+                logging.info("mirror: ревизия %s, изменено строк: %d", MIRROR.revision, changed)
+        except _Unsupported as e:
+            logging.warning("mirror: GAS не поддерживает export_rows (%s) — зеркало выключено", e)
+            gas_client.set_local_source(None)
+            return
+        except Exception as e:
+            logging.warning("mirror: синхронизация не удалась: %s", e)
+        try:
+            await asyncio.wait_for(_KICK.wait(), GAS_MIRROR_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_mirror() -> None:
+    """Хук Dispatcher.startup (при GAS_MIRROR=1)."""
+    global _TASK
+    if not GAS_MIRROR:
+        return
+    gas_client.set_local_source(MIRROR.answer)
+    gas_client.add_mutation_listener(_on_mutation)
+    if _TASK is None or _TASK.done():
+        _TASK = asyncio.create_task(_run())
+
+
+async def stop_mirror() -> None:
+    """Хук Dispatcher.shutdown."""
+    global _TASK
+    gas_client.set_local_source(None)
+    task, _TASK = _TASK, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
@@ -0,0 +1,106 @@
+# bot/prefetch.py
+"""
+Прогрев кэша gas_client после старта и периодический фоновый префетч.
+
+Всё идёт в фоновой полосе планировщика (PRIO_BACKGROUND), так что клики
+пользователей прогрев не тормозит. Частота обновления ограничена суточным
+бюджетом вызовов GAS.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import gas_client
+from .utils.date_ranges import period_to_range
+from .utils.gas_sched import PRIO_BACKGROUND
+
+GAS_PREFETCH_INTERVAL = float(os.getenv("GAS_PREFETCH_INTERVAL", "600"))             # сек, 0 — не обновлять
+GAS_PREFETCH_DAILY_BUDGET = int(os.getenv("GAS_PREFETCH_DAILY_BUDGET", "2000"))      # вызовов GAS в сутки
+
+READY = asyncio.Event()   # прогрев завершён (успешно или нет — дальше бот работает как обычно)
+_TASK: Optional[asyncio.Task] = None
+
+
+def prefetch_calls() -> List[Tuple[str, Dict[str, Any]]]:
+    """Что держим тёплым. Периоды считаем на каждый цикл — месяц/квартал сменяются."""
+    return [
+        ("list_units_min", {}),
+        ("list_managers", {}),
+        ("list_projects_by_status", {}),
+        ("get_all_load", period_to_range("this_month") or {}),
+        ("get_all_load", period_to_range("quarter") or {}),
+    ]
+
+
+def is_ready() -> bool:
+    return READY.is_set()
+
+
+def _effective_interval(n_calls: int) -> float:
+    """Интервал не чаще, чем позволяет суточный бюджет вызовов."""
+    if GAS_PREFETCH_INTERVAL <= 0:
+        return 0.0
+    if GAS_PREFETCH_DAILY_BUDGET <= 0:
+        return GAS_PREFETCH_INTERVAL
+    return max(GAS_PREFETCH_INTERVAL, 86400.0 * n_calls / GAS_PREFETCH_DAILY_BUDGET)
+
+
+async def _refresh_all() -> int:
+    """Параллельно перечитать все интенты; возвращает число неудачных."""
+    calls = prefetch_calls()
+    results = await asyncio.gather(
+        *(gas_client.refresh(intent, args, priority=PRIO_BACKGROUND) for intent, args in calls),
+        return_exceptions=True,
+    )
+    failed = 0
+    for (intent, _), res in zip(calls, results):
+        if isinstance(res, Exception) or not (res or {}).get("ok"):
+            failed += 1
+            logging.warning("prefetch: %s не обновился: %s", intent,
+                            res if isinstance(res, Exception) else (res or {}).get("error"))
+    return failed
+
+
+async def warm_up() -> None:
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    try:
+        failed = await _refresh_all()
+        logging.info("GAS warm-up: %.1fs, ошибок: %d", loop.time() - t0, failed)
+    finally:
+        READY.set()
+
+
+async def _run() -> None:
+    await warm_up()
+    while True:
+        interval = _effective_interval(len(prefetch_calls()))
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
+        try:
+            await _refresh_all()
+        except Exception as e:
+            logging.warning("prefetch: цикл упал: %s", e)
+
+
+async def start_prefetch() -> None:
+    """Хук Dispatcher.startup: прогрев идёт параллельно со start_polling."""
+    global _TASK
+    if _TASK is None or _TASK.done():
+        _TASK = asyncio.create_task(_run())
+
+
+async def stop_prefetch() -> None:
+    """Хук Dispatcher.shutdown."""
+    global _TASK
+    task, _TASK = _TASK, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
@@ -0,0 +1,60 @@
+# bot/render_cache.py
+"""
+Кэш готовых HTML-частей отчётов.
+
+Ключ — (интент, аргументы, версия данных, вариант отображения). Версия данных —
+отпечаток (blake2b по marshal) тех частей ответа GAS, из которых строится текст: у ответов
+GAS нет номера ревизии, а отпечаток одинаков для кэша, зеркала и свежего запроса
+и меняется, когда меняются данные. Повторный клик по тому же периоду
+пропускает regex-проходы, экранирование и нарезку — сразу отправка.
+Старые версии вытесняет LRU, инвалидация не нужна.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from .gas_client import _canon_key
+from .utils.ttl_cache import TTLCache
+
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))       # отрендеренных отчётов
+RENDER_CACHE_TTL = float(os.getenv("RENDER_CACHE_TTL", "3600"))      # с; версия в ключе, TTL — для памяти
+
+CACHE = TTLCache(RENDER_CACHE_SIZE)
+
+
+def data_rev(data: Any) -> str:
+    """
+    Отпечаток данных, из которых рендерится отчёт. marshal в разы быстрее json:
+    одинаковые байты — заведомо одинаковые данные; обратное не гарантировано
+    (другой порядок ключей) — это лишь лишний промах, а не чужой отчёт.
+    """
+    try:
+        raw = marshal.dumps(data)
+    except ValueError:   # даты и прочие не-marshal типы
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def rendered(
+    intent: str,
+    args: Optional[Dict[str, Any]],
+    data: Any,
+    variant: str,
+    render: Callable[[], List[str]],
+) -> List[str]:
+    """Части сообщения из кэша или render() (результат кладётся в кэш)."""
+    key = (_canon_key(intent, args), data_rev(data), variant)
+    e = CACHE.get_entry(key)
+    if e is not None:
+        return list(e.value)
+    parts = render()
+    CACHE.set(key, tuple(parts), RENDER_CACHE_TTL, intent=intent)
+    return parts
+
+
+def render_stats() -> Dict[str, Any]:
+    return CACHE.stats()
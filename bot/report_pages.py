@@ -0,0 +1,142 @@
+# bot/report_pages.py
+"""
+Просмотр длинного отчёта в одном сообщении: страница + кнопки ◀ n/N ▶.
+
+Вместо десятков сообщений подряд отправляется первая страница, навигация
+редактирует то же сообщение (см. bot/handlers/report_view.py). Страницы лежат
+в кэше: последние REPORT_MEM отчётов — в памяти, все — JSON-файлами в REPORT_DIR
+(по умолчанию во временной папке ОС), поэтому кнопки работают и после рестарта.
+Id отчёта — отпечаток страниц: одинаковый отчёт у разных пользователей — один файл.
+Файлы старше REPORT_TTL удаляются при очередной записи.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from .render_cache import data_rev
+
+REPORT_DIR = os.getenv("REPORT_DIR") or os.path.join(tempfile.gettempdir(), "rpbot_reports")  # общий том — для нескольких процессов
+REPORT_TTL = float(os.getenv("REPORT_TTL", str(7 * 24 * 3600)))   # с; сколько живут кнопки старого отчёта
+REPORT_MEM = int(os.getenv("REPORT_MEM", "64"))                    # отчётов в памяти процесса
+
+_RID_RE = re.compile(r"^[0-9a-f]{24}$")
+
+
+class ReportPages:
+    def __init__(self, path: str = REPORT_DIR, ttl: float = REPORT_TTL, mem: int = REPORT_MEM):
+        self.path = path
+        self.ttl = ttl
+        self.mem = max(1, mem)
+        self._mem: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._swept = 0.0
+        self.stats_ = {"saved": 0, "mem_hits": 0, "disk_hits": 0, "missing": 0}
+
+    def _file(self, rid: str) -> str:
+        return os.path.join(self.path, rid + ".json")
+
+    def _remember(self, rid: str, pages: List[str]) -> None:
+        self._mem[rid] = pages
+        self._mem.move_to_end(rid)
+        while len(self._mem) > self.mem:
+            self._mem.popitem(last=False)
+
+    def _write(self, rid: str, pages: List[str]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        f = self._file(rid)
+        if os.path.exists(f):
+            os.utime(f)   # продлеваем жизнь уже записанному отчёту
+        else:
+            tmp = f"{f}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"pages": pages, "ts": time.time()}, fh, ensure_ascii=False)
+            os.replace(tmp, f)
+        now = time.time()
+        if now - self._swept > 3600:
+            self._swept = now
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        for name in os.listdir(self.path):
+            p = os.path.join(self.path, name)
+            try:
+                if now - os.path.getmtime(p) > self.ttl:
+                    os.remove(p)
+            except OSError:
+                pass
+
+    def _read(self, rid: str) -> Optional[List[str]]:
+        try:
+            with open(self._file(rid), encoding="utf-8") as fh:
+                return json.load(fh).get("pages")
+        except (OSError, ValueError):
+            return None
+
+    async def save(self, pages: List[str]) -> str:
+        rid = data_rev(pages)
+        self._remember(rid, pages)
+        self.stats_["saved"] += 1
+        try:
+            await asyncio.to_thread(self._write, rid, pages)
+        except OSError as e:
+            logging.warning("report-pages: не записал отчёт %s на диск: %s", rid, e)
+        return rid
+
+    async def load(self, rid: str) -> Optional[List[str]]:
+        """Страницы отчёта или None (отчёт удалён/не найден)."""
+        if not _RID_RE.match(rid):
+            return None
+        pages = self._mem.get(rid)
+        if pages is not None:
+            self._mem.move_to_end(rid)
+            self.stats_["mem_hits"] += 1
+            return pages
+        pages = await asyncio.to_thread(self._read, rid)
+        if pages:
+            self._remember(rid, pages)
+            self.stats_["disk_hits"] += 1
+            return pages
+        self.stats_["missing"] += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_, "in_memory": len(self._mem)}
+
+
+PAGES = ReportPages()
+
+
+def pages_kb(rid: str, page: int, total: int) -> Optional[InlineKeyboardMarkup]:
+    """◀ n/N ▶ — по кругу; одна страница — без клавиатуры."""
+    if total <= 1:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="◀", callback_data=f"rv:{rid}:{(page - 1) % total}"),
+        InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data="rv:noop"),
+        InlineKeyboardButton(text="▶", callback_data=f"rv:{rid}:{(page + 1) % total}"),
+    ]])
+
+
+async def send_pages(where: Message, pages: List[str], *, edit: Optional[Message] = None) -> Message:
+    """
+    Показать отчёт одним сообщением: edit — отредактировать это сообщение
+    (например, «⏳»-плейсхолдер), иначе — новый ответ в чат where.
+    """
+    rid = await PAGES.save(pages) if len(pages) > 1 else ""
+    kb = pages_kb(rid, 0, len(pages))
+    if edit is not None:
+        try:
+            res = await edit.edit_text(pages[0], reply_markup=kb)
+            return res if isinstance(res, Message) else edit
+        except Exception:
+            pass
+    return await where.answer(pages[0], reply_markup=kb)
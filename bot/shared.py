@@ -0,0 +1,161 @@
+# bot/shared.py
+"""
+Общее состояние для нескольких процессов бота.
+
+С REDIS_URL (redis://host:6379/0 — Redis или любой сервер с тем же протоколом):
+  • FSM-состояния и данные диалогов (ChangeMgr, EditDates, AddProj, DelStates) лежат
+    в RedisStorage — апдейт пользователя может прийти в любой процесс;
+  • анти-даблклик gas_guard берёт лок в Redis: SET NX PX с токеном владельца,
+    снятие — Lua «удалить, только если токен мой». Пока хэндлер работает, лок
+    продлевается; упавший процесс отпустит его сам через REDIS_LOCK_TTL.
+Без REDIS_URL — как раньше: MemoryStorage и локи в памяти процесса.
+
+Журнал очереди записи у каждого процесса свой — задайте им разные GAS_WORKER_ID
+(см. bot/write_queue.py; без него при REDIS_URL очередь не стартует).
+
+Для разработки — tools/fake_redis.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+REDIS_URL = os.getenv("REDIS_URL", "").strip()                    # пусто — всё в памяти процесса
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "rpbot")                 # префикс всех ключей бота
+REDIS_LOCK_TTL = float(os.getenv("REDIS_LOCK_TTL", "30"))         # с; срок лока без продления
+
+# снять лок / продлить лок — только если он всё ещё наш
+LOCK_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+LOCK_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_redis: Optional[Any] = None
+
+
+def enabled() -> bool:
+    return bool(REDIS_URL)
+
+
+def redis_client() -> Any:
+    """Общий клиент redis.asyncio (пакет redis нужен только при REDIS_URL)."""
+    global _redis
+    if _redis is None:
+        from redis.asyncio import Redis
+        _redis = Redis.from_url(REDIS_URL)
+    return _redis
+
+
+def key(*parts: Any) -> str:
+    return ":".join([REDIS_PREFIX, *map(str, parts)])
+
+
+def make_storage() -> BaseStorage:
+    """Хранилище FSM для Dispatcher: Redis при REDIS_URL, иначе память процесса."""
+    if not enabled():
+        return MemoryStorage()
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+    # у хранилища свой клиент: диспетчер закрывает его сам (fsm.close на shutdown)
+    return RedisStorage.from_url(REDIS_URL, key_builder=DefaultKeyBuilder(prefix=REDIS_PREFIX))
+
+
+async def _renew(name: str, token: str) -> None:
+    ttl_ms = int(REDIS_LOCK_TTL * 1000)
+    while True:
+        await asyncio.sleep(REDIS_LOCK_TTL / 3)
+        try:
+            if not await redis_client().eval(LOCK_RENEW, 1, name, token, ttl_ms):
+                logging.warning("shared: лок %s потерян (истёк или перехвачен)", name)
+                return
+        except Exception as e:
+            logging.warning("shared: не продлил лок %s: %s", name, e)
+
+
+async def _acquire(name: str, token: str) -> bool:
+    return bool(await redis_client().set(name, token, nx=True, px=int(REDIS_LOCK_TTL * 1000)))
+
+
+@asynccontextmanager
+async def _held(name: str, token: str) -> AsyncIterator[None]:
+    renew = asyncio.create_task(_renew(name, token))
+    try:
+        yield
+    finally:
+        renew.cancel()
+        try:
+            await redis_client().eval(LOCK_RELEASE, 1, name, token)
+        except Exception as e:
+            logging.warning("shared: не снял лок %s (истечёт сам): %s", name, e)
+
+
+@asynccontextmanager
+async def try_lock(name: str) -> AsyncIterator[bool]:
+    """
+    Неблокирующий лок на все процессы: внутри блока True — лок наш, False — занят.
+    Без REDIS_URL всегда True (хватает локального лока). Если Redis недоступен —
+    тоже True: лучше пропустить повторный клик, чем перестать отвечать.
+    """
+    if not enabled():
+        yield True
+        return
+    name, token = key("lock", name), uuid.uuid4().hex
+    try:
+        got = await _acquire(name, token)
+    except Exception as e:
+        logging.warning("shared: Redis недоступен, лок %s только локальный: %s", name, e)
+        yield True
+        return
+    if not got:
+        yield False
+        return
+    async with _held(name, token):
+        yield True
+
+
+@asynccontextmanager
+async def lock(name: str) -> AsyncIterator[None]:
+    """
+    Блокирующий лок на все процессы: ждём, пока освободится (опрос с растущей паузой).
+    Без REDIS_URL или при недоступном Redis — сразу проходим.
+    """
+    if not enabled():
+        yield
+        return
+    name, token = key("lock", name), uuid.uuid4().hex
+    pause = 0.02
+    while True:
+        try:
+            got = await _acquire(name, token)
+        except Exception as e:
+            logging.warning("shared: Redis недоступен, лок %s только локальный: %s", name, e)
+            yield
+            return
+        if got:
+            break
+        await asyncio.sleep(pause)
+        pause = min(pause * 2, 0.5)
+    async with _held(name, token):
+        yield
+
+
+async def close_shared() -> None:
+    """Хук Dispatcher.shutdown."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,107 @@
+# bot/sheet.py
+"""
+Модель строк листа планирования и форматирование ответов интентов.
+
+Строка проекта — обычный dict:
+    {"id": 17, "unit": "2.1", "name": "24-015 Проект", "manager": "Савина Е.",
+     "start": "2025-09-01" | None, "end": "2025-12-31" | None,
+     "status": "active" | "pending" | "paused" | "done"}
+
+Здесь только чистые функции: их используют локальное зеркало (bot/mirror.py)
+и заглушка GAS (tools/fake_gas.py), чтобы ответы совпадали по форме с GAS.
+"""
+from __future__ import annotations
+
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+OPEN_STATUSES = ("active", "pending", "paused")   # всё, что не «done»
+
+
+def parse_iso(s: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(s) if s else None
+
+
+def ru_short(d: Optional[date]) -> str:
+    return d.strftime("%d.%m.%y") if d else "—"
+
+
+def fmt_period(start: Optional[str], end: Optional[str]) -> str:
+    if not start and not end:
+        return "—"
+    return f"{ru_short(parse_iso(start))} – {ru_short(parse_iso(end))}"
+
+
+def unit_sort_key(code: str) -> tuple:
+    return tuple(int(x) if x.isdigit() else 0 for x in str(code).split("."))
+
+
+def top_of(code: str) -> str:
+    return str(code).split(".", 1)[0]
+
+
+def split_chunks(lines: List[str], limit: int = 3500) -> List[str]:
+    """Склеить строки в куски не длиннее limit (как GAS режет ответ на chunks)."""
+    chunks, cur, ln = [], [], 0
+    for line in lines:
+        if cur and ln + len(line) + 1 > limit:
+            chunks.append("\n".join(cur))
+            cur, ln = [], 0
+        cur.append(line)
+        ln += len(line) + 1
+    if cur:
+        chunks.append("\n".join(cur))
+    return chunks
+
+
+def status_item(row: Dict[str, Any], labels: Dict[str, str]) -> Dict[str, Any]:
+    """Элемент списков pending/paused из list_projects_by_status."""
+    code = row["unit"]
+    top = top_of(code)
+    return {
+        "unit": labels.get(top, f"(UNIT {top})"),
+        "sub": labels.get(code, "") if "." in code else "",
+        "name": row["name"],
+        "mgr": row.get("manager") or "",
+        "period": fmt_period(row.get("start"), row.get("end")),
+        "end": ru_short(parse_iso(row.get("end"))) if row.get("end") else "",
+        "hasEndDate": bool(row.get("start") and row.get("end")),
+    }
+
+
+def projects_by_status(rows: Iterable[Dict[str, Any]], labels: Dict[str, str]) -> Dict[str, Any]:
+    out: Dict[str, list] = {"pending": [], "paused": []}
+    for r in rows:
+        if r["status"] in out:
+            out[r["status"]].append(status_item(r, labels))
+    return {"ok": True, **out}
+
+
+def project_info(row: Optional[Dict[str, Any]], label: str) -> Dict[str, Any]:
+    if row is None:
+        return {"ok": False, "error": "Проект не найден"}
+    return {"ok": True, "unit": label, "project": row["name"], "start": row.get("start"),
+            "end": row.get("end"), "manager": row.get("manager"), "status": row["status"]}
+
+
+def month_window(month: int, year: int) -> Tuple[date, date]:
+    """Окно list_endings_in_month: весь месяц."""
+    return date(int(year), int(month), 1), date(int(year), int(month), calendar.monthrange(int(year), int(month))[1])
+
+
+def months_ahead_window(months: int, today: Optional[date] = None) -> Tuple[date, date]:
+    """Окно list_endings_within_months: с сегодня по тот же день через months месяцев."""
+    today = today or date.today()
+    m = today.month - 1 + int(months)
+    y, m = today.year + m // 12, m % 12 + 1
+    return today, date(y, m, min(today.day, calendar.monthrange(y, m)[1]))
+
+
+def endings_report(rows: Iterable[Dict[str, Any]], labels: Dict[str, str], a: date, b: date) -> Dict[str, Any]:
+    """Ответ list_endings_*: строки уже отобраны и отсортированы по (окончание, имя)."""
+    lines = [f"🔚 <b>Завершения {a.strftime('%d.%m.%Y')} — {b.strftime('%d.%m.%Y')}</b>"]
+    for r in rows:
+        lines.append(f"• {parse_iso(r['end']).strftime('%d.%m.%Y')} — {labels.get(r['unit'], r['unit'])} — "
+                     f"{r['name']} — {r.get('manager') or '—'}")
+    return {"ok": True, "chunks": split_chunks(lines) if len(lines) > 1 else []}
@@ -0,0 +1,76 @@
+# bot/utils/batcher.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Собирает вызовы, пришедшие в пределах `window` секунд, и отдаёт их пачкой в flush().
+    flush(items) должен вернуть список результатов той же длины (по порядку).
+    Исключение из flush() получают все вызовы пачки.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], Awaitable[List[Any]]],
+        *,
+        window: float = 0.015,
+        max_size: int = 20,
+    ):
+        self._flush = flush
+        self.window = window
+        self.max_size = max(1, int(max_size))
+        self._items: List[Any] = []
+        self._futs: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._items.append(item)
+        self._futs.append(fut)
+        if len(self._items) >= self.max_size:
+            self._fire()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._fire)
+        return await asyncio.shield(fut)
+
+    def _fire(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, futs = self._items, self._futs
+        self._items, self._futs = [], []
+        if not items:
+            return
+        self.batches += 1
+        self.items += len(items)
+        task = asyncio.ensure_future(self._run(items, futs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[Any], futs: List[asyncio.Future]) -> None:
+        try:
+            results = await self._flush(items)
+        except BaseException as e:
+            for f in futs:
+                if not f.done():
+                    f.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for f, res in zip(futs, results):
+            if not f.done():
+                f.set_result(res)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
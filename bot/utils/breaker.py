@@ -0,0 +1,78 @@
+# bot/utils/breaker.py
+from __future__ import annotations
+
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Простой предохранитель:
+      closed    — всё пропускаем, считаем подряд идущие сбои;
+      open      — после `threshold` сбоев подряд сразу отказываем (cooldown секунд);
+      half_open — после паузы пускаем один пробный запрос: успех закрывает, сбой снова открывает.
+    Пробный запрос, который отменили (release()) или который не вернулся за probe_timeout,
+    не держит предохранитель: следующий allow() пускает новую пробу.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, probe_timeout: float = 60.0):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self._fails = 0
+        self._opened_at = 0.0
+        self._probe = False
+        self._probe_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probe = False
+        if self.state == HALF_OPEN and self._probe and time.monotonic() - self._probe_at >= self.probe_timeout:
+            self._probe = False  # проба потерялась, не ответив ни успехом, ни сбоем
+        if self.state == HALF_OPEN and not self._probe:
+            self._probe = True   # ровно один пробный запрос
+            self._probe_at = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def on_success(self) -> None:
+        self._fails = 0
+        self._probe = False
+        self.state = CLOSED
+
+    def release(self) -> None:
+        """Пропущенный запрос не дал ответа (отменён) — освободить место пробы."""
+        if self.state == HALF_OPEN:
+            self._probe = False
+
+    def on_failure(self) -> None:
+        self._fails += 1
+        if self.state == HALF_OPEN or self._fails >= self.threshold:
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probe = False
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до пробного запроса (0 — можно сейчас)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._fails,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in_s": round(self.retry_in(), 1),
+        }
@@ -0,0 +1,241 @@
+# bot/utils/gas_sched.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Hashable, Optional
+
+# Приоритетные полосы: меньше — важнее.
+PRIO_WRITE = 0       # мутации: set_manager / move_project / remove_project …
+PRIO_READ = 1        # чтения для меню и отчётов, которые ждёт пользователь
+PRIO_BACKGROUND = 2  # фоновый префетч / прогрев кэша
+
+LANE_NAMES = ("write", "read", "background")
+
+# Чат, от имени которого идёт текущий вызов GAS (ставит middleware в tg_utils).
+# Нужен для честной очереди: один чат не должен вытеснить остальных.
+current_chat: ContextVar[Optional[Hashable]] = ContextVar("gas_current_chat", default=None)
+
+
+class _LaneStats:
+    __slots__ = ("admitted", "wait_total", "wait_max", "recent")
+
+    def __init__(self) -> None:
+        self.admitted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent: Deque[float] = deque(maxlen=200)
+
+    def add(self, wait: float) -> None:
+        self.admitted += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent.append(wait)
+
+
+class GasScheduler:
+    """
+    Единый допуск запросов к GAS (замена голого Semaphore).
+      • не больше `limit` одновременных запросов;
+      • полосы приоритетов: write → read → background;
+      • внутри полосы — round-robin по чатам (у каждого чата своя FIFO-очередь).
+    Лимит можно менять на лету (set_limit) — лишние ожидающие разбудятся сразу.
+    """
+
+    def __init__(self, limit: int = 3):
+        self._limit = max(1, int(limit))
+        self._active = 0
+        self._lanes: list[OrderedDict[Any, Deque[asyncio.Future]]] = [
+            OrderedDict() for _ in LANE_NAMES
+        ]
+        self._stats = [_LaneStats() for _ in LANE_NAMES]
+
+    # ---- лимит ----
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def set_limit(self, limit: int) -> None:
+        self._limit = max(1, int(limit))
+        self._wake()
+
+    # ---- допуск ----
+    def _depth(self) -> int:
+        return sum(len(q) for lane in self._lanes for q in lane.values())
+
+    async def acquire(self, prio: int = PRIO_READ, chat: Hashable | None = None) -> float:
+        """Дождаться слота. Возвращает время ожидания в секундах."""
+        prio = min(max(int(prio), 0), len(self._lanes) - 1)
+        t0 = time.monotonic()
+        if self._active < self._limit and not self._depth():
+            self._active += 1
+            self._stats[prio].add(0.0)
+            return 0.0
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        lane = self._lanes[prio]
+        lane.setdefault(chat, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # слот уже выдан, но задачу отменили до старта — возвращаем
+                self.release()
+            else:
+                self._forget(lane, chat, fut)
+            raise
+        wait = time.monotonic() - t0
+        self._stats[prio].add(wait)
+        return wait
+
+    def release(self) -> None:
+        self._active = max(0, self._active - 1)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, prio: int = PRIO_READ, chat: Hashable | None = None):
+        await self.acquire(prio, chat)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # ---- внутреннее ----
+    @staticmethod
+    def _forget(lane: OrderedDict, chat: Hashable | None, fut: asyncio.Future) -> None:
+        q = lane.get(chat)
+        if q is None:
+            return
+        try:
+            q.remove(fut)
+        except ValueError:
+            pass
+        if not q:
+            lane.pop(chat, None)
+
+    def _next_waiter(self) -> asyncio.Future | None:
+        for lane in self._lanes:
+            while lane:
+                chat, q = next(iter(lane.items()))
+                fut = q.popleft()
+                if q:
+                    lane.move_to_end(chat)   # следующий раз — очередь другого чата
+                else:
+                    del lane[chat]
+                if not fut.done():
+                    return fut
+        return None
+
+    def _wake(self) -> None:
+        while self._active < self._limit:
+            fut = self._next_waiter()
+            if fut is None:
+                return
+            self._active += 1
+            fut.set_result(None)
+
+    # ---- метрики ----
+    def stats(self) -> dict:
+        lanes = {}
+        for name, lane, st in zip(LANE_NAMES, self._lanes, self._stats):
+            recent = sorted(st.recent)
+            p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+            lanes[name] = {
+                "queued": sum(len(q) for q in lane.values()),
+                "chats": len(lane),
+                "admitted": st.admitted,
+                "wait_avg_ms": round(1000 * st.wait_total / st.admitted, 1) if st.admitted else 0.0,
+                "wait_p95_ms": round(1000 * p95, 1),
+                "wait_max_ms": round(1000 * st.wait_max, 1),
+            }
+        return {"limit": self._limit, "active": self._active, "queued": self._depth(), "lanes": lanes}
+
+
+class AIMDLimiter:
+    """
+    Адаптивный лимит одновременных запросов (AIMD) поверх GasScheduler.
+      • +1 за «раунд» (limit успешных ответов подряд), если задержка стабильна;
+      • ×decrease при 429/5xx/таймаутах или когда p95 задержки растёт.
+    Задержку сравниваем не в абсолюте, а с базовой по каждому интенту: get_all_load
+    всегда медленнее list_units_min, и смесь запросов не должна выглядеть как перегрузка.
+    """
+
+    def __init__(
+        self,
+        scheduler: GasScheduler,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        window: int = 50,
+        tolerance: float = 2.0,
+        decrease: float = 0.5,
+    ):
+        self.scheduler = scheduler
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self._ratios: Deque[float] = deque(maxlen=window)
+        self._baseline: dict[str, float] = {}
+        self._round = 0
+        self._last_cut = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.failures = 0
+        scheduler.set_limit(min(max(scheduler.limit, self.min_limit), self.max_limit))
+
+    @property
+    def limit(self) -> int:
+        return self.scheduler.limit
+
+    def _set(self, limit: int) -> None:
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit != self.scheduler.limit:
+            self.scheduler.set_limit(limit)
+        self._round = 0
+
+    def _p95(self) -> float:
+        xs = sorted(self._ratios)
+        return xs[int(0.95 * (len(xs) - 1))] if xs else 1.0
+
+    def on_success(self, intent: str, latency: float) -> None:
+        base = self._baseline.get(intent)
+        # базовая задержка: минимум, медленно «подтягивающийся» вверх (0.5% на ответ)
+        base = latency if base is None else min(base * 1.005, latency)
+        self._baseline[intent] = base
+        self._ratios.append(latency / base if base > 0 else 1.0)
+
+        self._round += 1
+        if self._round < self.scheduler.limit:
+            return
+        if len(self._ratios) >= 10 and self._p95() > self.tolerance:
+            self.decreases += 1
+            self._set(int(self.scheduler.limit * self.decrease))
+            self._ratios.clear()
+        else:
+            self.increases += 1
+            self._set(self.scheduler.limit + 1)
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        # пачка одновременных ошибок — это один сигнал, а не N: режем не чаще раза в секунду
+        now = time.monotonic()
+        if now - self._last_cut < 1.0:
+            return
+        self._last_cut = now
+        self.decreases += 1
+        self._set(int(self.scheduler.limit * self.decrease))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.scheduler.limit,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "latency_p95_ratio": round(self._p95(), 2),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "failures": self.failures,
+        }
@@ -0,0 +1,155 @@
+# bot/utils/tg_throttle.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage, EditMessageCaption, EditMessageReplyMarkup, EditMessageText, ForwardMessage,
+    SendDocument, SendMediaGroup, SendMessage, SendPhoto, TelegramMethod,
+)
+from aiogram.methods.base import Response, TelegramType
+
+# Лимиты Bot API (https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this)
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))          # сообщений в секунду на бота
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))               # в секунду в личный чат
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", "3"))             # короткий всплеск в личке
+TG_GROUP_PER_MIN = float(os.getenv("TG_GROUP_PER_MIN", "20"))      # в минуту в группу
+TG_RETRY_AFTER_MAX = int(os.getenv("TG_RETRY_AFTER_MAX", "5"))     # сколько раз ждём 429 на одном запросе
+
+# что считается «сообщением» для лимитов; answerCallbackQuery, sendChatAction и т.п. не трогаем
+_LIMITED = (
+    SendMessage, SendDocument, SendPhoto, SendMediaGroup, CopyMessage, ForwardMessage,
+    EditMessageText, EditMessageReplyMarkup, EditMessageCaption,
+)
+
+
+class TokenBucket:
+    """Ведро токенов: rate в секунду, не больше capacity накопленных."""
+
+    __slots__ = ("rate", "capacity", "tokens", "ts")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.ts = time.monotonic()
+
+    def delay(self) -> float:
+        """Забрать токен; вернуть, сколько надо подождать (0 — можно сразу)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+        self.tokens -= 1.0   # бронируем: следующий в очереди считает уже от минуса
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self) -> bool:
+        return self.tokens + (time.monotonic() - self.ts) * self.rate >= self.capacity
+
+
+class _Chat:
+    __slots__ = ("lock", "bucket", "waiting")
+
+    def __init__(self, bucket: TokenBucket):
+        self.lock = asyncio.Lock()     # FIFO: порядок сообщений внутри чата сохраняется
+        self.bucket = bucket
+        self.waiting = 0
+
+
+class SendThrottle(BaseRequestMiddleware):
+    """
+    Request-middleware для bot.session: все исходящие сообщения идут через него.
+      • чат: свой FIFO и своё ведро (личка — TG_CHAT_RATE/с, группа — TG_GROUP_PER_MIN/мин);
+      • бот целиком: общее ведро TG_GLOBAL_RATE/с;
+      • 429 RetryAfter: ждём указанное время и повторяем тот же запрос, следующие
+        сообщения чата стоят за ним — длинный отчёт продолжается с того же куска.
+    Разные чаты отправляются параллельно, общий у них только глобальный лимит.
+    """
+
+    def __init__(self) -> None:
+        self._global = TokenBucket(TG_GLOBAL_RATE, TG_GLOBAL_RATE)
+        self._chats: Dict[Hashable, _Chat] = {}
+        self.stats_ = {"sent": 0, "delayed": 0, "wait_total_s": 0.0, "retry_after": 0}
+
+    def _chat(self, chat_id: Hashable) -> _Chat:
+        c = self._chats.get(chat_id)
+        if c is None:
+            if len(self._chats) >= 1024:
+                self._sweep()
+            group = isinstance(chat_id, str) or int(chat_id) < 0
+            bucket = (TokenBucket(TG_GROUP_PER_MIN / 60.0, 1.0) if group
+                      else TokenBucket(TG_CHAT_RATE, TG_CHAT_BURST))
+            c = self._chats[chat_id] = _Chat(bucket)
+        return c
+
+    @staticmethod
+    def _idle(c: _Chat) -> bool:
+        return not c.waiting and not c.lock.locked() and c.bucket.idle()
+
+    def _forget(self, chat_id: Hashable, c: _Chat) -> None:
+        # не копим состояние по всем чатам, что когда-либо писали
+        if self._idle(c):
+            self._chats.pop(chat_id, None)
+
+    def _sweep(self) -> None:
+        for chat_id in [k for k, c in self._chats.items() if self._idle(c)]:
+            del self._chats[chat_id]
+
+    async def _wait(self, bucket: TokenBucket) -> None:
+        delay = bucket.delay()
+        if delay > 0:
+            self.stats_["delayed"] += 1
+            self.stats_["wait_total_s"] += delay
+            await asyncio.sleep(delay)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id: Optional[Hashable] = getattr(method, "chat_id", None)
+        if not isinstance(method, _LIMITED) or chat_id is None:
+            return await make_request(bot, method)
+
+        c = self._chat(chat_id)
+        c.waiting += 1
+        entered = False
+        try:
+            async with c.lock:
+                c.waiting -= 1
+                entered = True
+                attempt = 0
+                while True:
+                    # сначала очередь чата, потом общий лимит — чтобы не держать глобальный токен зря
+                    await self._wait(c.bucket)
+                    await self._wait(self._global)
+                    try:
+                        resp = await make_request(bot, method)
+                    except TelegramRetryAfter as e:
+                        if attempt >= TG_RETRY_AFTER_MAX:
+                            raise
+                        attempt += 1
+                        self.stats_["retry_after"] += 1
+                        logging.warning("telegram: 429 в чате %s, жду %s с", chat_id, e.retry_after)
+                        await asyncio.sleep(e.retry_after)
+                        continue
+                    self.stats_["sent"] += 1
+                    return resp
+        finally:
+            if not entered:
+                c.waiting -= 1
+            self._forget(chat_id, c)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_, "wait_total_s": round(self.stats_["wait_total_s"], 2), "chats": len(self._chats)}
+
+
+# один на процесс: подключается в main через bot.session.middleware(SEND_THROTTLE)
+SEND_THROTTLE = SendThrottle()
@@ -3,14 +3,19 @@ from __future__ import annotations
 
 import asyncio
 import html
+import os
 import re
+import time
 from contextlib import asynccontextmanager
-from functools import wraps
-from typing import Any, Awaitable, Callable
+from functools import lru_cache, wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable
 
-from aiogram import Bot
+from aiogram import Bot, BaseMiddleware
 from aiogram.enums import ParseMode
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, TelegramObject
+
+from .gas_sched import current_chat
+from ..shared import try_lock
 
 
 # ========== текстовые утилиты ==========
@@ -19,11 +24,14 @@ _LINE_CODE_RE = re.compile(
     r'(?m)^(?:\s*[•\-·]\s*)?\d+(?:[–-]\d+){1,3}\s+(?=[A-Za-zА-Яа-я])'
 )
 
+# имена проектов повторяются из отчёта в отчёт — regex и экранирование считаем один раз
+@lru_cache(maxsize=8192)
 def pretty_name(s: str) -> str:
     if not s:
         return ""
     return _PREFIX_RE.sub("", s).strip()
 
+@lru_cache(maxsize=8192)
 def esc(s: str) -> str:
     return html.escape(s or "")
 
@@ -51,6 +59,118 @@ def split_text(text: str, limit: int = 3900) -> list[str]:
         parts.append("\n".join(cur))
     return parts
 
+# ========== упаковка HTML-частей в минимум сообщений ==========
+TG_LIMIT = 4096
+_HTML_ATOM_RE = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>|&#?\w+;")
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+
+def _tg_len(s: str) -> int:
+    """Длина так, как её считает Telegram (UTF-16): эмодзи — 2. Теги считаем тоже — с запасом."""
+    return len(s) + sum(1 for ch in s if ord(ch) > 0xFFFF)
+
+def _has_text(part: str) -> bool:
+    """Есть ли в HTML-части что-то кроме тегов и пробелов (пустое сообщение Telegram не примет)."""
+    return bool(_HTML_TAG_RE.sub("", part).strip())
+
+def _html_split(text: str, limit: int, keep: int = 0) -> list[str]:
+    """
+    Режет HTML на части ≤ limit: по переводу строки, иначе по пробелу, иначе где
+    пришлось — но никогда внутри тега или &сущности;. Незакрытые на разрезе теги
+    закрываются в конце части и открываются заново (с теми же атрибутами) в следующей.
+    Пробелы на стыке частей выкидываются, пустых частей не бывает.
+    keep — первые keep символов (заголовок) не режутся и не уходят частью без продолжения.
+    """
+    w = [0]                       # префиксные длины в единицах Telegram
+    for ch in text:
+        w.append(w[-1] + (2 if ord(ch) > 0xFFFF else 1))
+    parts: list[str] = []
+    stack: tuple = ()             # открытые теги: ((имя, открывающий тег), ...)
+    start, prefix = 0, ""
+    nl = sp = None                # последние места разреза: (позиция, стек)
+    i, n = 0, len(text)
+    while i < n:
+        m = _HTML_ATOM_RE.match(text, i) if text[i] in "<&" else None
+        j = m.end() if m else i + 1
+        after = stack
+        if m and m.group(2):
+            name = m.group(2).lower()
+            if not m.group(1):
+                after = stack + ((name, m.group(0)),)
+            else:
+                idx = max((k for k, t in enumerate(stack) if t[0] == name), default=None)
+                if idx is not None:
+                    after = stack[:idx] + stack[idx + 1:]
+        closing = sum(len(t[0]) + 3 for t in after)
+        if i > start and i > keep and _tg_len(prefix) + w[j] - w[start] + closing > limit:
+            pos, st = nl or sp or (i, stack)
+            part = prefix + text[start:pos].rstrip(" \n") + "".join(f"</{t[0]}>" for t in reversed(st))
+            if _has_text(part):
+                parts.append(part)
+            prefix = "".join(t[1] for t in st)
+            start = pos
+            while start < n and text[start] in " \n":   # перевод строки/пробелы на разрезе выкидываем
+                start += 1
+            i = max(i, start)
+            nl = sp = None
+            continue
+        if i > start and i > keep and text[i] == "\n":
+            nl = (i, stack)
+        elif i > start and i > keep and text[i] == " ":
+            sp = (i, stack)
+        stack, i = after, j
+    part = prefix + text[start:] + "".join(f"</{t[0]}>" for t in reversed(stack))
+    if _has_text(part):
+        parts.append(part)
+    return parts
+
+def pack_html(chunks: list[str], *, title: str = "", limit: int = TG_LIMIT, sep: str = "\n\n") -> list[str]:
+    """
+    Склеивает подряд идущие HTML-части (чанки GAS) в минимум сообщений ≤ limit.
+    title — один раз, в начале первого сообщения, и всегда вместе с началом первого
+    чанка (страницы из одного заголовка не бывает). Граница чанка — предпочтительное
+    место разреза; чанк, который сам длиннее limit, режется _html_split.
+    """
+    pieces = [c.strip() for c in chunks if c and c.strip()]
+    parts: list[str] = []
+    cur = title
+    # заголовок на полстраницы и больше не держим — иначе первой части не хватит места
+    keep = len(title) + len(sep) if title and 2 * _tg_len(title) < limit else 0
+    for piece in pieces:
+        cand = f"{cur}{sep}{piece}" if cur else piece
+        if _tg_len(cand) <= limit:
+            cur = cand
+            continue
+        if _tg_len(piece) <= limit and cur != title:
+            parts.append(cur)
+            cur = piece
+            continue
+        # длинный чанк (или первый после заголовка): добиваем текущее сообщение его началом, хвост — дальше
+        cut = _html_split(cand, limit, keep if cur == title else 0)
+        parts.extend(cut[:-1])
+        cur = cut[-1]
+    if cur:
+        parts.append(cur)
+    return [p for p in parts if _has_text(p)]
+
+def stale_note(resp: dict | None) -> str:
+    """
+    Пометка «обновлено N мин назад» для ответа, отданного из кэша
+    (gas_call(..., stale_ok=True) кладёт в него "_cached_at"). Свежее минуты — пусто.
+    """
+    ts = (resp or {}).get("_cached_at")
+    if not ts:
+        return ""
+    minutes = int((time.time() - float(ts)) // 60)
+    if minutes < 1:
+        return ""
+    if minutes < 60:
+        ago = f"{minutes} мин"
+    elif minutes < 60 * 24:
+        ago = f"{minutes // 60} ч"
+    else:
+        ago = f"{minutes // (60 * 24)} дн"
+    return f"🕓 обновлено {ago} назад"
+
 
 # ========== отправка длинных сообщений ==========
 async def reply_long(bot: Bot, chat_id: int, text: str):
@@ -94,23 +214,67 @@ async def loading_message(msg_or_call: Message | CallbackQuery, text: str = "⏳
 
 
 # ========== анти-даблклик / ограничение конкуренции ==========
-_CHAT_LOCKS: dict[int, asyncio.Lock] = {}
+class LockRegistry:
+    """
+    Локи по ключу (чату), которые живут, только пока ими пользуются: счётчик ссылок
+    считает держателя и ждущих, последний вышедший удаляет запись. Простаивающих
+    локов нет — память не растёт от числа чатов, что когда-либо писали боту.
+    """
+    __slots__ = ("_entries",)
+
+    def __init__(self) -> None:
+        self._entries: dict[Hashable, list] = {}   # ключ → [asyncio.Lock, ссылок]
+
+    def locked(self, key: Hashable) -> bool:
+        e = self._entries.get(key)
+        return e is not None and e[0].locked()
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        e = self._entries.get(key)
+        if e is None:
+            e = self._entries[key] = [asyncio.Lock(), 0]
+        e[1] += 1
+        try:
+            async with e[0]:
+                yield
+        finally:
+            e[1] -= 1
+            if e[1] == 0:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
-# общий лимит одновременных запросов к GAS по всему боту
-# подбери число под свои лимиты, обычно 2–4 достаточно
-GAS_SEMAPHORE = asyncio.Semaphore(3)
 
-def chat_lock(chat_id: int) -> asyncio.Lock:
-    """Получить (или создать) лок для этого чата."""
-    lock = _CHAT_LOCKS.get(chat_id)
-    if lock is None:
-        lock = asyncio.Lock()
-        _CHAT_LOCKS[chat_id] = lock
-    return lock
+CHAT_LOCKS = LockRegistry()
+
+# Общий лимит одновременных запросов к GAS больше не здесь: его держит
+# планировщик в gas_client (SCHEDULER, см. GAS_CONCURRENCY в .env).
+
+def chat_lock(chat_id: int):
+    """Лок этого чата: async with chat_lock(chat_id): ... (тот же ключ, что у gas_guard со scope="chat")."""
+    return CHAT_LOCKS.hold(f"chat:{chat_id}")
 
 def _chat_id(evt: Message | CallbackQuery) -> int:
     return evt.chat.id if isinstance(evt, Message) else evt.message.chat.id
 
+# чем ограничен анти-даблклик: chat — весь чат (по умолчанию, как раньше), user — человек во всех
+# чатах, chat_user — человек в этом чате (в личке то же, что chat; в группе участники
+# не ждут друг друга — как и FSM, который тоже хранится на пару чат+пользователь)
+GAS_GUARD_SCOPE = os.getenv("GAS_GUARD_SCOPE", "chat").strip().lower()
+
+def guard_key(evt: Message | CallbackQuery, scope: str | None = None) -> str:
+    """Ключ лока gas_guard для апдейта."""
+    scope = scope or GAS_GUARD_SCOPE
+    chat_id = _chat_id(evt)
+    user = getattr(evt, "from_user", None)
+    if user is None or scope == "chat":
+        return f"chat:{chat_id}"
+    if scope == "user":
+        return f"user:{user.id}"
+    return f"chat:{chat_id}:user:{user.id}"
+
 async def busy_reply(msg_or_cb: Message | CallbackQuery,
                      text: str = "⏳ Уже обрабатываю предыдущий запрос…"):
     """Короткий ответ на повторное нажатие, когда лок занят."""
@@ -122,11 +286,16 @@ async def busy_reply(msg_or_cb: Message | CallbackQuery,
     except Exception:
         pass
 
-def gas_guard(show_busy: bool = True):
+def gas_guard(show_busy: bool = True, scope: str | None = None):
     """
     Декоратор для хэндлеров, которые ходят в GAS:
-      • Per-chat lock: повторные клики в этом чате игнорируются, пока идёт работа.
-      • Global semaphore: ограничиваем общее число одновременных походов в GAS.
+      • Lock на чат / пользователя / пользователя в чате (GAS_GUARD_SCOPE или scope=):
+        повторные клики игнорируются, пока идёт работа.
+        При REDIS_URL лок общий для всех процессов бота (см. bot/shared.py),
+        локальный остаётся быстрым отсевом внутри процесса.
+    Мутации одного проекта от разных людей сериализует очередь записи (bot/write_queue.py).
+    Общее число одновременных походов в GAS ограничивает планировщик внутри gas_call
+    (раньше тут был второй захват того же семафора — он съедал половину слотов).
     Применение:
         @router.callback_query(...)
         @gas_guard()
@@ -136,23 +305,46 @@ def gas_guard(show_busy: bool = True):
     def deco(fn: Callable[..., Awaitable[Any]]):
         @wraps(fn)
         async def wrapper(evt: Message | CallbackQuery, *args, **kwargs):
-            lock = chat_lock(_chat_id(evt))
-            if lock.locked():
+            key = guard_key(evt, scope)
+            if CHAT_LOCKS.locked(key):
                 if show_busy:
                     await busy_reply(evt)
                 return
-            async with lock:
-                async with GAS_SEMAPHORE:
+            async with CHAT_LOCKS.hold(key):
+                async with try_lock(key) as got:
+                    if not got:
+                        if show_busy:
+                            await busy_reply(evt)
+                        return
                     return await fn(evt, *args, **kwargs)
         return wrapper
     return deco
 
 
+class GasChatMiddleware(BaseMiddleware):
+    """
+    Outer-middleware для dp.update: запоминает чат текущего апдейта, чтобы
+    планировщик GAS раскладывал запросы по честным очередям «по чатам».
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat")
+        token = current_chat.set(chat.id if chat else None)
+        try:
+            return await handler(event, data)
+        finally:
+            current_chat.reset(token)
+
+
 __all__ = [
     # текст/HTML
-    "pretty_name", "esc", "pn", "strip_codes_in_text", "split_text",
+    "pretty_name", "esc", "pn", "strip_codes_in_text", "split_text", "pack_html", "stale_note",
     "reply_long", "reply_long_html", "answer_html", "edit_html",
     "loading_message",
     # конкуренция
-    "chat_lock", "busy_reply", "gas_guard", "GAS_SEMAPHORE",
+    "LockRegistry", "CHAT_LOCKS", "chat_lock", "guard_key", "busy_reply", "gas_guard", "GasChatMiddleware",
 ]
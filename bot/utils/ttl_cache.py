@@ -0,0 +1,79 @@
+# bot/utils/ttl_cache.py
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class CacheEntry:
+    __slots__ = ("value", "ts", "ttl", "intent", "unit")
+
+    def __init__(self, value: Any, ttl: float, intent: str, unit: Optional[str]):
+        self.value = value
+        self.ts = time.time()
+        self.ttl = ttl
+        self.intent = intent
+        self.unit = unit
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.ts
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.ttl
+
+
+class TTLCache:
+    """
+    LRU-кэш с TTL на каждую запись.
+    У записи есть метки intent/unit — по ним работает точечная инвалидация.
+    Протухшие записи не удаляются сразу: их можно достать с allow_stale=True
+    (запасной ответ, когда GAS недоступен), вытесняет их только LRU.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get_entry(self, key: Hashable, *, allow_stale: bool = False) -> CacheEntry | None:
+        e = self._data.get(key)
+        if e is None or (not allow_stale and not e.fresh):
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return e
+
+    def set(self, key: Hashable, value: Any, ttl: float, *, intent: str = "", unit: Optional[str] = None) -> None:
+        self._data[key] = CacheEntry(value, ttl, intent, unit)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, pred: Callable[[CacheEntry], bool]) -> int:
+        """Удалить все записи, для которых pred(entry) истинно. Возвращает их число."""
+        dead = [k for k, e in self._data.items() if pred(e)]
+        for k in dead:
+            del self._data[k]
+        self.invalidated += len(dead)
+        return len(dead)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+        }
@@ -0,0 +1,55 @@
+# bot/webhook.py
+"""
+Режим webhook: Telegram сам шлёт апдейты POST-ом на встроенный aiohttp-сервер,
+апдейт сразу уходит в диспетчер (без задержки long-poll).
+
+Сервер слушает WEBHOOK_HOST:WEBHOOK_PORT (по умолчанию 127.0.0.1 — за локальным
+reverse proxy с TLS), путь WEBHOOK_PATH. Telegram подписывает запросы заголовком
+X-Telegram-Bot-Api-Secret-Token = WEBHOOK_SECRET — чужие POST отбрасываются.
+Публичный адрес для setWebhook — WEBHOOK_URL (https://bot.example.com), к нему
+дописывается WEBHOOK_PATH.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")             # публичный https-адрес бота
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")              # где слушаем
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/tg/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None              # secret_token для setWebhook
+
+
+def build_app(dp: Dispatcher, bot: Bot, *, path: str = WEBHOOK_PATH,
+              secret: Optional[str] = WEBHOOK_SECRET) -> web.Application:
+    """aiohttp-приложение: обработчик апдейтов + startup/shutdown диспетчера."""
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, allowed_updates: List[str]) -> None:
+    """Поднять сервер, зарегистрировать webhook и работать до отмены."""
+    app = build_app(dp, bot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()   # здесь же отрабатывает dp.startup
+    try:
+        site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+        await site.start()
+        await bot.set_webhook(
+            WEBHOOK_URL + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+        )
+        logging.info("webhook: слушаю %s:%s%s → %s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()   # dp.shutdown
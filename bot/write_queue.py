@@ -0,0 +1,368 @@
+# bot/write_queue.py
+"""
+Отложенная запись мутаций в GAS (write-behind) с журналом на диске.
+
+Хэндлер кладёт мутацию в очередь и сразу отвечает пользователю «🕓 в очереди».
+Запись сначала дописывается в журнал (JSONL, flush + fsync), потом её забирает
+фоновый воркер:
+  • по одному проекту (unit + project) — строго по порядку, разные проекты — параллельно;
+    при нескольких процессах (REDIS_URL) порядок держит ещё и общий лок проекта;
+  • подряд идущие правки одного проекта, ещё не ушедшие в GAS, склеиваются
+    (move + extend → один move, два set_manager → последний);
+  • у каждой записи свой ключ идемпотентности (хранится в журнале): пока GAS
+    недоступен (предохранитель, нет соединения) ждём и повторяем; после таймаута
+    или 5xx — только если скрипт подтвердил, что отбрасывает повторы по ключу
+    (см. gas_client._note_idempotency), иначе запись сразу неудачна. Ждём не
+    дольше GAS_QUEUE_MAX_WAIT, дальше запись тоже считается неудачной;
+  • итог (✅/⚠️) отправляется в чат ответом на сообщение «в очереди».
+После падения или рестарта незавершённые записи из журнала проигрываются заново.
+Перед походом в GAS запись помечается в журнале как отправленная; отправленную,
+но не завершённую запись после рестарта повторяем, только если дедупликация ключей
+подтверждена, иначе — ⚠️ «проверьте вручную» (GAS мог успеть её применить).
+Журнал сжимается при старте и на лету — как только перерастёт GAS_JOURNAL_MAX_BYTES.
+Он принадлежит одному процессу (файловый лок): при нескольких воркерах (REDIS_URL)
+у каждого свой GAS_WORKER_ID → свой файл gas_journal.<id>.jsonl.
+
+Формат журнала — по строке на событие:
+    {"op": "put", "id", "key", "intent", "args", "chat", "reply_to", "done", "fail", "ts"}
+    {"op": "sent", "id", "idem"}     — ушла в GAS; idem — дедупликация тогда уже подтверждена
+    {"op": "done", "id", "ok", "error"?}
+"""
+from __future__ import annotations
+
+import asyncio
+import html
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+
+from . import gas_client, shared
+from .utils.gas_sched import PRIO_WRITE
+
+GAS_WORKER_ID = os.getenv("GAS_WORKER_ID", "").strip()              # имя воркера; обязательно при REDIS_URL
+GAS_JOURNAL_PATH = os.getenv("GAS_JOURNAL_PATH") or (                # журнал мутаций — свой у каждого процесса
+    f"gas_journal.{GAS_WORKER_ID}.jsonl" if GAS_WORKER_ID else "gas_journal.jsonl"
+)
+GAS_JOURNAL_MAX_BYTES = int(os.getenv("GAS_JOURNAL_MAX_BYTES", str(1 << 20)))  # больше — сжимаем на лету
+GAS_QUEUE_MAX_WAIT = float(os.getenv("GAS_QUEUE_MAX_WAIT", "1800"))  # с; сколько ждать GAS, потом — ⚠️
+
+Job = Dict[str, Any]
+
+# Ждём и повторяем, если запрос заведомо не ушёл (предохранитель, нет соединения) или
+# скрипт подтвердил дедупликацию ключей. Иначе таймаут/5xx — неясно, записалось ли:
+# повтор мог бы задвоить add_project, поэтому сразу ⚠️ и пусть человек проверит.
+def _should_wait(e: Exception) -> bool:
+    if gas_client._never_sent(e):
+        return True
+    return gas_client._IDEMPOTENCY_SUPPORTED is True and gas_client._is_overload(e)
+
+
+class Journal:
+    """Append-only журнал: каждая строка на диске до того, как мы ответили пользователю."""
+
+    def __init__(self, path: str, max_bytes: int = GAS_JOURNAL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._limit = max_bytes
+        self._lock = asyncio.Lock()
+        self._owner: Any = None
+        self.compactions = 0
+
+    def acquire(self) -> None:
+        """
+        Занять журнал за этим процессом (flock на <path>.lock). Второй процесс с тем же
+        путём получит ошибку: сжатие через os.replace теряло бы его дописанные строки.
+        """
+        if self._owner is not None:
+            return
+        try:
+            import fcntl
+        except ImportError:   # Windows: один процесс — и так один журнал
+            return
+        f = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise RuntimeError(
+                f"журнал {self.path} уже открыт другим процессом — задайте каждому воркеру свой GAS_WORKER_ID"
+            )
+        self._owner = f
+
+    def release(self) -> None:
+        f, self._owner = self._owner, None
+        if f is not None:
+            f.close()   # flock снимается вместе с дескриптором
+
+    def load(self) -> List[Job]:
+        """Незавершённые записи в порядке постановки."""
+        pending: Dict[str, Job] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue   # оборванная последняя строка после падения
+                    if rec.get("op") == "put":
+                        pending[rec["id"]] = rec
+                    elif rec.get("op") == "sent" and rec.get("id") in pending:
+                        # при сжатии отметка переезжает в саму запись
+                        job = pending[rec["id"]]
+                        job["sent"] = True
+                        job["sent_idem"] = bool(job.get("sent_idem") or rec.get("idem"))
+                    elif rec.get("op") == "done":
+                        pending.pop(rec.get("id"), None)
+        except FileNotFoundError:
+            return []
+        return list(pending.values())
+
+    def compact(self, pending: List[Job]) -> None:
+        """Переписать журнал, оставив только незавершённое (атомарно: tmp + rename)."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in pending:
+                f.write(json.dumps(job, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _write(self, lines: str) -> int:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def _compact_now(self) -> int:
+        pending = self.load()
+        self.compact(pending)
+        self.compactions += 1
+        return os.path.getsize(self.path)
+
+    async def append(self, *recs: Dict[str, Any]) -> None:
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs)
+        async with self._lock:   # порядок строк = порядок вызовов
+            size = await asyncio.to_thread(self._write, lines)
+            if size > self._limit:
+                size = await asyncio.to_thread(self._compact_now)
+                # незавершённого само по себе много — не сжимаем на каждой записи
+                self._limit = max(self.max_bytes, 2 * size)
+
+
+def _key(job: Job) -> Tuple[str, str]:
+    a = job["args"]
+    return str(a.get("unit") or ""), str(a.get("project") or "")
+
+
+def _coalesce(a: Job, b: Job) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Склеить две правки одного проекта в одну (или None, если нельзя)."""
+    ia, ib = a["intent"], b["intent"]
+    if ia == ib and ia in ("move_project", "extend_deadline", "set_manager"):
+        return ib, b["args"]
+    if ia == "move_project" and ib == "extend_deadline":
+        return "move_project", {**a["args"], "new_end": b["args"]["new_end"]}
+    if ia == "extend_deadline" and ib == "move_project":
+        return "move_project", b["args"]
+    return None
+
+
+class WriteQueue:
+    def __init__(self, journal: Journal, max_wait: float = GAS_QUEUE_MAX_WAIT):
+        self.journal = journal
+        self.max_wait = max_wait
+        self.bot: Optional[Bot] = None
+        self._lanes: Dict[Tuple[str, str], Deque[Job]] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._inflight = 0
+        self.stats_ = {"queued": 0, "applied": 0, "failed": 0, "coalesced": 0, "waits": 0, "expired": 0, "replayed": 0,
+                       "unconfirmed": 0}
+
+    # ---- постановка ----
+    async def submit(
+        self,
+        intent: str,
+        args: Dict[str, Any],
+        *,
+        chat: Optional[int] = None,
+        reply_to: Optional[int] = None,
+        done: str = "✅ Готово",
+        fail: str = "⚠️ Ошибка",
+    ) -> Job:
+        """
+        Записать мутацию в журнал и поставить в очередь. Возвращается, как только
+        запись на диске. done/fail — HTML итогового сообщения; "{unit}" в done
+        заменяется подписью юнита из ответа GAS.
+        """
+        job: Job = {
+            "op": "put", "id": uuid.uuid4().hex, "key": gas_client.new_idempotency_key(),
+            "intent": intent, "args": dict(args),
+            "chat": chat, "reply_to": reply_to, "done": done, "fail": fail, "ts": time.time(),
+        }
+        await self.journal.append(job)
+        self.stats_["queued"] += 1
+        self._enqueue(job)
+        return job
+
+    def _enqueue(self, job: Job) -> None:
+        key = _key(job)
+        self._lanes.setdefault(key, deque()).append(job)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.create_task(self._drain(key))
+
+    def pending(self) -> int:
+        """Сколько мутаций ещё не применено (в очереди + в полёте)."""
+        return sum(len(q) for q in self._lanes.values()) + self._inflight
+
+    # ---- воркер одного проекта ----
+    async def _drain(self, key: Tuple[str, str]) -> None:
+        lane = self._lanes[key]
+        try:
+            while lane:
+                jobs = [lane.popleft()]
+                intent, args = jobs[0]["intent"], jobs[0]["args"]
+                while lane:
+                    merged = _coalesce({"intent": intent, "args": args}, lane[0])
+                    if merged is None:
+                        break
+                    intent, args = merged
+                    jobs.append(lane.popleft())
+                    self.stats_["coalesced"] += 1
+                self._inflight += len(jobs)
+                try:
+                    await self._apply(jobs, intent, args)
+                finally:
+                    self._inflight -= len(jobs)
+        finally:
+            if not lane:
+                self._lanes.pop(key, None)
+            if self._tasks.get(key) is asyncio.current_task():
+                self._tasks.pop(key, None)
+
+    async def _apply(self, jobs: List[Job], intent: str, args: Dict[str, Any]) -> None:
+        # склеенная правка идёт под ключом последней записи: после рестарта склейка
+        # повторится так же, и GAS узнает уже применённую запись
+        key = jobs[-1].get("key") or jobs[-1]["id"]
+        unit, project = _key(jobs[-1])
+        attempt, deadline = 0, time.monotonic() + self.max_wait
+        sent = False
+        while True:
+            try:
+                # внутри процесса проект и так в одной полосе; лок — против соседних процессов (REDIS_URL)
+                async with shared.lock(f"project:{unit}:{project}"):
+                    if not sent:
+                        # после падения с этой отметкой запись без подтверждённой дедупликации не повторяем
+                        idem = gas_client._IDEMPOTENCY_SUPPORTED is True
+                        await self.journal.append(*({"op": "sent", "id": j["id"], "idem": idem} for j in jobs))
+                        sent = True
+                    resp = await gas_client.gas_call(intent, args, priority=PRIO_WRITE, idempotency_key=key)
+                ok, error = bool(resp and resp.get("ok")), (resp or {}).get("error") or "unknown error"
+                break
+            except Exception as e:
+                left = deadline - time.monotonic()
+                if not _should_wait(e) or left <= 0:
+                    # долгий простой GAS не должен держать полосу проекта вечно
+                    resp, ok, error = None, False, str(e)
+                    if _should_wait(e):
+                        self.stats_["expired"] += 1
+                    break
+                # мутация всё ещё в журнале, просто ждём GAS
+                self.stats_["waits"] += 1
+                logging.warning("write-queue: %s отложен: %s", intent, e)
+                pause = max(gas_client._backoff(attempt), gas_client.BREAKER.retry_in())
+                await asyncio.sleep(min(pause, left))
+                attempt = min(attempt + 1, 6)
+
+        await self._finish(jobs, resp, ok, error)
+        if not ok:
+            logging.warning("write-queue: %s %s не применён: %s", intent, args, error)
+
+    async def _finish(self, jobs: List[Job], resp: Optional[Dict[str, Any]], ok: bool, error: str) -> None:
+        await self.journal.append(*({"op": "done", "id": j["id"], "ok": ok,
+                                     **({} if ok else {"error": error})} for j in jobs))
+        self.stats_["applied" if ok else "failed"] += len(jobs)
+        for job in jobs:
+            await self._notify(job, resp if ok else None, error)
+
+    async def _notify(self, job: Job, resp: Optional[Dict[str, Any]], error: str) -> None:
+        if self.bot is None or not job.get("chat"):
+            return
+        if resp is not None:
+            unit = resp.get("unit") or job["args"].get("unit") or ""
+            text = job["done"].replace("{unit}", html.escape(str(unit)))
+        else:
+            text = f"{job['fail']}:\n<code>{html.escape(error)}</code>"
+        try:
+            await self.bot.send_message(job["chat"], text, reply_to_message_id=job.get("reply_to"))
+        except Exception:
+            try:   # сообщение «в очереди» могли удалить — шлём без reply
+                await self.bot.send_message(job["chat"], text)
+            except Exception as e:
+                logging.warning("write-queue: не смог уведомить чат %s: %s", job["chat"], e)
+
+    # ---- жизненный цикл ----
+    async def replay(self) -> int:
+        """
+        Поднять незавершённое из журнала (после падения/рестарта). Записи, которые уже
+        ушли в GAS без подтверждённой дедупликации, не повторяем: могли примениться.
+        """
+        pending = self.journal.load()
+        self.journal.compact(pending)
+        unsure = [j for j in pending if j.get("sent") and not j.get("sent_idem")
+                  and gas_client._IDEMPOTENCY_SUPPORTED is not True]
+        if unsure:
+            self.stats_["unconfirmed"] += len(unsure)
+            logging.warning("write-queue: не повторяю отправленные до рестарта мутации: %d", len(unsure))
+            await self._finish(unsure, None, False,
+                               "запись ушла в GAS перед перезапуском бота, но ответа не было — "
+                               "проверьте в таблице, применилась ли она")
+        skip = {j["id"] for j in unsure}
+        for job in pending:
+            if job["id"] not in skip:
+                self._enqueue(job)
+        self.stats_["replayed"] += len(pending) - len(unsure)
+        return len(pending) - len(unsure)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight = 0
+        self._tasks.clear()
+        self._lanes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_, "pending": self.pending(), "projects": len(self._lanes),
+                "compactions": self.journal.compactions}
+
+
+QUEUE = WriteQueue(Journal(GAS_JOURNAL_PATH))
+
+
+async def submit(intent: str, args: Dict[str, Any], **kw: Any) -> Job:
+    return await QUEUE.submit(intent, args, **kw)
+
+
+async def start_write_queue(bot: Bot) -> None:
+    """Хук Dispatcher.startup: проиграть журнал и начать писать."""
+    if shared.enabled() and not GAS_WORKER_ID and not os.getenv("GAS_JOURNAL_PATH"):
+        raise RuntimeError("REDIS_URL задан — у каждого воркера должен быть свой GAS_WORKER_ID (или GAS_JOURNAL_PATH)")
+    QUEUE.journal.acquire()
+    QUEUE.bot = bot
+    n = await QUEUE.replay()
+    if n:
+        logging.info("write-queue: из журнала поднято мутаций: %d", n)
+
+
+async def stop_write_queue() -> None:
+    """Хук Dispatcher.shutdown: незавершённое остаётся в журнале до следующего старта."""
+    await QUEUE.stop()
+    QUEUE.journal.release()
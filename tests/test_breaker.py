@@ -0,0 +1,85 @@
+# tests/test_breaker.py
+"""Предохранитель GAS (bot/utils/breaker.py): open → half_open → closed и потерянные пробы."""
+import asyncio
+
+import pytest
+
+from bot import gas_client
+from bot.utils import breaker as breaker_mod
+from bot.utils.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker_mod.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _open(b: CircuitBreaker) -> None:
+    for _ in range(b.threshold):
+        assert b.allow()
+        b.on_failure()
+    assert b.state == OPEN
+
+
+def test_opens_after_threshold_and_probes_once(clock):
+    b = CircuitBreaker(threshold=3, cooldown=10, probe_timeout=60)
+    _open(b)
+    assert not b.allow()
+    clock[0] += 10
+    assert b.allow() and b.state == HALF_OPEN   # проба
+    assert not b.allow()                        # вторую не пускаем
+    b.on_success()
+    assert b.state == CLOSED and b.allow()
+
+
+def test_failed_probe_reopens(clock):
+    b = CircuitBreaker(threshold=2, cooldown=5)
+    _open(b)
+    clock[0] += 5
+    assert b.allow()
+    b.on_failure()
+    assert b.state == OPEN and b.opened == 2
+    assert not b.allow()
+    assert b.retry_in() == pytest.approx(5)
+
+
+def test_released_probe_frees_slot(clock):
+    b = CircuitBreaker(threshold=1, cooldown=1)
+    _open(b)
+    clock[0] += 1
+    assert b.allow() and not b.allow()
+    b.release()
+    assert b.allow()
+
+
+def test_lost_probe_expires(clock):
+    b = CircuitBreaker(threshold=1, cooldown=1, probe_timeout=30)
+    _open(b)
+    clock[0] += 1
+    assert b.allow()
+    clock[0] += 29
+    assert not b.allow()
+    clock[0] += 1
+    assert b.allow() and b.state == HALF_OPEN
+
+
+def test_cancelled_probe_in_with_retry_releases(monkeypatch):
+    b = CircuitBreaker(threshold=1, cooldown=0)
+    monkeypatch.setattr(gas_client, "BREAKER", b)
+    b.on_failure()
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def run():
+        task = asyncio.create_task(gas_client._with_retry(hang, 0))
+        await asyncio.sleep(0)
+        assert b.state == HALF_OPEN and not b.allow()   # проба ушла и висит
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert b.allow()                                 # отмена не заперла предохранитель
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+# tests/test_chat_locks.py
+"""Анти-даблклик: реестр локов по чатам и gas_guard (bot/utils/tg_utils.py)."""
+import asyncio
+from types import SimpleNamespace
+
+from bot.utils.tg_utils import CHAT_LOCKS, LockRegistry, chat_lock, gas_guard, guard_key
+
+
+def test_lock_registry_drops_idle_locks():
+    async def run():
+        reg = LockRegistry()
+        async with reg.hold("a"):
+            assert reg.locked("a") and len(reg) == 1
+            waiter = asyncio.create_task(_hold(reg, "a"))
+            await asyncio.sleep(0)
+            assert len(reg) == 1        # ждущий держит ту же запись
+        await waiter
+        assert len(reg) == 0 and not reg.locked("a")
+
+    asyncio.run(run())
+
+
+async def _hold(reg: LockRegistry, key: str) -> None:
+    async with reg.hold(key):
+        await asyncio.sleep(0)
+
+
+def _click(chat: int, user: int):
+    return SimpleNamespace(message=SimpleNamespace(chat=SimpleNamespace(id=chat)),
+                           from_user=SimpleNamespace(id=user))
+
+
+def test_gas_guard_rejects_double_click_and_frees_lock():
+    calls = []
+
+    @gas_guard(show_busy=False)
+    async def handler(evt):
+        calls.append(evt)
+        await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(handler(_click(1, 7)), handler(_click(1, 7)))
+        assert len(calls) == 1          # второй клик, пока идёт первый, отброшен
+        assert len(CHAT_LOCKS) == 0     # запись лока удалена вместе с последним держателем
+        await handler(_click(1, 7))
+        assert len(calls) == 2          # после завершения — снова можно
+
+    asyncio.run(run())
+
+
+def test_chat_lock_shares_key_with_guard():
+    assert guard_key(_click(1, 7), "chat") == "chat:1"
+
+    async def run():
+        async with chat_lock(1):
+            assert CHAT_LOCKS.locked(guard_key(_click(1, 7), "chat"))
+
+    asyncio.run(run())
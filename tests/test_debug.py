@@ -0,0 +1,33 @@
+# tests/test_debug.py
+"""/gas_stats (bot/handlers/debug.py) отвечает только тем, кто в ADMIN_IDS."""
+import asyncio
+from types import SimpleNamespace
+
+from bot.handlers import debug
+
+
+def _msg(user_id: int):
+    sent = []
+
+    async def answer(text, **kw):
+        sent.append(text)
+
+    return SimpleNamespace(from_user=SimpleNamespace(id=user_id), answer=answer), sent
+
+
+def test_gas_stats_only_for_admins(monkeypatch):
+    monkeypatch.setattr(debug, "ADMIN_IDS", {42})
+    msg, sent = _msg(7)
+    asyncio.run(debug.show_gas_stats(msg))
+    assert sent == []
+
+    msg, sent = _msg(42)
+    asyncio.run(debug.show_gas_stats(msg))
+    assert len(sent) == 1 and "scheduler" in sent[0] and "breaker" in sent[0]
+
+
+def test_no_admins_by_default(monkeypatch):
+    monkeypatch.setattr(debug, "ADMIN_IDS", set())
+    msg, sent = _msg(42)
+    asyncio.run(debug.show_gas_stats(msg))
+    assert sent == []
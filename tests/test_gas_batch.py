@@ -0,0 +1,74 @@
+# tests/test_gas_batch.py
+"""Автосборка чтений (bot/gas_client.py): один HTTP-запрос — одна отметка в предохранителе."""
+import asyncio
+
+import httpx
+import pytest
+
+from bot import gas_client
+from bot.utils.batcher import MicroBatcher
+from bot.utils.breaker import CLOSED, CircuitBreaker
+
+READERS = 8
+
+
+@pytest.fixture
+def batched(monkeypatch):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    monkeypatch.setattr(gas_client, "BREAKER", breaker)
+    monkeypatch.setattr(gas_client, "LIMITER", None)
+    monkeypatch.setattr(gas_client, "GAS_RETRIES", 0)
+    monkeypatch.setattr(gas_client, "_BATCH_SUPPORTED", True)
+    monkeypatch.setattr(gas_client, "_BATCHER", MicroBatcher(gas_client._flush_batch, window=0.01, max_size=50))
+    posts = []
+
+    def install(handler):
+        async def fake_post_raw(intent, args, user, priority):
+            posts.append(intent)
+            return handler(intent, args)
+        monkeypatch.setattr(gas_client, "_post_raw", fake_post_raw)
+
+    return breaker, posts, install
+
+
+def _read_all():
+    async def run():
+        return await asyncio.gather(
+            *(gas_client._call_with_retry("get_unit_load", {"unit": str(i)}, None, gas_client.PRIO_READ)
+              for i in range(READERS)),
+            return_exceptions=True,
+        )
+    return asyncio.run(run())
+
+
+def test_failed_batch_counts_once(batched):
+    breaker, posts, install = batched
+
+    def fail(intent, args):
+        raise httpx.ReadTimeout("slow", request=httpx.Request("POST", "https://script.example/exec"))
+
+    install(fail)
+    results = _read_all()
+    assert posts == ["batch"]
+    assert all(isinstance(r, httpx.ReadTimeout) for r in results)
+    # один сбой одного POST, а не READERS сбоев: предохранитель ещё замкнут
+    assert breaker.state == CLOSED and breaker.stats()["consecutive_failures"] == 1
+
+
+def test_busy_batch_counts_once(batched):
+    breaker, posts, install = batched
+    install(lambda intent, args: {"ok": True, "results": [
+        {"ok": False, "error": "Service invoked too many times"} for _ in args["calls"]
+    ]})
+    results = _read_all()
+    assert posts == ["batch"] and all(not r["ok"] for r in results)
+    assert breaker.state == CLOSED and breaker.stats()["consecutive_failures"] == 1
+
+
+def test_good_batch_closes(batched):
+    breaker, posts, install = batched
+    breaker.on_failure()
+    install(lambda intent, args: {"ok": True, "results": [{"ok": True, "n": i} for i in range(len(args["calls"]))]})
+    results = _read_all()
+    assert posts == ["batch"] and [r["n"] for r in results] == list(range(READERS))
+    assert breaker.stats()["consecutive_failures"] == 0
@@ -0,0 +1,88 @@
+# tests/test_gas_sched.py
+"""Планировщик GAS (bot/utils/gas_sched.py): лимит, полосы приоритетов, очередь по чатам."""
+import asyncio
+
+from bot.utils.gas_sched import PRIO_BACKGROUND, PRIO_READ, PRIO_WRITE, GasScheduler
+
+
+async def _queue(s: GasScheduler, jobs, order):
+    """Поставить jobs [(имя, prio, chat)] в очередь за занятым слотом; вернуть задачи."""
+    async def one(name, prio, chat):
+        async with s.slot(prio, chat):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(one(*j)) for j in jobs]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_priority_lanes_then_round_robin_by_chat():
+    async def run():
+        s = GasScheduler(1)
+        order = []
+        await s.acquire(PRIO_READ)          # слот занят — дальше все ждут
+        tasks = await _queue(s, [
+            ("bg", PRIO_BACKGROUND, None),
+            ("a1", PRIO_READ, "a"), ("a2", PRIO_READ, "a"), ("a3", PRIO_READ, "a"),
+            ("b1", PRIO_READ, "b"),
+            ("w", PRIO_WRITE, "c"),
+        ], order)
+        assert s.stats()["queued"] == 6
+        s.release()
+        await asyncio.gather(*tasks)
+        return order, s.stats()
+
+    order, stats = asyncio.run(run())
+    # мутация первой, чат b не ждёт всю очередь чата a, фон — последним
+    assert order == ["w", "a1", "b1", "a2", "a3", "bg"]
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_limit_is_respected_and_can_grow():
+    async def run():
+        s = GasScheduler(2)
+        running = peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with s.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        tasks = [asyncio.create_task(work()) for _ in range(10)]
+        await asyncio.sleep(0)
+        assert s.stats()["active"] == 2
+        s.set_limit(4)                      # ожидающие просыпаются сразу
+        assert s.stats()["active"] == 4
+        await asyncio.gather(*tasks)
+        return peak, s.stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 4 and stats["active"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def run():
+        s = GasScheduler(1)
+        await s.acquire()
+        waiter = asyncio.create_task(s.acquire(chat="x"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert s.stats()["queued"] == 0
+        s.release()
+        assert s.stats()["active"] == 0
+        # слот выдан, но задачу отменили до старта — слот возвращается
+        await s.acquire()
+        late = asyncio.create_task(s.acquire())
+        await asyncio.sleep(0)
+        s.release()                         # будит late (слот уже за ним)
+        late.cancel()
+        await asyncio.gather(late, return_exceptions=True)
+        return s.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0 and stats["queued"] == 0
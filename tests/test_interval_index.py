@@ -0,0 +1,88 @@
+# tests/test_interval_index.py
+"""Индексы по датам (bot/interval_index.py) против перебора всех строк."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from bot.interval_index import ProjectIndex
+from bot.load_engine import LOAD_STATUSES
+
+UNITS = ["1", "1.1", "1.2", "2", "2.1", "2.1.3", "10.4"]
+BASE = date(2025, 1, 1)
+
+
+def _rows(n: int, seed: int):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        s = BASE + timedelta(days=rnd.randint(-400, 400))
+        e = s + timedelta(days=rnd.randint(-5, 300))     # бывает и конец раньше начала
+        rows.append({
+            "unit": rnd.choice(UNITS),
+            "name": f"P{i:04d}",
+            "status": rnd.choice(["active", "active", "pending", "paused", "done"]),
+            "start": s.isoformat() if rnd.random() > 0.1 else None,
+            "end": e.isoformat() if rnd.random() > 0.1 else None,
+        })
+    return rows
+
+
+def _in_scope(row, unit):
+    u = str(row["unit"])
+    return unit in (None, "ALL") or u == unit or u.startswith(unit + ".")
+
+
+def _brute_overlapping(rows, unit, a, b):
+    out = []
+    for r in rows:
+        if r["status"] not in LOAD_STATUSES or not _in_scope(r, unit):
+            continue
+        s = date.fromisoformat(r["start"]) if r["start"] else None
+        e = date.fromisoformat(r["end"]) if r["end"] else None
+        s, e = s or e, e or s
+        if s is None or s > e:
+            continue
+        if (a is None or e >= a) and (b is None or s <= b):
+            out.append(r["name"])
+    return sorted(out)
+
+
+def _brute_ending(rows, unit, a, b):
+    # завершения — только active/pending: приостановленный проект к дате окончания не завершится
+    hits = [r for r in rows
+            if r["status"] in ("active", "pending") and _in_scope(r, unit) and r["end"]
+            and a <= date.fromisoformat(r["end"]) <= b]
+    return [r["name"] for r in sorted(hits, key=lambda r: (r["end"], r["name"]))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_matches_brute_force(seed):
+    rows = _rows(600, seed)
+    idx = ProjectIndex(rows)
+    rnd = random.Random(seed + 100)
+    for _ in range(200):
+        unit = rnd.choice([None, "ALL", "1", "1.1", "2", "2.1", "2.1.3", "10", "10.4", "3"])
+        a = BASE + timedelta(days=rnd.randint(-500, 500))
+        b = a + timedelta(days=rnd.randint(0, 120))
+        a_open = None if rnd.random() < 0.1 else a
+        b_open = None if rnd.random() < 0.1 else b
+        got = sorted(r["name"] for r in idx.overlapping(unit, a_open, b_open))
+        assert got == _brute_overlapping(rows, unit, a_open, b_open)
+        assert [r["name"] for r in idx.ending(unit, a, b)] == _brute_ending(rows, unit, a, b)
+
+
+def test_empty_index():
+    idx = ProjectIndex([])
+    assert idx.overlapping("ALL", None, None) == []
+    assert idx.ending("1", BASE, BASE) == []
+
+
+def test_paused_projects_are_not_endings():
+    row = {"unit": "1.1", "name": "P", "status": "paused", "start": "2025-01-01", "end": "2025-01-31"}
+    idx = ProjectIndex([row])
+    assert idx.ending("ALL", BASE, date(2025, 12, 31)) == []
+    assert idx.overlapping("1", None, None) == []
+    assert idx.ending("1", BASE, date(2025, 12, 31)) == []
+    row["status"] = "active"
+    assert ProjectIndex([row]).ending("1", BASE, date(2025, 12, 31)) == [row]
@@ -0,0 +1,79 @@
+# tests/test_load_matrix.py
+"""Итоги матрицы занятости (bot/load_matrix.py) против построчного load_engine.compute."""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from bot.load_engine import compute
+from bot.load_matrix import LoadMatrix
+from tools.fake_gas import Dataset
+
+STATUSES = ("active", "pending", "paused", "done")
+
+
+@pytest.fixture(scope="module")
+def ds():
+    d = Dataset()
+    d.generate(600, seed=11)
+    return d
+
+
+def _reference(rows, units, unit, frm, to):
+    return {b["code"]: {"projects": len(b["projects"]), "weeks": b["weeks"]}
+            for top in compute(rows, units, unit, frm, to) for b in top["units"]}
+
+
+def _periods():
+    rnd = random.Random(2)
+    today = date.today()
+    out = [(None, None), (today.isoformat(), None), (None, today.isoformat())]
+    for _ in range(40):
+        a = today + timedelta(days=rnd.randint(-900, 1000))
+        b = a + timedelta(days=rnd.randint(0, 400))
+        out.append((a.isoformat(), b.isoformat()))
+    return out
+
+
+def test_occupancy_matches_rows_day_for_day(ds):
+    rows, units = ds.projects(None, statuses=STATUSES), ds.units()
+    m = LoadMatrix.build(rows, [u["code"] for u in units])
+    for frm, to in _periods():
+        for unit in (None, "1", "2.1", "ALL"):
+            assert m.occupancy(frm, to, unit) == _reference(rows, units, unit, frm, to), (frm, to, unit)
+
+
+def test_upserts_match_rebuild(ds):
+    rows, units = ds.projects(None, statuses=STATUSES), ds.units()
+    codes = [u["code"] for u in units]
+    m = LoadMatrix.build(rows, codes)
+    rnd = random.Random(4)
+    for i in rnd.sample(range(len(rows)), 80):
+        r = dict(rows[i])
+        if rnd.random() < 0.2:
+            r["status"] = rnd.choice(STATUSES)
+        else:
+            s = m.origin + timedelta(days=rnd.randint(0, 7 * m.n_weeks - 200))
+            r["start"], r["end"] = s.isoformat(), (s + timedelta(days=rnd.randint(0, 150))).isoformat()
+        assert m.upsert(r)
+        rows[i] = r
+    for r in rows[:20]:
+        m.remove(r["id"])
+    # окно перестроенной матрицы подогнано под новые даты — сверяем на общих неделях
+    ref = LoadMatrix.build(rows[20:], codes)
+    shift = (ref.origin - m.origin).days // 7
+    n = min(m.n_weeks - shift, ref.n_weeks)
+    for name in ("counts", "starts", "ends"):
+        assert np.array_equal(getattr(m, name)[:, shift:shift + n], getattr(ref, name)[:, :n]), name
+    for frm, to in _periods():
+        assert m.occupancy(frm, to) == _reference(rows[20:], units, None, frm, to), (frm, to)
+
+
+def test_upsert_outside_window_asks_for_rebuild(ds):
+    rows = ds.projects(None, statuses=STATUSES)
+    m = LoadMatrix.build(rows, [u["code"] for u in ds.units()])
+    r = dict(next(r for r in rows if r["id"] in m._spans))
+    r["end"] = (m.origin + timedelta(weeks=m.n_weeks)).isoformat()
+    assert not m.upsert(r)
+    assert r["id"] not in m._spans
@@ -0,0 +1,103 @@
+# tests/test_mirror.py
+"""
+Зеркало (bot/mirror.py + bot/load_engine.py) против заглушки GAS (tools/fake_gas.py):
+отчёты о загрузке в заглушке посчитаны независимо — ответы должны совпадать.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from bot.mirror import Mirror
+from bot.sheet import months_ahead_window
+from bot.utils.date_ranges import period_to_range
+from tools.fake_gas import Dataset, Intents
+
+PERIODS = ["this_month", "next_month", "quarter", "half_year", "year", "none"]
+
+
+@pytest.fixture(scope="module")
+def gas():
+    ds = Dataset()
+    ds.generate(800, seed=7)
+    return Intents(ds)
+
+
+def _mirror(gas) -> Mirror:
+    m = Mirror()
+    m.apply(gas.handle("export_rows", {"since": 0}))
+    return m
+
+
+def _ranges():
+    rnd = random.Random(3)
+    today = date.today()
+    out = [period_to_range(p) or {} for p in PERIODS]
+    for _ in range(20):
+        a = today + timedelta(days=rnd.randint(-800, 600))
+        b = a + timedelta(days=rnd.randint(0, 200))
+        out.append({"from": a.isoformat(), "to": b.isoformat()})
+    out.append({"from": today.isoformat()})
+    out.append({"to": today.isoformat()})
+    return out
+
+
+def _assert_same(gas, m: Mirror) -> None:
+    codes = [u["code"] for u in gas.ds.units()]
+    for rng in _ranges():
+        assert m.answer("get_all_load", dict(rng)) == gas.handle("get_all_load", dict(rng)), rng
+        for unit in codes[::3] + ["ALL"]:
+            args = {"unit": unit, **rng}
+            assert m.answer("get_unit_load", dict(args)) == gas.handle("get_unit_load", dict(args)), args
+
+
+def _assert_same_endings(gas, m: Mirror) -> None:
+    codes = [u["code"] for u in gas.ds.units()]
+    today = date.today()
+    for unit in codes[::2] + ["ALL", None]:
+        for shift in range(-3, 13):
+            month, year = (today.month - 1 + shift) % 12 + 1, today.year + (today.month - 1 + shift) // 12
+            args = {"unit": unit, "month": month, "year": year}
+            assert m.answer("list_endings_in_month", dict(args)) == gas.handle("list_endings_in_month", dict(args)), args
+        for months in (1, 3, 6, 12):
+            args = {"unit": unit, "months": months}
+            assert (m.answer("list_endings_within_months", dict(args))
+                    == gas.handle("list_endings_within_months", dict(args))), args
+
+
+def test_load_matches_reference(gas):
+    _assert_same(gas, _mirror(gas))
+
+
+def test_endings_match_reference(gas):
+    m = _mirror(gas)
+    _assert_same_endings(gas, m)
+    # сверка не пустая: в окнах есть и завершения, и приостановленные проекты, которых там быть не должно
+    text = "".join(m.answer("list_endings_within_months", {"unit": None, "months": 12})["chunks"])
+    a, b = months_ahead_window(12)
+    paused = [r for r in gas.ds.projects(None, statuses=("paused",))
+              if r["end"] and a <= date.fromisoformat(r["end"]) <= b]
+    assert text and paused
+    assert not any(f"— {r['name']} —" in text for r in paused)
+
+
+def test_load_matches_after_incremental_sync(gas):
+    m = _mirror(gas)
+    rows = gas.ds.projects(None)
+    rnd = random.Random(5)
+    for r in rnd.sample(rows, 30):
+        start = date.today() + timedelta(days=rnd.randint(-100, 100))
+        gas.handle("move_project", {"unit": r["unit"], "project": r["name"],
+                                    "new_start": start.isoformat(),
+                                    "new_end": (start + timedelta(days=rnd.randint(0, 90))).isoformat()})
+    for r in rnd.sample(rows, 10):
+        gas.handle("remove_project", {"unit": r["unit"], "project": r["name"]})
+    gas.handle("add_project", {"unit": rows[0]["unit"], "project": "99-0001 Новый",
+                               "start": date.today().isoformat()})
+    resp = gas.handle("export_rows", {"since": m.revision})
+    assert not resp["full"]
+    matrix = m.matrix
+    m.apply(resp)
+    assert m.matrix is matrix   # матрица поправлена на месте, не перестроена
+    _assert_same(gas, m)
+    _assert_same_endings(gas, m)
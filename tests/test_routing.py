@@ -0,0 +1,61 @@
+# tests/test_routing.py
+"""
+Порядок роутеров в bot/main.py: клик ◀ ▶ в отчёте (rv:…) должен дойти до
+report_view, а не утонуть в catch-all из debug.
+"""
+import asyncio
+from typing import Any, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import Update
+
+from bot.main import include_routers
+
+
+class _Recorder(BaseSession):
+    """Сессия без сети: запоминает вызовы Bot API и отвечает True."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[Any] = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls.append(method)
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def _callback(data: str) -> Update:
+    return Update.model_validate({
+        "update_id": 1,
+        "callback_query": {
+            "id": "1",
+            "from": {"id": 5, "is_bot": False, "first_name": "u"},
+            "chat_instance": "c",
+            "data": data,
+            "message": {"message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"}, "text": "x"},
+        },
+    })
+
+
+def test_report_page_callback_reaches_report_view():
+    async def run():
+        session = _Recorder()
+        bot = Bot("42:TEST", session=session)
+        dp = Dispatcher()
+        include_routers(dp)
+        # отчёта с таким id нет — report_view отвечает «устарел», catch-all ответил бы молча
+        await dp.feed_update(bot, _callback("rv:nope:0"))
+        return session.calls
+
+    calls = asyncio.run(run())
+    answers = [c for c in calls if isinstance(c, AnswerCallbackQuery)]
+    assert len(answers) == 1
+    assert answers[0].text and "устарел" in answers[0].text
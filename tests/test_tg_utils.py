@@ -0,0 +1,83 @@
+# tests/test_tg_utils.py
+"""Нарезка HTML под лимит Telegram (bot/utils/tg_utils.py)."""
+import random
+import re
+
+import pytest
+
+from bot.utils.tg_utils import TG_LIMIT, _html_split, _tg_len, pack_html
+
+
+def test_html_split_skips_cut_at_part_start():
+    # разрез по пробелу оставлял перевод строки в начале следующей части — и пустую часть
+    parts = _html_split("x" * 199 + " \n" + "y" * 300, 200)
+    assert [len(p) for p in parts] == [199, 200, 100]
+    assert "".join(parts) == "x" * 199 + "y" * 300
+
+
+def test_html_split_no_whitespace_only_parts():
+    parts = _html_split("<b>" + "x" * 199 + " \n" + "y" * 300 + "</b>", 200)
+    assert all(len(p) <= 200 for p in parts)
+    assert all(p.replace("<b>", "").replace("</b>", "").strip() for p in parts)
+    assert "".join(p.replace("<b>", "").replace("</b>", "") for p in parts) == "x" * 199 + "y" * 300
+
+
+# ---------- pack_html: лимит, баланс тегов, без пустых частей ----------
+_TAG_RE = re.compile(r"<(/?)([a-z]+)[^>]*>")
+
+
+def _balanced(part: str) -> bool:
+    stack = []
+    for m in _TAG_RE.finditer(part):
+        if not m.group(1):
+            stack.append(m.group(2))
+        elif not stack or stack.pop() != m.group(2):
+            return False
+    return not stack
+
+
+def _visible(s: str) -> str:
+    return re.sub(r"\s+", "", _TAG_RE.sub("", s))
+
+
+def _random_chunk(rnd: random.Random) -> str:
+    lines = []
+    for _ in range(rnd.randint(1, 12)):
+        words = []
+        for _ in range(rnd.randint(0, 15)):
+            w = rnd.choice(["проект", "UNIT", "x" * rnd.randint(1, 90), "🧩", "A&amp;B", "&lt;5&gt;", "2.1"])
+            if rnd.random() < 0.2:
+                w = f'<b>{w}</b>' if rnd.random() < 0.5 else f'<a href="https://e.x/{rnd.randint(1, 99)}">{w}</a>'
+            words.append(w)
+        lines.append(" ".join(words))
+    text = "\n".join(lines)
+    # тег через несколько строк — его придётся закрывать и открывать на разрезе
+    return f"<i>{text}</i>" if rnd.random() < 0.3 else text
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_pack_html_limits_and_tags(seed):
+    rnd = random.Random(seed)
+    limit = rnd.choice([60, 120, 300, TG_LIMIT])
+    chunks = [_random_chunk(rnd) for _ in range(rnd.randint(1, 8))] + ["", "  \n "]
+    title = "<b>Заголовок</b>"
+    parts = pack_html(chunks, title=title, limit=limit)
+
+    assert parts and parts[0].startswith(title)
+    for p in parts:
+        assert _tg_len(p) <= limit
+        assert _balanced(p), p
+        assert _TAG_RE.sub("", p).strip(), "пустая часть"
+        # &сущности; не разрезаны
+        assert all(re.match(r"&#?\w+;", p[i:]) for i in range(len(p)) if p[i] == "&")
+    assert _visible("".join(parts)) == _visible(title + "".join(chunks))
+
+
+def test_pack_html_title_stays_with_first_chunk():
+    title = "<b>Общая загруженность</b>"
+    # заголовок + первый чанк не влезают в страницу, хотя сам чанк влезает
+    for chunk in ["x" * 90, "строка\n" * 13, "<i>" + "y" * 200 + "</i>"]:
+        parts = pack_html([chunk, "z" * 50], title=title, limit=100)
+        assert parts[0].startswith(title) and _TAG_RE.sub("", parts[0][len(title):]).strip()
+        assert all(_tg_len(p) <= 100 for p in parts)
+        assert _visible("".join(parts)) == _visible(title + chunk + "z" * 50)
@@ -0,0 +1,521 @@
+# tools/fake_gas.py
+"""
+Локальная заглушка Apps Script для разработки и бенчмарков.
+
+Повторяет транспорт настоящего веб-приложения GAS:
+  POST /macros/s/<id>/exec  → 302 на второй хост (как script.googleusercontent.com)
+  GET  /macros/echo?user_content_key=…  → JSON-ответ
+Понимает конверт intent "batch" (см. gas_client.gas_batch): задержка на пачку — одна,
+как у одного выполнения Apps Script.
+
+Данные — SQLite (в памяти или файл --db), генерируются детерминированно (--projects, --seed).
+Реализованы все интенты, которые использует bot/gas_client.py, включая мутации.
+Можно добавить задержку (--latency-ms/--jitter-ms) и ошибки (--error-rate, --busy-rate,
+--timeout-rate, --lost-rate); на лету — GET/POST /_admin (JSON с теми же полями).
+Мутации с args.idempotency_key выполняются один раз: повтор с тем же ключом
+получает сохранённый ответ; ответ помечен "idempotent": true — так бот узнаёт,
+что мутации можно повторять после таймаута.
+
+Запуск:
+    python -m tools.fake_gas --port 8085 --projects 5000 --latency-ms 800
+    GAS_URL=http://127.0.0.1:8085/macros/s/fake/exec GAS_SECRET=dev python -m bot.main
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from bot.sheet import (
+    OPEN_STATUSES, fmt_period, month_window, months_ahead_window,
+    parse_iso as _d, project_info, projects_by_status, split_chunks as _split_chunks, unit_sort_key,
+)
+
+SECRET = "dev"
+LOAD_STATUSES = ("active", "pending")
+ENDING_STATUSES = ("active", "pending")   # paused в завершения не попадают (см. bot/interval_index.py)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    code  TEXT PRIMARY KEY,
+    top   TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS managers (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit    TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    manager TEXT,
+    start   TEXT,
+    end     TEXT,
+    status  TEXT NOT NULL DEFAULT 'active',  -- active | pending | paused | done
+    rev     INTEGER NOT NULL DEFAULT 0       -- ревизия последнего изменения строки
+);
+CREATE INDEX IF NOT EXISTS ix_projects_unit ON projects(unit);
+CREATE INDEX IF NOT EXISTS ix_projects_rev ON projects(rev);
+CREATE TABLE IF NOT EXISTS deleted (          -- «надгробия» для инкрементального export_rows
+    id  INTEGER PRIMARY KEY,
+    rev INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS idem (              -- ответы мутаций по ключу идемпотентности
+    key  TEXT PRIMARY KEY,
+    resp TEXT NOT NULL,
+    ts   REAL NOT NULL
+);
+"""
+
+_FIRST = ["Алексей", "Мария", "Игорь", "Елена", "Сергей", "Анна", "Дмитрий", "Ольга", "Павел", "Наталья"]
+_LAST = ["Савина", "Иванов", "Петров", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Козлов", "Новикова"]
+_WORDS = ["Альфа", "Бета", "Гамма", "Дельта", "Орион", "Вега", "Сириус", "Полярис", "Квант", "Модуль",
+          "Портал", "Склад", "Терминал", "Мост", "Цех", "Офис", "Парк", "Школа", "Клиника", "Депо"]
+
+
+# ---------- данные ----------
+class Dataset:
+    def __init__(self, path: str = ":memory:"):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+
+    def generate(self, n_projects: int, seed: int = 1, today: Optional[date] = None) -> None:
+        """Детерминированный набор: ~8 отделов, до 4 подюнитов, n_projects проектов."""
+        if self.db.execute("SELECT COUNT(*) FROM projects").fetchone()[0]:
+            return  # файл уже заполнен
+        rnd = random.Random(seed)
+        today = today or date.today()
+        units, managers = [], []
+        for top in range(1, 9):
+            units.append((str(top), str(top), f"(UNIT {top}) {rnd.choice(_LAST)} {rnd.choice(_FIRST)}"))
+            for sub in range(1, rnd.randint(0, 4) + 1):
+                units.append((f"{top}.{sub}", str(top), f"(UNIT {top}.{sub}) {rnd.choice(_LAST)} {rnd.choice(_FIRST)}"))
+        for _ in range(25):
+            managers.append(f"{rnd.choice(_LAST)} {rnd.choice(_FIRST)[0]}.")
+        managers = sorted(set(managers))
+        self.db.executemany("INSERT INTO units VALUES (?,?,?)", units)
+        self.db.executemany("INSERT INTO managers VALUES (?)", [(m,) for m in managers])
+
+        # проекты висят на подюнитах, а у отделов без подюнитов — на самом отделе
+        leaf = [u[0] for u in units if "." in u[0] or not any(x[1] == u[0] and "." in x[0] for x in units)]
+        rows = []
+        for i in range(n_projects):
+            start = today + timedelta(days=rnd.randint(-720, 540))
+            end = start + timedelta(days=rnd.randint(14, 400))
+            r = rnd.random()
+            if r < 0.05:
+                start_s, end_s = None, None
+            elif r < 0.15:
+                start_s, end_s = None, end.isoformat()
+            else:
+                start_s, end_s = start.isoformat(), end.isoformat()
+            status = rnd.choices(["active", "pending", "paused", "done"], [70, 10, 8, 12])[0]
+            name = f"{rnd.randint(20, 25)}-{i:04d} {rnd.choice(_WORDS)} {rnd.choice(_WORDS).lower()} {i}"
+            rows.append((rnd.choice(leaf), name, rnd.choice(managers), start_s, end_s, status))
+        self.db.executemany(
+            "INSERT INTO projects(unit, name, manager, start, end, status) VALUES (?,?,?,?,?,?)", rows
+        )
+        self.bump()
+        self.db.commit()
+
+    # --- ревизии ---
+    @property
+    def revision(self) -> int:
+        r = self.db.execute("SELECT v FROM meta WHERE k='rev'").fetchone()
+        return r["v"] if r else 0
+
+    def bump(self) -> int:
+        rev = self.revision + 1
+        self.db.execute("INSERT OR REPLACE INTO meta(k, v) VALUES ('rev', ?)", (rev,))
+        return rev
+
+    # --- выборки ---
+    def units(self) -> List[Dict[str, Any]]:
+        rows = self.db.execute("SELECT code, top, label FROM units").fetchall()
+        return [dict(r) for r in sorted(rows, key=lambda r: unit_sort_key(r["code"]))]
+
+    def label(self, code: str) -> str:
+        r = self.db.execute("SELECT label FROM units WHERE code=?", (code,)).fetchone()
+        return r["label"] if r else f"(UNIT {code})"
+
+    def managers(self) -> List[str]:
+        return [r["name"] for r in self.db.execute("SELECT name FROM managers ORDER BY name")]
+
+    def projects(self, unit: Optional[str] = None, *, exact: bool = False,
+                 statuses: tuple = OPEN_STATUSES) -> List[Dict[str, Any]]:
+        q = f"SELECT * FROM projects WHERE status IN ({','.join('?' * len(statuses))})"
+        params: list = list(statuses)
+        if unit and unit.upper() != "ALL":
+            if exact:
+                q += " AND unit = ?"
+                params.append(unit)
+            else:
+                q += " AND (unit = ? OR unit LIKE ?)"
+                params += [unit, f"{unit}.%"]
+        return [dict(r) for r in self.db.execute(q + " ORDER BY id", params)]
+
+    def find(self, unit: str, name: str) -> Optional[Dict[str, Any]]:
+        r = self.db.execute(
+            "SELECT * FROM projects WHERE unit=? AND name=? AND status != 'done' ORDER BY id LIMIT 1",
+            (unit, name),
+        ).fetchone()
+        return dict(r) if r else None
+
+
+# ---------- интенты ----------
+class Intents:
+    def __init__(self, ds: Dataset):
+        self.ds = ds
+
+    def handle(self, intent: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if intent == "batch":
+            # конверт: несколько интентов за одно «выполнение» скрипта
+            calls = args.get("calls") or []
+            return {"ok": True, "results": [
+                self.handle(str(c.get("intent") or ""), c.get("args") or {}) for c in calls
+            ]}
+        fn = getattr(self, "i_" + intent, None)
+        if fn is None:
+            # явный код отказа — по нему бот понимает, что интента нет (см. bot/mirror.py)
+            return {"ok": False, "error": f"Unknown intent: {intent}", "code": "UNKNOWN_INTENT"}
+        args = dict(args)
+        key = args.pop("idempotency_key", None)
+        if key:
+            # повтор той же мутации (клиент не дождался ответа) — отдаём прежний ответ
+            r = self.ds.db.execute("SELECT resp FROM idem WHERE key=?", (str(key),)).fetchone()
+            if r is not None:
+                return {**json.loads(r["resp"]), "replayed": True, "idempotent": True}
+        try:
+            resp = fn(**args)
+        except TypeError as e:
+            return {"ok": False, "error": f"bad args: {e}"}
+        if key:
+            self.ds.db.execute("INSERT OR REPLACE INTO idem(key, resp, ts) VALUES (?,?,?)",
+                               (str(key), json.dumps(resp, ensure_ascii=False), time.time()))
+            self.ds.db.commit()
+            resp = {**resp, "idempotent": True}   # бот повторяет мутации, только увидев это поле
+        return resp
+
+    # --- справочники ---
+    def i_list_units_min(self) -> Dict[str, Any]:
+        return {"ok": True, "units": self.ds.units()}
+
+    i_list_units = i_list_units_min
+
+    def i_list_managers(self) -> Dict[str, Any]:
+        return {"ok": True, "managers": self.ds.managers()}
+
+    def i_list_units_and_managers(self) -> Dict[str, Any]:
+        return {"ok": True, "units": self.ds.units(), "managers": self.ds.managers()}
+
+    # --- проекты ---
+    def i_list_projects_for_unit(self, unit: str) -> Dict[str, Any]:
+        names = [r["name"] for r in self.ds.projects(str(unit), exact=True)]
+        return {"ok": True, "unit": self.ds.label(str(unit)), "projects": names}
+
+    def i_list_active_projects(self, unit: str) -> Dict[str, Any]:
+        unit = str(unit)
+        rows = [r for r in self.ds.projects(unit, statuses=("active",))]
+        if not rows:
+            return {"ok": True, "chunks": []}
+        lines = [f"🧩 <b>{self.ds.label(unit)}</b>"]
+        for r in rows:
+            lines.append(f"• {r['name']} — {r['manager'] or '—'} — {fmt_period(r['start'], r['end'])}")
+        return {"ok": True, "chunks": _split_chunks(lines)}
+
+    def i_get_project_info(self, unit: str, project: str) -> Dict[str, Any]:
+        return project_info(self.ds.find(str(unit), project), self.ds.label(str(unit)))
+
+    def i_list_projects_by_status(self, unit: Optional[str] = None) -> Dict[str, Any]:
+        labels = {u["code"]: u["label"] for u in self.ds.units()}
+        return projects_by_status(self.ds.projects(unit, statuses=("pending", "paused")), labels)
+
+    def i_export_rows(self, since: int = 0) -> Dict[str, Any]:
+        """
+        Выгрузка для локального зеркала бота: все строки (since=0) или только
+        изменённые/удалённые после ревизии since. Справочники — всегда целиком.
+        """
+        since = int(since or 0)
+        rev = self.ds.revision
+        full = since <= 0 or since > rev
+        cols = "id, unit, name, manager, start, end, status"
+        if full:
+            rows = self.ds.db.execute(f"SELECT {cols} FROM projects ORDER BY id").fetchall()
+            deleted: List[int] = []
+        else:
+            rows = self.ds.db.execute(f"SELECT {cols} FROM projects WHERE rev > ? ORDER BY id", (since,)).fetchall()
+            deleted = [r["id"] for r in self.ds.db.execute("SELECT id FROM deleted WHERE rev > ?", (since,))]
+        return {"ok": True, "export_version": 1, "revision": rev, "full": full, "units": self.ds.units(),
+                "managers": self.ds.managers(), "rows": [dict(r) for r in rows], "deleted": deleted}
+
+    # --- загрузка ---
+    # Эталон для проверки bot/load_engine.py (tests/test_mirror.py), поэтому
+    # написан отдельно от него: недели — множество ISO-недель перебором дат,
+    # отбор и раскладка по отделам — SQL, нарезка на куски — своя.
+    def _load_rows(self, unit: Optional[str], frm: Optional[str], to: Optional[str]) -> List[Dict[str, Any]]:
+        """Строки в периоде: (юнит, имя, недель, начало в периоде) — в порядке вывода."""
+        f, t = _d(frm), _d(to)
+        out = []
+        for r in self.ds.projects(unit, statuses=LOAD_STATUSES):
+            s, e = _d(r["start"]) or _d(r["end"]), _d(r["end"]) or _d(r["start"])
+            if s is None:
+                continue
+            a, b = max(s, f or s), min(e, t or e)
+            if a > b:
+                continue
+            weeks = set()
+            d = a
+            while d <= b:                     # по дню на неделю + последний день
+                weeks.add(d.isocalendar()[:2])
+                d += timedelta(days=7)
+            weeks.add(b.isocalendar()[:2])
+            out.append({"unit": r["unit"], "name": r["name"], "weeks": len(weeks), "from": a})
+        return out
+
+    def _load_lines(self, unit: Optional[str], frm: Optional[str], to: Optional[str]) -> List[List[str]]:
+        """Строки отчёта, сгруппированные по отделам верхнего уровня."""
+        unit = None if not unit or str(unit).upper() == "ALL" else str(unit)
+        by_unit: Dict[str, List[Dict[str, Any]]] = {}
+        for it in self._load_rows(unit, frm, to):
+            by_unit.setdefault(it["unit"], []).append(it)
+        units = self.ds.units()
+        groups = []
+        for top in [u for u in units if "." not in u["code"]]:
+            lines: List[str] = []
+            for u in units:
+                items = by_unit.get(u["code"])
+                if u["top"] != top["code"] or not items:
+                    continue
+                items.sort(key=lambda x: (x["from"], x["name"]))
+                if lines:
+                    lines.append("")
+                lines.append(f"🧩 {u['label']} — проектов: {len(items)}, недель: {sum(x['weeks'] for x in items)}")
+                lines += [f"• {x['name']} ({x['weeks']})" for x in items]
+            if lines:
+                groups.append(lines)
+        return groups
+
+    @staticmethod
+    def _chunks(lines: List[str], limit: int = 3500) -> List[str]:
+        out: List[str] = []
+        for line in lines:
+            if out and len(out[-1]) + 1 + len(line) + 1 <= limit:
+                out[-1] += "\n" + line
+            else:
+                out.append(line)
+        return out
+
+    def i_get_all_load(self, **kw: Any) -> Dict[str, Any]:
+        groups = self._load_lines(None, kw.get("from"), kw.get("to"))
+        return {"ok": True, "chunks": [c for lines in groups for c in self._chunks(lines)]}
+
+    def i_get_unit_load(self, unit: str, **kw: Any) -> Dict[str, Any]:
+        groups = self._load_lines(str(unit), kw.get("from"), kw.get("to"))
+        chunks = self._chunks([line for lines in groups for line in lines])
+        return {"ok": True, "chunks": chunks, "text": "\n\n".join(chunks)}
+
+    # --- завершения ---
+    # Эталон для bot/interval_index.py (tests/test_mirror.py): отбор, порядок и текст —
+    # SQL по ISO-строкам дат и своё форматирование, без индекса и sheet.endings_report.
+    def _endings(self, unit: Optional[str], a: date, b: date) -> Dict[str, Any]:
+        q = (f"SELECT unit, name, manager, end FROM projects"
+             f" WHERE status IN ({','.join('?' * len(ENDING_STATUSES))}) AND end BETWEEN ? AND ?")
+        params: list = [*ENDING_STATUSES, a.isoformat(), b.isoformat()]
+        if unit and str(unit).upper() != "ALL":
+            q += " AND (unit = ? OR unit LIKE ?)"
+            params += [str(unit), f"{unit}.%"]
+        rows = self.ds.db.execute(q + " ORDER BY end, name", params).fetchall()
+        labels = {u["code"]: u["label"] for u in self.ds.units()}
+        lines = [f"🔚 <b>Завершения {a:%d.%m.%Y} — {b:%d.%m.%Y}</b>"]
+        for r in rows:
+            lines.append(f"• {_d(r['end']):%d.%m.%Y} — {labels.get(r['unit'], r['unit'])} — "
+                         f"{r['name']} — {r['manager'] or '—'}")
+        return {"ok": True, "chunks": self._chunks(lines) if rows else []}
+
+    def i_list_endings_in_month(self, unit: Optional[str], month: int, year: int) -> Dict[str, Any]:
+        return self._endings(unit, *month_window(month, year))
+
+    def i_list_endings_within_months(self, unit: Optional[str], months: int) -> Dict[str, Any]:
+        return self._endings(unit, *months_ahead_window(months))
+
+    def i_notify_upcoming(self, days: int = 30) -> Dict[str, Any]:
+        today = date.today()
+        n = sum(1 for r in self.ds.projects(None, statuses=("active",))
+                if r["end"] and today <= _d(r["end"]) <= today + timedelta(days=int(days)))
+        return {"ok": True, "count": n}
+
+    # --- мутации (каждая поднимает ревизию листа) ---
+    def i_add_project(self, unit: str, project: str, start: Optional[str] = None,
+                      end: Optional[str] = None, manager: Optional[str] = None) -> Dict[str, Any]:
+        unit = str(unit)
+        rev = self.ds.bump()
+        cur = self.ds.db.execute(
+            "INSERT INTO projects(unit, name, manager, start, end, status, rev) VALUES (?,?,?,?,?,'active',?)",
+            (unit, project, manager, start, end, rev),
+        )
+        self.ds.db.commit()
+        return {"ok": True, "unit": self.ds.label(unit), "row": cur.lastrowid, "note": "добавлен"}
+
+    def _update(self, unit: str, project: str, sql: str, params: tuple) -> Dict[str, Any]:
+        r = self.ds.find(str(unit), project)
+        if r is None:
+            return {"ok": False, "error": f"Проект не найден: {project}"}
+        rev = self.ds.bump()
+        self.ds.db.execute(f"UPDATE projects SET {sql}, rev=? WHERE id=?", params + (rev, r["id"]))
+        self.ds.db.commit()
+        return {"ok": True, "unit": self.ds.label(str(unit)), "project": project}
+
+    def i_move_project(self, unit: str, project: str, new_start: str, new_end: str) -> Dict[str, Any]:
+        return self._update(unit, project, "start=?, end=?", (new_start, new_end))
+
+    def i_extend_deadline(self, unit: str, project: str, new_end: str) -> Dict[str, Any]:
+        return self._update(unit, project, "end=?", (new_end,))
+
+    def i_set_manager(self, unit: str, project: str, manager: str) -> Dict[str, Any]:
+        return {**self._update(unit, project, "manager=?", (manager,)), "manager": manager}
+
+    def i_mark_paused(self, unit: str, project: str) -> Dict[str, Any]:
+        return self._update(unit, project, "status='paused'", ())
+
+    def i_mark_pending(self, unit: str, project: str) -> Dict[str, Any]:
+        return self._update(unit, project, "status='pending'", ())
+
+    def i_remove_project(self, unit: str, project: str) -> Dict[str, Any]:
+        r = self.ds.find(str(unit), project)
+        if r is None:
+            return {"ok": False, "error": f"Проект не найден: {project}"}
+        rev = self.ds.bump()
+        self.ds.db.execute("DELETE FROM projects WHERE id=?", (r["id"],))
+        self.ds.db.execute("INSERT OR REPLACE INTO deleted(id, rev) VALUES (?, ?)", (r["id"], rev))
+        self.ds.db.commit()
+        return {"ok": True, "unit": self.ds.label(str(unit)), "project": project}
+
+
+# ---------- HTTP ----------
+class FakeGas:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        busy_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        lost_rate: float = 0.0,
+        projects: int = 300,
+        seed: int = 1,
+        db: str = ":memory:",
+        redirect_host: str = "localhost",
+    ):
+        self.cfg: Dict[str, float] = {
+            "latency_ms": latency_ms, "jitter_ms": jitter_ms,
+            "error_rate": error_rate, "busy_rate": busy_rate, "timeout_rate": timeout_rate,
+            "lost_rate": lost_rate,
+        }
+        self.redirect_host = redirect_host
+        self.ds = Dataset(db)
+        self.ds.generate(projects, seed)
+        self.intents = Intents(self.ds)
+        self.calls: Dict[str, int] = {}
+        self._rnd = random.Random(seed)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.router.add_post("/macros/s/{sid}/exec", self._exec)
+        self.app.router.add_get("/macros/echo", self._echo)
+        self.app.router.add_get("/_admin", self._admin)
+        self.app.router.add_post("/_admin", self._admin)
+
+    async def _exec(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        intent = str(body.get("intent") or "")
+        self.calls[intent] = self.calls.get(intent, 0) + 1
+        if body.get("key") != SECRET:
+            resp: Dict[str, Any] = {"ok": False, "error": "bad key"}
+        else:
+            c, roll = self.cfg, self._rnd.random()
+            delay = c["latency_ms"] + self._rnd.uniform(0, c["jitter_ms"])
+            if delay:
+                await asyncio.sleep(delay / 1000.0)
+            if roll < c["timeout_rate"]:
+                await asyncio.sleep(3600)   # «повис» — клиент отвалится по таймауту
+            roll -= c["timeout_rate"]
+            if roll < c["error_rate"]:
+                return web.Response(status=500, text="Internal error (injected)")
+            roll -= c["error_rate"]
+            if roll < c["busy_rate"]:
+                resp = {"ok": False, "error": "Service invoked too many times for one day (injected)"}
+            else:
+                resp = self.intents.handle(intent, body.get("args") or {})
+                if self._rnd.random() < c["lost_rate"]:
+                    # скрипт отработал, но ответ потерялся — клиент не знает, записалось ли
+                    return web.Response(status=502, text="Bad gateway (injected, after apply)")
+        key = str(next(self._ids))
+        self._pending[key] = resp
+        port = request.transport.get_extra_info("sockname")[1]  # type: ignore[union-attr]
+        raise web.HTTPFound(f"http://{self.redirect_host}:{port}/macros/echo?user_content_key={key}")
+
+    async def _echo(self, request: web.Request) -> web.Response:
+        resp = self._pending.pop(request.query.get("user_content_key", ""), None)
+        if resp is None:
+            return web.json_response({"ok": False, "error": "expired"}, status=404)
+        return web.Response(text=json.dumps(resp, ensure_ascii=False), content_type="application/json")
+
+    async def _admin(self, request: web.Request) -> web.Response:
+        if request.method == "POST":
+            patch = await request.json()
+            for k, v in patch.items():
+                if k in self.cfg:
+                    self.cfg[k] = float(v)
+        return web.json_response({**self.cfg, "calls": self.calls})
+
+
+async def start(host: str = "127.0.0.1", port: int = 0, **kwargs) -> tuple[web.AppRunner, int]:
+    """Поднять заглушку в текущем event loop; возвращает (runner, port). Сам FakeGas — runner.app["fake"]."""
+    fake = FakeGas(**kwargs)
+    fake.app["fake"] = fake
+    runner = web.AppRunner(fake.app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    real_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, real_port
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Локальная заглушка GAS")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8085)
+    ap.add_argument("--db", default=":memory:", help="файл SQLite (по умолчанию — в памяти)")
+    ap.add_argument("--projects", type=int, default=300, help="сколько проектов сгенерировать")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="доля ответов HTTP 500")
+    ap.add_argument("--busy-rate", type=float, default=0.0, help="доля ответов ok=false «too many times»")
+    ap.add_argument("--timeout-rate", type=float, default=0.0, help="доля «зависших» запросов")
+    ap.add_argument("--lost-rate", type=float, default=0.0, help="доля ответов 502 уже после выполнения")
+    a = ap.parse_args()
+    fake = FakeGas(
+        latency_ms=a.latency_ms, jitter_ms=a.jitter_ms, error_rate=a.error_rate,
+        busy_rate=a.busy_rate, timeout_rate=a.timeout_rate, lost_rate=a.lost_rate,
+        projects=a.projects, seed=a.seed, db=a.db,
+    )
+    web.run_app(fake.app, host=a.host, port=a.port)
+
+
+if __name__ == "__main__":
+    main()
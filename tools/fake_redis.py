@@ -0,0 +1,304 @@
+# tools/fake_redis.py
+"""
+Локальная заглушка Redis (протокол RESP2) для разработки и проверки нескольких
+процессов бота без настоящего Redis.
+
+Понимает то, что нужно боту: строки с TTL (GET/SET NX XX EX PX/DEL/EXISTS/
+EXPIRE/PEXPIRE/TTL/PTTL/INCR/INCRBY/KEYS/DBSIZE/FLUSHDB) и служебное (PING/ECHO/SELECT/
+CLIENT/INFO/QUIT). Lua не исполняется: EVAL/EVALSHA знают только скрипты
+из bot/shared.py (снятие и продление лока), остальные — ошибка.
+Всё в памяти, одна база на все SELECT.
+
+Запуск:
+    python -m tools.fake_redis --port 6380
+    REDIS_URL=redis://127.0.0.1:6380/0 python -m bot.main
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bot.shared import LOCK_RELEASE, LOCK_RENEW
+
+
+class RespError(Exception):
+    pass
+
+
+def _ms() -> int:
+    return int(time.monotonic() * 1000)
+
+
+def _sha(script: bytes) -> str:
+    return hashlib.sha1(script).hexdigest()
+
+
+def _int(b: bytes) -> int:
+    try:
+        return int(b)
+    except ValueError:
+        raise RespError("ERR value is not an integer or out of range") from None
+
+
+class Store:
+    def __init__(self) -> None:
+        self.data: Dict[bytes, Tuple[bytes, Optional[int]]] = {}   # ключ → (значение, истекает в мс)
+        self.scripts: Dict[str, Callable[[List[bytes], List[bytes]], Any]] = {
+            _sha(LOCK_RELEASE.encode()): self._lua_release,
+            _sha(LOCK_RENEW.encode()): self._lua_renew,
+        }
+        self.calls = 0
+
+    # ---- хранилище ----
+    def get(self, k: bytes) -> Optional[bytes]:
+        item = self.data.get(k)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= _ms():
+            del self.data[k]
+            return None
+        return item[0]
+
+    def put(self, k: bytes, v: bytes, px: Optional[int] = None) -> None:
+        self.data[k] = (v, None if px is None else _ms() + px)
+
+    def pexpire(self, k: bytes, px: int) -> int:
+        v = self.get(k)
+        if v is None:
+            return 0
+        self.put(k, v, px)
+        return 1
+
+    def pttl(self, k: bytes) -> int:
+        if self.get(k) is None:
+            return -2
+        exp = self.data[k][1]
+        return -1 if exp is None else max(0, exp - _ms())
+
+    # ---- «Lua» ----
+    def _lua_release(self, keys: List[bytes], argv: List[bytes]) -> int:
+        if self.get(keys[0]) == argv[0]:
+            del self.data[keys[0]]
+            return 1
+        return 0
+
+    def _lua_renew(self, keys: List[bytes], argv: List[bytes]) -> int:
+        if self.get(keys[0]) == argv[0]:
+            return self.pexpire(keys[0], _int(argv[1]))
+        return 0
+
+    # ---- команды ----
+    def execute(self, args: List[bytes]) -> Any:
+        self.calls += 1
+        cmd = args[0].upper().decode()
+        fn = getattr(self, "c_" + cmd.lower(), None)
+        if fn is None:
+            raise RespError(f"ERR unknown command '{cmd}'")
+        return fn(*args[1:])
+
+    def c_ping(self, msg: bytes = b"") -> Any:
+        return msg or "PONG"
+
+    def c_echo(self, msg: bytes) -> bytes:
+        return msg
+
+    def c_select(self, *_: bytes) -> str:
+        return "OK"
+
+    def c_client(self, *_: bytes) -> str:
+        return "OK"
+
+    def c_info(self, *_: bytes) -> bytes:
+        return b"# Server\r\nredis_version:7.0.0-fake\r\n"
+
+    def c_get(self, k: bytes) -> Optional[bytes]:
+        return self.get(k)
+
+    def c_set(self, k: bytes, v: bytes, *opts: bytes) -> Any:
+        px: Optional[int] = None
+        nx = xx = False
+        it = iter(opts)
+        for o in it:
+            o = o.upper()
+            if o == b"NX":
+                nx = True
+            elif o == b"XX":
+                xx = True
+            elif o == b"EX":
+                px = _int(next(it)) * 1000
+            elif o == b"PX":
+                px = _int(next(it))
+            elif o == b"KEEPTTL":
+                px = self.pttl(k) if self.pttl(k) >= 0 else None
+            else:
+                raise RespError("ERR syntax error")
+        exists = self.get(k) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.put(k, v, px)
+        return "OK"
+
+    def c_del(self, *keys: bytes) -> int:
+        n = 0
+        for k in keys:
+            if self.get(k) is not None:
+                del self.data[k]
+                n += 1
+        return n
+
+    c_unlink = c_del
+
+    def c_exists(self, *keys: bytes) -> int:
+        return sum(self.get(k) is not None for k in keys)
+
+    def c_incr(self, k: bytes) -> int:
+        return self.c_incrby(k, b"1")
+
+    def c_incrby(self, k: bytes, by: bytes) -> int:
+        n = _int(self.get(k) or b"0") + _int(by)
+        exp = self.data.get(k, (b"", None))[1]
+        self.data[k] = (str(n).encode(), exp)
+        return n
+
+    def c_pexpire(self, k: bytes, px: bytes) -> int:
+        return self.pexpire(k, _int(px))
+
+    def c_expire(self, k: bytes, ex: bytes) -> int:
+        return self.pexpire(k, _int(ex) * 1000)
+
+    def c_pttl(self, k: bytes) -> int:
+        return self.pttl(k)
+
+    def c_ttl(self, k: bytes) -> int:
+        t = self.pttl(k)
+        return t if t < 0 else (t + 999) // 1000
+
+    def c_keys(self, pattern: bytes) -> List[bytes]:
+        pat = pattern.decode()
+        return [k for k in list(self.data) if self.get(k) is not None and fnmatch.fnmatchcase(k.decode(), pat)]
+
+    def c_dbsize(self) -> int:
+        return len(self.c_keys(b"*"))
+
+    def c_flushdb(self, *_: bytes) -> str:
+        self.data.clear()
+        return "OK"
+
+    c_flushall = c_flushdb
+
+    def _eval(self, sha: str, numkeys: bytes, rest: Tuple[bytes, ...]) -> Any:
+        fn = self.scripts.get(sha)
+        if fn is None:
+            raise RespError("NOSCRIPT fake_redis знает только скрипты из bot/shared.py")
+        n = _int(numkeys)
+        return fn(list(rest[:n]), list(rest[n:]))
+
+    def c_eval(self, script: bytes, numkeys: bytes, *rest: bytes) -> Any:
+        return self._eval(_sha(script), numkeys, rest)
+
+    def c_evalsha(self, sha: bytes, numkeys: bytes, *rest: bytes) -> Any:
+        return self._eval(sha.decode().lower(), numkeys, rest)
+
+    def c_script(self, sub: bytes, *args: bytes) -> Any:
+        sub = sub.upper()
+        if sub == b"LOAD":
+            sha = _sha(args[0])
+            if sha not in self.scripts:
+                raise RespError("ERR fake_redis: неизвестный скрипт")
+            return sha.encode()
+        if sub == b"EXISTS":
+            return [int(a.decode().lower() in self.scripts) for a in args]
+        return "OK"
+
+
+# ---- RESP ----
+def encode(v: Any) -> bytes:
+    if v is None:
+        return b"$-1\r\n"
+    if isinstance(v, RespError):
+        return b"-" + str(v).encode() + b"\r\n"
+    if isinstance(v, str):
+        return b"+" + v.encode() + b"\r\n"
+    if isinstance(v, bool):
+        v = int(v)
+    if isinstance(v, int):
+        return b":%d\r\n" % v
+    if isinstance(v, bytes):
+        return b"$%d\r\n%s\r\n" % (len(v), v)
+    if isinstance(v, list):
+        return b"*%d\r\n" % len(v) + b"".join(encode(x) for x in v)
+    raise TypeError(type(v))
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()   # inline-команда (telnet / redis-cli --no-raw)
+    args: List[bytes] = []
+    for _ in range(int(line[1:])):
+        hdr = await reader.readline()
+        n = int(hdr[1:])
+        args.append((await reader.readexactly(n + 2))[:-2])
+    return args
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store = Store()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                if args[0].upper() == b"QUIT":
+                    writer.write(encode("OK"))
+                    break
+                try:
+                    resp = self.store.execute(args)
+                except RespError as e:
+                    resp = e
+                except (StopIteration, TypeError, IndexError):
+                    resp = RespError("ERR wrong number of arguments")
+                writer.write(encode(resp))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start(host: str = "127.0.0.1", port: int = 0) -> Tuple[asyncio.AbstractServer, int, FakeRedis]:
+    """Поднять заглушку в текущем event loop; возвращает (server, port, fake)."""
+    fake = FakeRedis()
+    server = await asyncio.start_server(fake.handle, host, port)
+    real_port = server.sockets[0].getsockname()[1]
+    return server, real_port, fake
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Локальная заглушка Redis")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6380)
+    a = ap.parse_args()
+
+    async def serve() -> None:
+        server, port, _ = await start(a.host, a.port)
+        print(f"fake redis: redis://{a.host}:{port}/0")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()